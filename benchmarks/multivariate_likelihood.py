@@ -0,0 +1,112 @@
+"""Benchmark the full covariance likelihood of `multivariate_model`.
+
+Compares the gradient step of the observation model when the scale factor is tiled
+over the time axis (previous implementation) and when a single factor is broadcast
+(current implementation). Each variant runs in a fresh process, so that the peak
+resident memory of the process can be attributed to it.
+
+Usage::
+
+    python benchmarks/multivariate_likelihood.py --n-series 200 --n-timepoints 1000
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+VARIANTS = ["tiled", "broadcast"]
+
+
+def _make_loss(variant: str, n_timepoints: int):
+    import jax.numpy as jnp
+    from numpyro import distributions as dist
+
+    def loss(mean, std_observation, correlation_matrix, y):
+        if variant == "tiled":
+            cov_mat = (
+                jnp.diag(std_observation)
+                @ correlation_matrix
+                @ jnp.diag(std_observation)
+            )
+            cov_mat = jnp.tile(jnp.expand_dims(cov_mat, axis=0), (n_timepoints, 1, 1))
+        else:
+            cov_mat = std_observation[:, None] * correlation_matrix * std_observation
+        return -dist.MultivariateNormal(mean, scale_tril=cov_mat).log_prob(y).sum()
+
+    return loss
+
+
+def _run_variant(variant: str, n_series: int, n_timepoints: int, repeats: int):
+    import jax
+    import jax.numpy as jnp
+    from numpyro import distributions as dist
+
+    rss_before = _max_rss_bytes()
+
+    key_mean, key_corr, key_y = jax.random.split(jax.random.PRNGKey(0), 3)
+    mean = jax.random.normal(key_mean, (n_timepoints, n_series))
+    std_observation = jnp.full(n_series, 0.5)
+    correlation_matrix = dist.LKJCholesky(n_series).sample(key_corr)
+    y = mean + jax.random.normal(key_y, (n_timepoints, n_series))
+
+    grad_fn = jax.jit(jax.grad(_make_loss(variant, n_timepoints), argnums=(0, 1, 2)))
+    jax.block_until_ready(grad_fn(mean, std_observation, correlation_matrix, y))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        jax.block_until_ready(grad_fn(mean, std_observation, correlation_matrix, y))
+    step_time = (time.perf_counter() - start) / repeats
+
+    return {
+        "variant": variant,
+        "step_time_ms": step_time * 1e3,
+        "peak_memory_mb": (_max_rss_bytes() - rss_before) / 2**20,
+    }
+
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n-series", type=int, default=200)
+    parser.add_argument("--n-timepoints", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant is not None:
+        result = _run_variant(
+            args.variant, args.n_series, args.n_timepoints, args.repeats
+        )
+        print(json.dumps(result))  # noqa: T201
+        return
+
+    print(f"n_series={args.n_series}, n_timepoints={args.n_timepoints}")  # noqa: T201
+    header = f"{'variant':<10} {'step time (ms)':>15} {'peak memory (MB)':>17}"
+    print(header)  # noqa: T201
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--variant", variant]
+            + ["--n-series", str(args.n_series)]
+            + ["--n-timepoints", str(args.n_timepoints)]
+            + ["--repeats", str(args.repeats)],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(  # noqa: T201
+            f"{result['variant']:<10} {result['step_time_ms']:>15.1f} "
+            f"{result['peak_memory_mb']:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -57,6 +57,12 @@ class LinearEffect(AbstractEffect):
         with numpyro.plate(f"{self.id}_plate", n_features, dim=-1):
             coefficients = self.sample("coefs", self.prior)
 
+        # Coefficients of each series, sampled in a plate over series at dim -3. They
+        # are read feature-major, in the order of the columns of features expanded
+        # per series, so that both layouts have the same parameters in the same order
+        if coefficients.ndim == 3:
+            coefficients = jnp.reshape(coefficients, (n_features, -1)).T[..., None]
+
         if coefficients.ndim == 1:
             coefficients = jnp.expand_dims(coefficients, axis=-1)
 
@@ -3,15 +3,78 @@
 The classes in this module take a model, the data and perform inference using Numpyro.
 """
 
-from typing import Callable
+import copy
+import functools
+import logging
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
 
 import jax
+import jax.numpy as jnp
+import numpy as np
 import numpyro
+from numpyro import distributions as dist
 from numpyro.infer import MCMC, NUTS, SVI, Predictive, Trace_ELBO
 from numpyro.infer.autoguide import AutoDelta
 from numpyro.infer.initialization import init_to_mean
+from numpyro.infer.svi import SVIRunResult
+
+from prophetverse.effects.base import AbstractEffect
+from prophetverse.trend.base import TrendModel
 
 _DEFAULT_PREDICT_NUM_SAMPLES = 1000
+_DEFAULT_COMPILED_CACHE_MAXSIZE = 128
+_DEFAULT_PREDICTIVE_CACHE_MAXSIZE = 8
+_DEFAULT_QUANTILE_SKETCH_SIZE = 512
+_CHAIN_METHODS = ["parallel", "vectorized", "sequential"]
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _CompiledFunctionCache:
+    """
+    Least-recently-used cache of compiled functions with hit/miss statistics.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of entries kept in the cache.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable):
+        """Return the entry for `key`, or None if absent, updating the statistics."""
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any):
+        """Store `value` under `key`, evicting the least recently used entry."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        """Return the cache statistics."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
 
 
 class InferenceEngine:
@@ -32,6 +95,14 @@ class InferenceEngine:
         The model used for inference.
     rng_key : jax.random.PRNGKey
         The random number generator key.
+
+    Notes
+    -----
+    Predictions are computed by jit-compiled functions kept in the engine, keyed on
+    the structure, shapes and dtypes of the model inputs. Repeated predictions with
+    inputs of the same shape (e.g. the same horizon length) are not traced and
+    compiled again. The compiled functions are dropped when the engine is refitted
+    or pickled.
     """
 
     def __init__(self, model: Callable, rng_key=None):
@@ -39,6 +110,58 @@ class InferenceEngine:
         if rng_key is None:
             rng_key = jax.random.PRNGKey(0)
         self.rng_key = rng_key
+        self._reset_compiled_predictive()
+
+    def __getstate__(self):
+        """Return the state to pickle, without the compiled functions."""
+        state = self.__dict__.copy()
+        state.pop("_compiled_predictive", None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore the pickled state, with an empty compiled function cache."""
+        self.__dict__.update(state)
+        self._reset_compiled_predictive()
+
+    def _reset_compiled_predictive(self):
+        """Drop the compiled prediction functions, e.g. after a refit."""
+        self._compiled_predictive = _CompiledFunctionCache(
+            maxsize=_DEFAULT_PREDICTIVE_CACHE_MAXSIZE
+        )
+
+    def _run_compiled(
+        self, name: Hashable, fn: Callable, state, rng_key=None, **kwargs
+    ):
+        """
+        Evaluate `fn(rng_key, state, **kwargs)` with a jit-compiled function.
+
+        Parameters
+        ----------
+        name : Hashable
+            Identifies `fn` and its configuration in the cache.
+        fn : Callable
+            The function to compile. The arrays of `state` and `kwargs` are traced.
+        state : Any
+            A pytree of arrays, e.g. the fitted parameters.
+        rng_key : jax.random.PRNGKey, optional
+            The random key passed to `fn`. Defaults to the key of the engine.
+        **kwargs
+            Additional keyword arguments to be passed to the model.
+
+        Returns
+        -------
+        Any
+            The output of `fn`.
+        """
+        static_kwargs, dynamic_kwargs = _split_static_and_dynamic(kwargs)
+        cache_key = (name, static_kwargs, _abstract_signature(dynamic_kwargs))
+        compiled_fn = self._compiled_predictive.get(cache_key)
+        if compiled_fn is None:
+            compiled_fn = _make_predictive_fn(fn, static_kwargs)
+            self._compiled_predictive.put(cache_key, compiled_fn)
+        if rng_key is None:
+            rng_key = self.rng_key
+        return compiled_fn(rng_key, state, dynamic_kwargs)
 
     # pragma: no cover
     def infer(self, **kwargs):
@@ -57,12 +180,14 @@ class InferenceEngine:
         raise NotImplementedError("infer method must be implemented in subclass")
 
     # pragma: no cover
-    def predict(self, **kwargs):
+    def predict(self, return_sites: Optional[List[str]] = None, **kwargs):
         """
         Generate predictions using the specified model.
 
         Parameters
         ----------
+        return_sites : List[str], optional
+            The sites to return. Defaults to the observed and deterministic sites.
         **kwargs
             Additional keyword arguments to be passed to the model.
 
@@ -72,6 +197,191 @@ class InferenceEngine:
         """
         raise NotImplementedError("predict method must be implemented in subclass")
 
+    # pragma: no cover
+    def point_estimates(self) -> Dict[str, jnp.ndarray]:
+        """
+        Return a point estimate of each latent site of the fitted model.
+
+        The estimates can be passed as `init_params` to initialize another inference,
+        e.g. on data extended with new observations.
+
+        Returns
+        -------
+        Dict[str, jnp.ndarray]
+            The point estimate of each site, without a sample dimension.
+        """
+        raise NotImplementedError(
+            "point_estimates method must be implemented in subclass"
+        )
+
+    @staticmethod
+    def predict_batch(
+        engines: List["InferenceEngine"],
+        kwargs_list: List[dict],
+        return_sites: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Dict[str, jnp.ndarray]]:
+        """
+        Generate predictions of several fitted engines, in vectorized programs.
+
+        The engines are grouped by model, configuration, and by the structure,
+        shapes and dtypes of their fitted parameters and of their inputs. The
+        parameters, inputs and random keys of each group are stacked, and its
+        predictions are computed in a single `jax.vmap`-ed program. Engines that
+        cannot be grouped with any other are run in a thread pool.
+
+        Parameters
+        ----------
+        engines : List[InferenceEngine]
+            The fitted engines.
+        kwargs_list : List[dict]
+            The keyword arguments to be passed to the model, one dict per engine.
+        return_sites : List[str], optional
+            The sites to return. Defaults to the observed and deterministic sites.
+        max_workers : int, optional
+            The maximum number of threads of the pool. Defaults to the default of
+            `concurrent.futures.ThreadPoolExecutor`.
+
+        Returns
+        -------
+        List[Dict[str, jnp.ndarray]]
+            The predictions of each engine, as returned by its `predict` method.
+        """
+        predictives = [engine._predictive(return_sites) for engine in engines]
+        splits = [_split_static_and_dynamic(kwargs) for kwargs in kwargs_list]
+
+        groups: Dict[Hashable, List[int]] = {}
+        for i, ((name, _, state), (static_kwargs, dynamic_kwargs)) in enumerate(
+            zip(predictives, splits)
+        ):
+            key = (
+                type(engines[i]),
+                engines[i].model,
+                name,
+                static_kwargs,
+                _abstract_signature(dynamic_kwargs),
+                jax.tree_util.tree_structure(state),
+                _abstract_signature(jax.tree_util.tree_leaves(state)),
+            )
+            groups.setdefault(key, []).append(i)
+
+        results: List[Optional[Dict[str, jnp.ndarray]]] = [None] * len(engines)
+        for indices in groups.values():
+            if len(indices) == 1:
+                continue
+            name, fn, _ = predictives[indices[0]]
+            static_kwargs = splits[indices[0]][0]
+            states = _stack_pytrees([predictives[i][2] for i in indices])
+            dynamic_kwargs = _stack_pytrees([splits[i][1] for i in indices])
+            rng_keys = jnp.stack([engines[i].rng_key for i in indices])
+
+            first = engines[indices[0]]
+            cache_key = (
+                ("predict_batch", name),
+                static_kwargs,
+                _abstract_signature(dynamic_kwargs),
+            )
+            compiled_fn = first._compiled_predictive.get(cache_key)
+            if compiled_fn is None:
+                compiled_fn = _make_predictive_fn(fn, static_kwargs, batched=True)
+                first._compiled_predictive.put(cache_key, compiled_fn)
+
+            samples = compiled_fn(rng_keys, states, dynamic_kwargs)
+            for position, i in enumerate(indices):
+                results[i] = jax.tree_util.tree_map(lambda x: x[position], samples)
+
+        singles = [i for i, samples in enumerate(results) if samples is None]
+
+        def _predict_single(i):
+            return engines[i].predict(return_sites=return_sites, **kwargs_list[i])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i, samples in zip(singles, pool.map(_predict_single, singles)):
+                results[i] = samples
+        return results
+
+    # pragma: no cover
+    def _predictive(
+        self, return_sites: Optional[List[str]]
+    ) -> Tuple[Hashable, Callable, Any]:
+        """
+        Return what `predict` evaluates with `_run_compiled`.
+
+        Returns
+        -------
+        Tuple[Hashable, Callable, Any]
+            The cache name, the function of a random key, the fitted state and the
+            model inputs, and the fitted state.
+        """
+        raise NotImplementedError("_predictive method must be implemented in subclass")
+
+    def predict_summary(
+        self,
+        quantiles: List[float] = (),
+        chunk_size: int = 100,
+        sketch_size: int = _DEFAULT_QUANTILE_SKETCH_SIZE,
+        return_sites: Optional[List[str]] = None,
+        **kwargs,
+    ) -> Dict[str, Dict[str, jnp.ndarray]]:
+        """
+        Summarize the posterior predictive distribution, drawing samples in chunks.
+
+        The samples are drawn `chunk_size` at a time and reduced to their mean and
+        quantiles as they are drawn. Quantiles are read from a mergeable sketch of at
+        most `sketch_size` weighted points per site entry, so that at most
+        `sketch_size + chunk_size` values per entry are held in memory, instead of
+        all samples. They are exact while the number of samples does not exceed
+        `sketch_size`, and otherwise approximate, with an error in quantile level of
+        the order of `1 / sketch_size`. Without quantiles, only the running sum is
+        kept, and one chunk of samples is held in memory at a time.
+
+        Parameters
+        ----------
+        quantiles : List[float], optional
+            The quantile levels to compute, between 0 and 1. Defaults to none.
+        chunk_size : int, optional
+            The number of samples drawn at a time. Defaults to 100.
+        sketch_size : int, optional
+            The number of points kept per entry to estimate the quantiles.
+            Defaults to 512.
+        return_sites : List[str], optional
+            The sites to summarize. Defaults to the sites returned by `predict`.
+        **kwargs
+            Additional keyword arguments to be passed to the model.
+
+        Returns
+        -------
+        Dict[str, Dict[str, jnp.ndarray]]
+            For each site, a dict with its "mean" and its "quantiles", the latter
+            stacked along a first axis of length `len(quantiles)`.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be greater than 0.")
+
+        if len(quantiles) == 0:
+            sketch_size = None
+
+        summaries: Dict[str, _OnlineSummary] = {}
+        for samples in self._iter_predictive_chunks(chunk_size, return_sites, **kwargs):
+            for site, site_samples in samples.items():
+                summaries.setdefault(site, _OnlineSummary(sketch_size)).update(
+                    site_samples
+                )
+
+        return {
+            site: {"mean": summary.mean(), "quantiles": summary.quantiles(quantiles)}
+            for site, summary in summaries.items()
+        }
+
+    # pragma: no cover
+    def _iter_predictive_chunks(
+        self, chunk_size: int, return_sites: Optional[List[str]], **kwargs
+    ) -> Iterator[Dict[str, jnp.ndarray]]:
+        """Yield posterior predictive samples, at most `chunk_size` at a time."""
+        raise NotImplementedError(
+            "_iter_predictive_chunks method must be implemented in subclass"
+        )
+
 
 class MAPInferenceEngine(InferenceEngine):
     """
@@ -80,36 +390,114 @@ class MAPInferenceEngine(InferenceEngine):
     This class performs MAP inference using Stochastic Variational Inference (SVI)
     with AutoDelta guide. It provides methods for inference and prediction.
 
+    The optimization loop is jit-compiled and kept in a cache shared by all
+    instances, keyed on the model, the optimizer configuration, the number of steps
+    and the structure, shapes and dtypes of the model inputs. Refitting the same
+    configuration on new data of the same shape reuses the compiled loop instead of
+    tracing and compiling it again. See `cache_info` for hit/miss counters.
+
+    If any of `rtol`, `gradient_norm_tol` or `max_time` is set, the optimization runs
+    in compiled chunks of `window` steps, and stops before `num_steps` as soon as one
+    of the criteria is met at the end of a chunk.
+
     Parameters
     ----------
     model : Callable
         The probabilistic model to perform inference on.
-    optimizer_factory : numpyro.optim._NumPyroOptim, optional
-        The optimizer to use for SVI. Defaults to None.
+    optimizer_factory : Callable, optional
+        A callable returning the optimizer to use for SVI. If a `functools.partial`,
+        its function and arguments are used to identify the optimizer in the
+        compiled-loop cache. Defaults to Adam with step size 0.001.
     num_steps : int, optional
-        The number of optimization steps to perform. Defaults to 10000.
+        The maximum number of optimization steps to perform. Defaults to 10000.
     rng_key : jax.random.PRNGKey, optional
         The random number generator key. Defaults to None.
+    rtol : float, optional
+        Stop when the mean loss of a window changes by less than `rtol` relative to
+        the mean loss of the previous window. Defaults to None (not used).
+    gradient_norm_tol : float, optional
+        Stop when the norm of the loss gradient, with respect to the unconstrained
+        parameters, falls below this value. Defaults to None (not used).
+    max_time : float, optional
+        Stop after this many seconds of optimization. Defaults to None (no limit).
+    window : int, optional
+        The number of steps between convergence checks. Defaults to 1000.
+    init_params : Dict[str, jnp.ndarray], optional
+        Initial values of the latent sites, e.g. the `point_estimates` or the
+        `posterior_samples_` of a previous fit. Values with an extra leading
+        dimension, such as MCMC samples, are averaged over it. Sites that are
+        missing, or whose value has another shape, are initialized to their prior
+        mean. Defaults to None (all sites are initialized to their prior mean).
+
+    Attributes
+    ----------
+    cache_hit_ : bool
+        Whether the last call to `infer` reused compiled optimization loops only.
+    converged_ : bool
+        Whether the last call to `infer` stopped because `rtol` or
+        `gradient_norm_tol` was met.
     """
 
+    _compiled_cache = _CompiledFunctionCache(maxsize=_DEFAULT_COMPILED_CACHE_MAXSIZE)
+    _compiled_init_cache = _CompiledFunctionCache(
+        maxsize=_DEFAULT_COMPILED_CACHE_MAXSIZE
+    )
+
     def __init__(
         self,
         model: Callable,
-        optimizer_factory: numpyro.optim._NumPyroOptim = None,
+        optimizer_factory: Callable[[], numpyro.optim._NumPyroOptim] = None,
         num_steps=10000,
         num_samples=_DEFAULT_PREDICT_NUM_SAMPLES,
         rng_key=None,
+        rtol=None,
+        gradient_norm_tol=None,
+        max_time=None,
+        window=1000,
+        init_params: Optional[Dict[str, jnp.ndarray]] = None,
     ):
         if optimizer_factory is None:
-            optimizer_factory = self.default_optimizer_factory
+            optimizer_factory = functools.partial(numpyro.optim.Adam, step_size=0.001)
+        if num_steps <= 0:
+            raise ValueError("num_steps must be greater than 0.")
+        if window <= 0:
+            raise ValueError("window must be greater than 0.")
         self.optimizer_factory = optimizer_factory
         self.num_steps = num_steps
         self.num_samples = num_samples
+        self.rtol = rtol
+        self.gradient_norm_tol = gradient_norm_tol
+        self.max_time = max_time
+        self.window = window
+        self.init_params = init_params
         super().__init__(model, rng_key)
 
-    def default_optimizer_factory(self):
-        """Create the default optimizer for SVI."""
-        return numpyro.optim.Adam(step_size=0.001)
+    @property
+    def early_stopping(self) -> bool:
+        """Whether any stopping criterion besides `num_steps` is set."""
+        return any(
+            criterion is not None
+            for criterion in (self.rtol, self.gradient_norm_tol, self.max_time)
+        )
+
+    @classmethod
+    def cache_info(cls) -> CacheInfo:
+        """
+        Return statistics of the compiled optimization loop cache.
+
+        Returns
+        -------
+        CacheInfo
+            Named tuple with the number of hits, misses, the maximum size and the
+            current size of the cache, shared by all instances.
+        """
+        return cls._compiled_cache.info()
+
+    @classmethod
+    def cache_clear(cls):
+        """Clear the compiled optimization loop cache and reset its statistics."""
+        cls._compiled_cache.clear()
+        cls._compiled_init_cache.clear()
 
     def infer(self, **kwargs):
         """
@@ -125,22 +513,293 @@ class MAPInferenceEngine(InferenceEngine):
         self
             The updated MAPInferenceEngine object.
         """
-        self.guide_ = AutoDelta(self.model, init_loc_fn=init_to_mean())
-        svi_ = SVI(self.model, self.guide_, self.optimizer_factory(), loss=Trace_ELBO())
-        self.run_results_ = svi_.run(
-            rng_key=self.rng_key, num_steps=self.num_steps, **kwargs
+        self.guide_, svi_, svi_state = self._init_svi(**kwargs)
+        static_kwargs, dynamic_kwargs = _split_static_and_dynamic(kwargs)
+
+        svi_state, losses, converged = self._optimize(
+            svi_, svi_state, static_kwargs, dynamic_kwargs, batched=False
         )
+        self._set_results(svi_, svi_state, losses, converged, kwargs)
+        return self
+
+    def infer_batch(self, kwargs_list: List[dict]) -> List["MAPInferenceEngine"]:
+        """
+        Perform MAP inference of independent problems in vectorized programs.
+
+        The problems are grouped by the structure, shapes and dtypes of their
+        inputs, and each group is initialized and optimized in single `jax.vmap`-ed
+        SVI programs. Arrays, such as prior scales passed as NumPy floats, may differ
+        within a group. When early stopping is enabled, a group stops once every
+        problem in it meets a criterion.
+
+        All problems are fitted with the model and configuration of this engine;
+        problems to be fitted by engines with another `_batch_key` must be passed
+        to their own `infer_batch` call.
+
+        Parameters
+        ----------
+        kwargs_list : List[dict]
+            The keyword arguments to be passed to the model, one dict per problem.
+
+        Returns
+        -------
+        List[MAPInferenceEngine]
+            One fitted engine per problem, with the configuration of this engine.
+        """
+        engines = [copy.copy(self) for _ in kwargs_list]
+        splits = [_split_static_and_dynamic(kwargs) for kwargs in kwargs_list]
+
+        groups: Dict[Hashable, List[int]] = {}
+        for i, (static_kwargs, dynamic_kwargs) in enumerate(splits):
+            key = (static_kwargs, _abstract_signature(dynamic_kwargs))
+            groups.setdefault(key, []).append(i)
+
+        for indices in groups.values():
+            # The guide of the first problem describes the sites of the whole group
+            guide, svi_, svi_state = self._init_svi(**kwargs_list[indices[0]])
+            static_kwargs = splits[indices[0]][0]
+            dynamic_kwargs = _stack_pytrees([splits[i][1] for i in indices])
+            if len(indices) > 1:
+                init_fn = self._get_init_fn(static_kwargs, dynamic_kwargs)
+                svi_state = init_fn(self.rng_key, self.init_params, dynamic_kwargs)
+            else:
+                svi_state = _stack_pytrees([svi_state])
+
+            svi_state, losses, converged = self._optimize(
+                svi_, svi_state, static_kwargs, dynamic_kwargs, True
+            )
+
+            for position, i in enumerate(indices):
+                engines[i].guide_ = guide
+                engines[i].cache_hit_ = self.cache_hit_
+                engines[i]._set_results(
+                    svi_,
+                    jax.tree_util.tree_map(lambda x: x[position], svi_state),
+                    losses[position],
+                    converged[position],
+                    kwargs_list[i],
+                )
+            # Engines sharing a guide can share their compiled predictions as well
+            compiled_predictive = engines[indices[0]]._compiled_predictive
+            for i in indices[1:]:
+                engines[i]._compiled_predictive = compiled_predictive
+        return engines
+
+    def _batch_key(self) -> Hashable:
+        """
+        Return a hashable key of the model and configuration of this engine.
+
+        Engines with the same key fit a problem in the same way, so that their
+        problems can be optimized together by `infer_batch`. Initial values and
+        random keys are compared by value.
+        """
+        return (
+            self.model,
+            _callable_signature(self.optimizer_factory),
+            self.num_steps,
+            self.num_samples,
+            self.rtol,
+            self.gradient_norm_tol,
+            self.max_time,
+            self.window,
+            _value_signature(self.rng_key),
+            _value_signature(self.init_params),
+        )
+
+    def _get_init_fn(
+        self, static_kwargs: Hashable, dynamic_kwargs: List[jnp.ndarray]
+    ) -> Callable:
+        """
+        Return the compiled function computing the initial SVI states of a batch.
+
+        The function is looked up in the cache shared by all instances, and
+        compiled and stored there on a miss.
+        """
+        init_leaves, init_treedef = jax.tree_util.tree_flatten(self.init_params)
+        cache_key = (
+            self.model,
+            _callable_signature(self.optimizer_factory),
+            static_kwargs,
+            _abstract_signature(dynamic_kwargs),
+            init_treedef,
+            _abstract_signature([jnp.asarray(leaf) for leaf in init_leaves]),
+        )
+        init_fn = self._compiled_init_cache.get(cache_key)
+        if init_fn is None:
+            init_fn = _make_svi_init_fn(
+                self.model, self.optimizer_factory, static_kwargs
+            )
+            self._compiled_init_cache.put(cache_key, init_fn)
+        return init_fn
+
+    def _init_svi(self, **kwargs) -> Tuple[AutoDelta, SVI, Any]:
+        """
+        Create the guide and the SVI object, and compute the initial SVI state.
+
+        Parameters
+        ----------
+        **kwargs
+            Additional keyword arguments to be passed to the model.
+
+        Returns
+        -------
+        Tuple[AutoDelta, SVI, SVIState]
+            The guide, the SVI object and the initial state.
+        """
+        guide = AutoDelta(self.model, init_loc_fn=_init_strategy(self.init_params))
+        svi_ = SVI(self.model, guide, self.optimizer_factory(), loss=Trace_ELBO())
+        svi_state = svi_.init(self.rng_key, **kwargs)
+        return guide, svi_, svi_state
+
+    def _optimize(
+        self,
+        svi: SVI,
+        svi_state,
+        static_kwargs: Hashable,
+        dynamic_kwargs: List[jnp.ndarray],
+        batched: bool,
+    ):
+        """
+        Run the optimization loop, in chunks if early stopping is enabled.
+
+        Parameters
+        ----------
+        svi : SVI
+            An initialized SVI object.
+        svi_state : SVIState
+            The initial state, stacked along the first axis if `batched`.
+        static_kwargs : Hashable
+            The static part of the model inputs.
+        dynamic_kwargs : List[jnp.ndarray]
+            The array leaves of the model inputs, stacked if `batched`.
+        batched : bool
+            Whether the state and inputs hold several problems to be optimized with
+            `jax.vmap`.
+
+        Returns
+        -------
+        Tuple[SVIState, jnp.ndarray, jnp.ndarray]
+            The final state, the losses (last axis indexes the steps) and whether
+            each problem converged.
+        """
+        chunk_size = self.window if self.early_stopping else self.num_steps
+
+        self.cache_hit_ = True
+        chunks_losses: List[jnp.ndarray] = []
+        num_steps_run = 0
+        start_time = time.perf_counter()
+        while num_steps_run < self.num_steps:
+            num_chunk_steps = min(chunk_size, self.num_steps - num_steps_run)
+            run_fn = self._get_run_fn(
+                svi, static_kwargs, dynamic_kwargs, num_chunk_steps, batched
+            )
+            svi_state, chunk_losses, gradient_norm = run_fn(svi_state, dynamic_kwargs)
+            num_steps_run += num_chunk_steps
+
+            previous_losses = chunks_losses[-1] if chunks_losses else None
+            chunks_losses.append(chunk_losses)
+            converged = self._has_converged(
+                previous_losses, chunk_losses, gradient_norm
+            )
+            if jnp.all(converged):
+                break
+            if (
+                self.max_time is not None
+                and time.perf_counter() - start_time >= self.max_time
+            ):
+                break
+
+        return svi_state, jnp.concatenate(chunks_losses, axis=-1), converged
+
+    def _set_results(self, svi: SVI, svi_state, losses, converged, kwargs: dict):
+        """Store the optimization results and the posterior samples."""
+        self._reset_compiled_predictive()
+        self.converged_ = bool(converged)
+        self.run_results_ = SVIRunResult(svi.get_params(svi_state), svi_state, losses)
         self.posterior_samples_ = self.guide_.sample_posterior(
             self.rng_key, params=self.run_results_.params, **kwargs
         )
-        return self
 
-    def predict(self, **kwargs):
+    def _get_run_fn(
+        self,
+        svi: SVI,
+        static_kwargs: Hashable,
+        dynamic_kwargs: List[jnp.ndarray],
+        num_steps: int,
+        batched: bool,
+    ) -> Callable:
+        """
+        Return the compiled function running `num_steps` SVI updates.
+
+        The function is looked up in the cache shared by all instances, and
+        compiled and stored there on a miss. The gradient norm is computed only if
+        `gradient_norm_tol` is set.
+        """
+        gradient_norm = self.gradient_norm_tol is not None
+        cache_key = (
+            self.model,
+            _callable_signature(self.optimizer_factory),
+            num_steps,
+            batched,
+            gradient_norm,
+            static_kwargs,
+            _abstract_signature(dynamic_kwargs),
+        )
+        run_fn = self._compiled_cache.get(cache_key)
+        if run_fn is None:
+            self.cache_hit_ = False
+            run_fn = _make_svi_run_fn(
+                svi, static_kwargs, num_steps, batched, gradient_norm
+            )
+            self._compiled_cache.put(cache_key, run_fn)
+        return run_fn
+
+    def _has_converged(
+        self,
+        previous_losses: Optional[jnp.ndarray],
+        losses: jnp.ndarray,
+        gradient_norm: Optional[jnp.ndarray],
+    ) -> jnp.ndarray:
+        """
+        Check the convergence criteria at the end of an optimization chunk.
+
+        Parameters
+        ----------
+        previous_losses : jnp.ndarray, optional
+            The losses of the previous chunk, or None for the first chunk.
+        losses : jnp.ndarray
+            The losses of the current chunk.
+        gradient_norm : jnp.ndarray, optional
+            The norm of the gradient at the end of the current chunk, or None if
+            `gradient_norm_tol` is not set.
+
+        Returns
+        -------
+        jnp.ndarray
+            Boolean array, with the shape of `losses` without its last axis,
+            indicating whether `rtol` or `gradient_norm_tol` is met.
+        """
+        converged = jnp.zeros(jnp.shape(losses)[:-1], dtype=bool)
+        if self.gradient_norm_tol is not None:
+            converged = converged | (gradient_norm <= self.gradient_norm_tol)
+
+        if self.rtol is not None and previous_losses is not None:
+            previous_loss = jnp.mean(previous_losses, axis=-1)
+            current_loss = jnp.mean(losses, axis=-1)
+            converged = converged | (
+                jnp.abs(current_loss - previous_loss)
+                <= self.rtol * jnp.abs(previous_loss)
+            )
+        return converged
+
+    def predict(self, return_sites: Optional[List[str]] = None, **kwargs):
         """
         Generate predictions using the trained model.
 
         Parameters
         ----------
+        return_sites : List[str], optional
+            The sites to return. Defaults to the observed and deterministic sites.
         **kwargs
             Additional keyword arguments to be passed to the model.
 
@@ -149,16 +808,99 @@ class MAPInferenceEngine(InferenceEngine):
         self.samples_
             The predicted samples generated by the model.
         """
-        predictive = numpyro.infer.Predictive(
-            self.model,
-            params=self.run_results_.params,
-            guide=self.guide_,
-            # posterior_samples=self.posterior_samples_,
-            num_samples=self.num_samples,
-        )
-        self.samples_ = predictive(rng_key=self.rng_key, **kwargs)
+
+        self.samples_ = self._run_compiled(*self._predictive(return_sites), **kwargs)
         return self.samples_
 
+    def _predictive(
+        self, return_sites: Optional[List[str]]
+    ) -> Tuple[Hashable, Callable, Any]:
+        """Return the cache name, the function and the MAP parameters of `predict`."""
+
+        def _predict(rng_key, params, **kwargs):
+            predictive = Predictive(
+                self.model,
+                params=params,
+                guide=self.guide_,
+                num_samples=self.num_samples,
+                return_sites=return_sites,
+            )
+            return predictive(rng_key, **kwargs)
+
+        name = ("predict", self.num_samples, _freeze(return_sites))
+        return name, _predict, self.run_results_.params
+
+    def predict_mean(self, site: str = "obs", **kwargs) -> jnp.ndarray:
+        """
+        Return the mean of an observed site given the MAP parameters.
+
+        The model is run once with the latent sites set to their MAP values, and the
+        mean of the distribution of `site` is returned, instead of drawing
+        `num_samples` samples from it.
+
+        Parameters
+        ----------
+        site : str, optional
+            The name of the observed site. Defaults to "obs".
+        **kwargs
+            Additional keyword arguments to be passed to the model.
+
+        Returns
+        -------
+        jnp.ndarray
+            The mean of `site`, with the shape of one of its samples.
+        """
+
+        def _predict_mean(rng_key, params, **kwargs):
+            latent_values = self.guide_.median(params)
+            model = numpyro.handlers.substitute(
+                numpyro.handlers.seed(self.model, rng_key), data=latent_values
+            )
+            model_trace = numpyro.handlers.trace(model).get_trace(**kwargs)
+            return model_trace[site]["fn"].mean
+
+        return self._run_compiled(
+            ("predict_mean", site), _predict_mean, self.run_results_.params, **kwargs
+        )
+
+    def point_estimates(self) -> Dict[str, jnp.ndarray]:
+        """
+        Return the MAP estimate of each latent site.
+
+        Returns
+        -------
+        Dict[str, jnp.ndarray]
+            The MAP estimate of each site, in the constrained space.
+        """
+        return self.guide_.median(self.run_results_.params)
+
+    def _iter_predictive_chunks(
+        self, chunk_size: int, return_sites: Optional[List[str]], **kwargs
+    ) -> Iterator[Dict[str, jnp.ndarray]]:
+        """Yield `num_samples` posterior predictive samples in chunks."""
+        num_chunks = -(-self.num_samples // chunk_size)
+        rng_keys = jax.random.split(self.rng_key, num_chunks)
+        for i, rng_key in enumerate(rng_keys):
+            num_samples = min(chunk_size, self.num_samples - i * chunk_size)
+
+            def _predict(rng_key, params, num_samples=num_samples, **kwargs):
+                predictive = Predictive(
+                    self.model,
+                    params=params,
+                    guide=self.guide_,
+                    num_samples=num_samples,
+                    return_sites=return_sites,
+                )
+                return predictive(rng_key, **kwargs)
+
+            yield self._run_compiled(
+                ("predict_chunk", num_samples, _freeze(return_sites)),
+                _predict,
+                self.run_results_.params,
+                rng_key=rng_key,
+                **kwargs,
+            )
+
 
 class MCMCInferenceEngine(InferenceEngine):
     """
@@ -173,11 +915,23 @@ class MCMCInferenceEngine(InferenceEngine):
     num_warmup : int
         The number of warmup samples to discard.
     num_chains : int
-        The number of MCMC chains to run in parallel.
+        The number of MCMC chains to run.
+    chain_method : str
+        How to run the chains, one of "parallel", "vectorized" or "sequential".
+        "parallel" runs one chain per device, and vectorizes the chains instead if
+        there are not enough devices. JAX uses a single CPU device by default; call
+        `numpyro.set_host_device_count(num_chains)` at the start of the program,
+        before any JAX computation, to run the chains in parallel on CPU.
     dense_mass : bool
         Whether to use dense mass matrix for NUTS sampler.
     rng_key : Optional
         The random number generator key.
+    init_params : Dict[str, jnp.ndarray], optional
+        Initial values of the latent sites for all chains, e.g. the
+        `point_estimates` or the `posterior_samples_` of a previous fit. Values with
+        an extra leading dimension, such as MCMC samples, are averaged over it.
+        Sites that are missing, or whose value has another shape, are initialized to
+        their prior mean. Defaults to None.
 
     Attributes
     ----------
@@ -186,7 +940,9 @@ class MCMCInferenceEngine(InferenceEngine):
     num_warmup : int
         The number of warmup samples to discard.
     num_chains : int
-        The number of MCMC chains to run in parallel.
+        The number of MCMC chains to run.
+    chain_method : str
+        How to run the chains.
     dense_mass : bool
         Whether to use dense mass matrix for NUTS sampler.
     mcmc_ : MCMC
@@ -205,13 +961,21 @@ class MCMCInferenceEngine(InferenceEngine):
         num_samples=1000,
         num_warmup=200,
         num_chains=1,
+        chain_method="parallel",
         dense_mass=False,
         rng_key=None,
+        init_params: Optional[Dict[str, jnp.ndarray]] = None,
     ):
+        if chain_method not in _CHAIN_METHODS:
+            raise ValueError(
+                f"chain_method must be one of {_CHAIN_METHODS}, got {chain_method}."
+            )
         self.num_samples = num_samples
         self.num_warmup = num_warmup
         self.num_chains = num_chains
+        self.chain_method = chain_method
         self.dense_mass = dense_mass
+        self.init_params = init_params
         super().__init__(model, rng_key)
 
     def infer(self, **kwargs):
@@ -229,20 +993,29 @@ class MCMCInferenceEngine(InferenceEngine):
             The MCMCInferenceEngine object.
         """
         self.mcmc_ = MCMC(
-            NUTS(self.model, dense_mass=self.dense_mass, init_strategy=init_to_mean()),
+            NUTS(
+                self.model,
+                dense_mass=self.dense_mass,
+                init_strategy=_init_strategy(self.init_params),
+            ),
             num_samples=self.num_samples,
             num_warmup=self.num_warmup,
+            num_chains=self.num_chains,
+            chain_method=_resolve_chain_method(self.chain_method, self.num_chains),
         )
         self.mcmc_.run(self.rng_key, **kwargs)
         self.posterior_samples_ = self.mcmc_.get_samples()
+        self._reset_compiled_predictive()
         return self
 
-    def predict(self, **kwargs):
+    def predict(self, return_sites: Optional[List[str]] = None, **kwargs):
         """
         Generate predictive samples.
 
         Parameters
         ----------
+        return_sites : List[str], optional
+            The sites to return. Defaults to the observed and deterministic sites.
         **kwargs
             Additional keyword arguments to be passed to the Predictive method.
 
@@ -251,10 +1024,572 @@ class MCMCInferenceEngine(InferenceEngine):
         Dict[str, np.ndarray]
             The predictive samples.
         """
-        predictive = Predictive(
-            self.model, self.posterior_samples_, num_samples=self.num_samples
-        )
 
-        self.samples_predictive_ = predictive(self.rng_key, **kwargs)
-        self.samples_ = self.mcmc_.get_samples()
+        self.samples_predictive_ = self._run_compiled(
+            *self._predictive(return_sites), **kwargs
+        )
+        self.samples_ = self.posterior_samples_
         return self.samples_predictive_
+
+    def _predictive(
+        self, return_sites: Optional[List[str]]
+    ) -> Tuple[Hashable, Callable, Any]:
+        """Return the cache name, the function and the posterior of `predict`."""
+
+        def _predict(rng_key, posterior_samples, **kwargs):
+            # One predictive sample per posterior sample, from all chains
+            predictive = Predictive(
+                self.model, posterior_samples, return_sites=return_sites
+            )
+            return predictive(rng_key, **kwargs)
+
+        return ("predict", _freeze(return_sites)), _predict, self.posterior_samples_
+
+    def point_estimates(self) -> Dict[str, jnp.ndarray]:
+        """
+        Return the posterior mean of each site, over all chains.
+
+        Returns
+        -------
+        Dict[str, jnp.ndarray]
+            The posterior mean of each site.
+        """
+        return jax.tree_util.tree_map(
+            lambda x: jnp.mean(x, axis=0), self.posterior_samples_
+        )
+
+    def _iter_predictive_chunks(
+        self, chunk_size: int, return_sites: Optional[List[str]], **kwargs
+    ) -> Iterator[Dict[str, jnp.ndarray]]:
+        """Yield one posterior predictive sample per posterior sample, in chunks."""
+        num_samples = jax.tree_util.tree_leaves(self.posterior_samples_)[0].shape[0]
+        rng_keys = jax.random.split(self.rng_key, -(-num_samples // chunk_size))
+
+        def _predict(rng_key, posterior_samples, **kwargs):
+            predictive = Predictive(
+                self.model, posterior_samples, return_sites=return_sites
+            )
+            return predictive(rng_key, **kwargs)
+
+        for rng_key, start in zip(rng_keys, range(0, num_samples, chunk_size)):
+            posterior_samples = jax.tree_util.tree_map(
+                lambda x: x[start : start + chunk_size], self.posterior_samples_
+            )
+            yield self._run_compiled(
+                ("predict_chunk", _freeze(return_sites)),
+                _predict,
+                posterior_samples,
+                rng_key=rng_key,
+                **kwargs,
+            )
+
+
+class _PointGuide:
+    """
+    Guide placing a point mass at the MAP value of each latent site.
+
+    Stands in for the `AutoDelta` guide of a MAP engine restored without its
+    prototype trace, e.g. by `prophetverse.sktime.persistence.load`. It reads the
+    same parameters, so predictions match those of the fitted guide.
+
+    Parameters
+    ----------
+    sites : List[str]
+        The names of the latent sites.
+    prefix : str, optional
+        The prefix of the parameter names, as in `AutoDelta`. Defaults to "auto".
+    """
+
+    def __init__(self, sites: List[str], prefix: str = "auto"):
+        self.sites = sites
+        self.prefix = prefix
+
+    @classmethod
+    def from_params(cls, params: Dict[str, jnp.ndarray], prefix: str = "auto"):
+        """Create the guide of the sites with a location in `params`."""
+        suffix = f"_{prefix}_loc"
+        sites = [name[: -len(suffix)] for name in params if name.endswith(suffix)]
+        return cls(sites, prefix)
+
+    def __call__(self, *args, **kwargs):
+        """Sample each site from a point mass at its location parameter."""
+        return {
+            site: numpyro.sample(
+                site, dist.Delta(numpyro.param(f"{site}_{self.prefix}_loc"))
+            )
+            for site in self.sites
+        }
+
+    def median(self, params: Dict[str, jnp.ndarray]) -> Dict[str, jnp.ndarray]:
+        """Return the location of each site, as `AutoDelta.median`."""
+        return {site: params[f"{site}_{self.prefix}_loc"] for site in self.sites}
+
+
+class _OnlineSummary:
+    """
+    Running mean and quantile sketch of samples received in chunks.
+
+    The sketch holds weighted points along the sample axis. When a chunk is added
+    and the number of points exceeds `sketch_size`, the points are replaced by
+    `sketch_size` equally weighted quantiles of the merged weighted points.
+
+    Parameters
+    ----------
+    sketch_size : int, optional
+        The maximum number of points kept per entry. If None, no sketch is kept,
+        and only the mean is available.
+    """
+
+    def __init__(self, sketch_size: Optional[int]):
+        self.sketch_size = sketch_size
+        self.count = 0
+        self._sum = None
+        self._points = None
+        self._weights = None
+
+    def update(self, samples: jnp.ndarray):
+        """Add a chunk of samples, stacked along the first axis."""
+        samples = jnp.asarray(samples, dtype=jnp.result_type(float))
+        chunk_sum = samples.sum(axis=0)
+
+        self.count += samples.shape[0]
+        self._sum = chunk_sum if self._sum is None else self._sum + chunk_sum
+        if self.sketch_size is None:
+            return
+
+        weights = jnp.ones(samples.shape[0], dtype=samples.dtype)
+        if self._points is None:
+            self._points, self._weights = samples, weights
+        else:
+            self._points = jnp.concatenate([self._points, samples])
+            self._weights = jnp.concatenate([self._weights, weights])
+
+        if self._points.shape[0] > self.sketch_size:
+            levels = (jnp.arange(self.sketch_size) + 0.5) / self.sketch_size
+            self._points = _weighted_quantiles(self._points, self._weights, levels)
+            self._weights = jnp.full(
+                self.sketch_size, self.count / self.sketch_size, dtype=samples.dtype
+            )
+
+    def mean(self) -> jnp.ndarray:
+        """Return the mean of the samples added so far."""
+        return self._sum / self.count
+
+    def quantiles(self, levels: List[float]) -> jnp.ndarray:
+        """Return the quantiles of the samples at `levels`, along a first axis."""
+        if len(levels) == 0:
+            return jnp.zeros((0, *self._sum.shape), dtype=self._sum.dtype)
+        if self.sketch_size is None:
+            raise ValueError("Quantiles are not available without a sketch.")
+        levels = jnp.asarray(levels, dtype=self._points.dtype)
+        return _weighted_quantiles(self._points, self._weights, levels)
+
+
+def _weighted_quantiles(
+    points: jnp.ndarray, weights: jnp.ndarray, levels: jnp.ndarray
+) -> jnp.ndarray:
+    """
+    Compute quantiles of weighted points along their first axis.
+
+    Each point is placed at the middle of its weight in the cumulative
+    distribution, and quantiles are linearly interpolated between points.
+
+    Parameters
+    ----------
+    points : jnp.ndarray
+        The points, with shape (n_points, ...).
+    weights : jnp.ndarray
+        The weights of the points, with shape (n_points,).
+    levels : jnp.ndarray
+        The quantile levels, with shape (n_levels,).
+
+    Returns
+    -------
+    jnp.ndarray
+        The quantiles, with shape (n_levels, ...).
+    """
+    flat_points = points.reshape((points.shape[0], -1))
+    order = jnp.argsort(flat_points, axis=0)
+    sorted_points = jnp.take_along_axis(flat_points, order, axis=0)
+    sorted_weights = weights[order]
+    cdf = (jnp.cumsum(sorted_weights, axis=0) - sorted_weights / 2) / weights.sum()
+
+    quantiles = jax.vmap(jnp.interp, in_axes=(None, 1, 1), out_axes=1)(
+        levels, cdf, sorted_points
+    )
+    return quantiles.reshape((levels.shape[0], *points.shape[1:]))
+
+
+def _resolve_chain_method(chain_method: str, num_chains: int) -> str:
+    """
+    Return the chain method to pass to `MCMC`.
+
+    Parallel chains need one device per chain. When there are not enough devices,
+    the chains are vectorized instead of falling back to numpyro's sequential
+    execution.
+
+    Parameters
+    ----------
+    chain_method : str
+        The requested chain method.
+    num_chains : int
+        The number of chains.
+
+    Returns
+    -------
+    str
+        The chain method to use.
+    """
+    if chain_method != "parallel" or num_chains <= 1:
+        return chain_method
+    if jax.local_device_count() >= num_chains:
+        return chain_method
+    logging.warning(
+        f"There are {jax.local_device_count()} devices available, but "
+        f"{num_chains} parallel chains were requested. Chains will be vectorized. "
+        f"Call numpyro.set_host_device_count({num_chains}) at the start of the "
+        "program, before any JAX computation, to run them in parallel."
+    )
+    return "vectorized"
+
+
+class _DynamicLeaf:
+    """Placeholder for an array leaf in the static part of a split pytree."""
+
+    def __repr__(self):
+        return "<dynamic>"
+
+
+_DYNAMIC_LEAF = _DynamicLeaf()
+
+
+@dataclass(frozen=True)
+class _ObjectNode:
+    """Static description of a trend model or effect whose arrays were split out."""
+
+    cls: type
+    attributes: Tuple[Tuple[str, Any], ...]
+
+
+class _ById:
+    """Hashable wrapper comparing unhashable objects by identity."""
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return isinstance(other, _ById) and other.obj is self.obj
+
+
+def _freeze(obj):
+    """
+    Convert `obj` to a hashable equivalent.
+
+    Dicts, lists and tuples are converted to tuples recursively, and unhashable
+    objects are compared by identity.
+    """
+    if isinstance(obj, dict):
+        return tuple((key, _freeze(value)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return tuple(_freeze(value) for value in obj)
+    try:
+        hash(obj)
+    except TypeError:
+        return _ById(obj)
+    return obj
+
+
+def _callable_signature(fn: Callable) -> Hashable:
+    """
+    Return a hashable signature identifying what `fn` returns.
+
+    Partials are identified by their function and frozen arguments, so that two
+    partials built from the same configuration share the same signature. Other
+    callables are identified by themselves.
+    """
+    if isinstance(fn, functools.partial):
+        return (fn.func, _freeze(fn.args), _freeze(fn.keywords))
+    return _freeze(fn)
+
+
+def _is_dynamic_leaf(leaf) -> bool:
+    """
+    Return whether `leaf` should be traced instead of compiled as a constant.
+
+    Arrays and NumPy floating scalars hold data and are traced. Python scalars,
+    strings and other objects are configuration and become part of the cache key.
+    """
+    return isinstance(leaf, (np.ndarray, jax.Array, np.floating))
+
+
+def _split_static_and_dynamic(tree) -> Tuple[Hashable, List[jnp.ndarray]]:
+    """
+    Split the model inputs into a hashable static part and a list of arrays.
+
+    Trend models and effects are not pytrees, so their attributes are split
+    recursively as well. The arrays they hold (e.g. prior locations suggested from
+    the data) are then traced, and the compiled function does not depend on the
+    particular instances passed to the model.
+
+    Parameters
+    ----------
+    tree : Any
+        The model inputs, usually the keyword arguments passed to the model.
+
+    Returns
+    -------
+    Tuple[Hashable, List[jnp.ndarray]]
+        The static part, to be used as cache key, and the array leaves.
+    """
+    dynamic = []
+
+    def _split(node):
+        leaves, treedef = jax.tree_util.tree_flatten(node)
+        static_leaves = []
+        for leaf in leaves:
+            if _is_dynamic_leaf(leaf):
+                dynamic.append(jnp.asarray(leaf))
+                static_leaves.append(_DYNAMIC_LEAF)
+            elif isinstance(leaf, (TrendModel, AbstractEffect)):
+                attributes = tuple(
+                    (name, _split(value)) for name, value in sorted(vars(leaf).items())
+                )
+                static_leaves.append(_ObjectNode(type(leaf), attributes))
+            else:
+                static_leaves.append(_freeze(leaf))
+        return treedef, tuple(static_leaves)
+
+    return _split(tree), dynamic
+
+
+def _merge_static_and_dynamic(static: Hashable, dynamic: List[jnp.ndarray]):
+    """
+    Rebuild the model inputs split by `_split_static_and_dynamic`.
+
+    Parameters
+    ----------
+    static : Hashable
+        The static part returned by `_split_static_and_dynamic`.
+    dynamic : List[jnp.ndarray]
+        The array leaves, possibly traced.
+
+    Returns
+    -------
+    Any
+        The model inputs, with new trend model and effect instances holding the
+        given arrays.
+    """
+    dynamic_iter = iter(dynamic)
+
+    def _merge(node):
+        treedef, static_leaves = node
+        leaves = []
+        for leaf in static_leaves:
+            if leaf is _DYNAMIC_LEAF:
+                leaves.append(next(dynamic_iter))
+            elif isinstance(leaf, _ObjectNode):
+                obj = leaf.cls.__new__(leaf.cls)
+                obj.__dict__.update(
+                    {name: _merge(value) for name, value in leaf.attributes}
+                )
+                leaves.append(obj)
+            elif isinstance(leaf, _ById):
+                leaves.append(leaf.obj)
+            else:
+                leaves.append(leaf)
+        return treedef.unflatten(leaves)
+
+    return _merge(static)
+
+
+def _init_strategy(init_params: Optional[Dict[str, jnp.ndarray]]) -> Callable:
+    """Return the initialization strategy of the latent sites."""
+    if init_params is None:
+        return init_to_mean()
+    return functools.partial(_init_to_value_or_mean, values=init_params)
+
+
+def _init_to_value_or_mean(site=None, values: Optional[Dict[str, Any]] = None):
+    """
+    Initialize the latent sites to `values`, or to their prior mean.
+
+    A value with an extra leading dimension, e.g. posterior samples, is averaged
+    over it. A site is initialized as with `init_to_mean` if it is not in `values`,
+    or if its value has another shape, e.g. when the number of changepoints changed
+    since the values were estimated.
+    """
+    if site is None:
+        return functools.partial(_init_to_value_or_mean, values=values)
+
+    if site["type"] == "sample" and not site["is_observed"] and site["name"] in values:
+        shape = site["fn"].shape(site["kwargs"].get("sample_shape", ()))
+        value = values[site["name"]]
+        if jnp.ndim(value) == len(shape) + 1:
+            value = jnp.mean(jnp.asarray(value), axis=0)
+        if jnp.shape(value) == shape:
+            return value
+    return init_to_mean(site)
+
+
+def _stack_pytrees(trees: List[Any]) -> Any:
+    """Stack pytrees with the same structure along a new first axis."""
+    return jax.tree_util.tree_map(lambda *leaves: jnp.stack(leaves), *trees)
+
+
+def _abstract_signature(arrays: List[jnp.ndarray]) -> Tuple:
+    """Return the shapes and dtypes of `arrays`, as a hashable tuple."""
+    return tuple((array.shape, array.dtype) for array in arrays)
+
+
+def _value_signature(tree) -> Hashable:
+    """Return the structure and the array values of a pytree, as a hashable tuple."""
+    leaves, treedef = jax.tree_util.tree_flatten(tree)
+    arrays = [np.asarray(leaf) for leaf in leaves]
+    return treedef, tuple(
+        (array.shape, array.dtype.str, array.tobytes()) for array in arrays
+    )
+
+
+def _make_svi_run_fn(
+    svi: SVI,
+    static_kwargs: Hashable,
+    num_steps: int,
+    batched: bool = False,
+    gradient_norm: bool = True,
+) -> Callable:
+    """
+    Build a jit-compiled function running `num_steps` SVI updates.
+
+    Parameters
+    ----------
+    svi : SVI
+        An initialized SVI object.
+    static_kwargs : Hashable
+        The static part of the model inputs.
+    num_steps : int
+        The number of optimization steps.
+    batched : bool, optional
+        If True, the function is vectorized with `jax.vmap` over the first axis of
+        the state and of the array leaves. Defaults to False.
+    gradient_norm : bool, optional
+        Whether to compute the norm of the loss gradient at the final state.
+        Defaults to True.
+
+    Returns
+    -------
+    Callable
+        A function mapping the initial SVI state and the array leaves of the model
+        inputs to the final SVI state, the loss at every step and the norm of the
+        loss gradient at the final state (None if `gradient_norm` is False).
+    """
+
+    def _run(svi_state, dynamic_kwargs):
+        kwargs = _merge_static_and_dynamic(static_kwargs, dynamic_kwargs)
+
+        def body_fn(state, _):
+            return svi.update(state, **kwargs)
+
+        svi_state, losses = jax.lax.scan(body_fn, svi_state, None, length=num_steps)
+        if not gradient_norm:
+            return svi_state, losses, None
+        return svi_state, losses, _gradient_norm(svi, svi_state, kwargs)
+
+    if batched:
+        return jax.jit(jax.vmap(_run))
+    return jax.jit(_run)
+
+
+def _make_svi_init_fn(
+    model: Callable, optimizer_factory: Callable, static_kwargs: Hashable
+) -> Callable:
+    """
+    Build a jit-compiled function computing the initial SVI states of a batch.
+
+    Parameters
+    ----------
+    model : Callable
+        The probabilistic model.
+    optimizer_factory : Callable
+        A callable returning the optimizer.
+    static_kwargs : Hashable
+        The static part of the model inputs.
+
+    Returns
+    -------
+    Callable
+        A function mapping the random key, the initial values of the latent sites
+        (see `_init_strategy`) and the array leaves of the model inputs, stacked
+        along the first axis, to the stacked initial SVI states. The states are the
+        ones `MAPInferenceEngine._init_svi` computes for each problem.
+    """
+
+    def _init(rng_key, init_params, dynamic_kwargs):
+        kwargs = _merge_static_and_dynamic(static_kwargs, dynamic_kwargs)
+        # A new guide, so that the traced prototype does not leak out of jit
+        guide = AutoDelta(model, init_loc_fn=_init_strategy(init_params))
+        svi = SVI(model, guide, optimizer_factory(), loss=Trace_ELBO())
+        return svi.init(rng_key, **kwargs)
+
+    return jax.jit(jax.vmap(_init, in_axes=(None, None, 0)))
+
+
+def _make_predictive_fn(
+    fn: Callable, static_kwargs: Hashable, batched: bool = False
+) -> Callable:
+    """
+    Build a jit-compiled prediction function.
+
+    Parameters
+    ----------
+    fn : Callable
+        A function of a random key, a pytree of arrays and the model inputs.
+    static_kwargs : Hashable
+        The static part of the model inputs.
+    batched : bool, optional
+        If True, the function is vectorized with `jax.vmap` over the first axis of
+        the random key, of the pytree and of the array leaves. Defaults to False.
+
+    Returns
+    -------
+    Callable
+        A function mapping the random key, the pytree of arrays and the array
+        leaves of the model inputs to the output of `fn`.
+    """
+
+    def _predict(rng_key, state, dynamic_kwargs):
+        kwargs = _merge_static_and_dynamic(static_kwargs, dynamic_kwargs)
+        return fn(rng_key, state, **kwargs)
+
+    if batched:
+        return jax.jit(jax.vmap(_predict))
+    return jax.jit(_predict)
+
+
+def _gradient_norm(svi: SVI, svi_state, kwargs: dict) -> jnp.ndarray:
+    """
+    Compute the norm of the loss gradient w.r.t. the unconstrained parameters.
+
+    Parameters
+    ----------
+    svi : SVI
+        An initialized SVI object.
+    svi_state : SVIState
+        The state at which the gradient is evaluated.
+    kwargs : dict
+        The model inputs.
+
+    Returns
+    -------
+    jnp.ndarray
+        The euclidean norm of the gradient, concatenating all parameters.
+    """
+
+    def loss_fn(unconstrained_params):
+        params = svi.constrain_fn(unconstrained_params)
+        return svi.loss.loss(svi_state.rng_key, params, svi.model, svi.guide, **kwargs)
+
+    grads = jax.grad(loss_fn)(svi.optim.get_params(svi_state.optim_state))
+    return jnp.sqrt(sum(jnp.sum(grad**2) for grad in jax.tree_util.tree_leaves(grads)))
@@ -3,6 +3,7 @@
 from typing import Dict, Optional
 
 import jax.numpy as jnp
+import numpy as np
 import numpyro
 from numpyro import distributions as dist
 
@@ -20,6 +21,8 @@ def multivariate_model(
     noise_scale=0.05,
     correlation_matrix_concentration=1.0,
     is_single_series=False,
+    covariance_rank=None,
+    per_series_effects=(),
     **kwargs,
 ):
     """
@@ -28,6 +31,10 @@ def multivariate_model(
     The multivariate model is infers a Prophet-like model for each time series and use
     a multivariate normal likelihood as the observation model.
 
+    If `covariance_rank` is given, the covariance of the observations is
+    `W @ W.T + diag(std_observation**2)`, where `W` is a lower triangular
+    (n_series, covariance_rank) factor, and no correlation matrix is sampled.
+
     Parameters
     ----------
         y (jnp.ndarray): Array of time series data.
@@ -38,6 +45,14 @@ def multivariate_model(
         noise_scale (float): Noise scale.
         correlation_matrix_concentration (float): Concentration parameter for the LKJ
         distribution.
+        is_single_series (bool): Whether there is a single series, in which case a
+        Normal likelihood is used.
+        covariance_rank (int, optional): Rank of the low-rank part of the
+        covariance. If None, a full covariance with LKJ prior is used.
+        per_series_effects (tuple): Names of the effects computed inside a plate
+        over series at dim -3, so that their parameters are sampled per series.
+        Only meant for linear effects, whose per-series coefficients match those
+        of features expanded per series.
     """
     trend = trend_model(**trend_data)
 
@@ -50,7 +65,11 @@ def multivariate_model(
         for key, exog_effect in exogenous_effects.items():
 
             exog_data = data[key]  # type: ignore[index]
-            effect = exog_effect(trend=trend, data=exog_data)
+            if key in per_series_effects:
+                with numpyro.plate("series", mean.shape[0], dim=-3):
+                    effect = exog_effect(trend=trend, data=exog_data)
+            else:
+                effect = exog_effect(trend=trend, data=exog_data)
             effect = numpyro.deterministic(key, effect)
             mean += effect
 
@@ -68,6 +87,22 @@ def multivariate_model(
                 "obs", dist.Normal(mean.squeeze(-1).T, std_observation), obs=y
             )
 
+    elif covariance_rank is not None:
+        cov_factor = _sample_covariance_factor(
+            mean.shape[0], min(covariance_rank, mean.shape[0]), noise_scale
+        )
+
+        with numpyro.plate("time", mean.shape[-1], dim=-2):
+            numpyro.sample(
+                "obs",
+                dist.LowRankMultivariateNormal(
+                    mean.squeeze(-1).T,
+                    cov_factor=cov_factor,
+                    cov_diag=std_observation**2,
+                ),
+                obs=y,
+            )
+
     else:
         correlation_matrix = numpyro.sample(
             "corr_matrix",
@@ -77,12 +112,11 @@ def multivariate_model(
             ),
         )
 
-        cov_mat = (
-            jnp.diag(std_observation) @ correlation_matrix @ jnp.diag(std_observation)
-        )
-
-        cov_mat = jnp.tile(jnp.expand_dims(cov_mat, axis=0), (mean.shape[1], 1, 1))
+        # Same as diag(std) @ corr @ diag(std), without the matmuls
+        cov_mat = std_observation[:, None] * correlation_matrix * std_observation
 
+        # A single (n_series, n_series) factor is broadcast over the time axis of
+        # the loc, so the likelihood solves one triangular system for all steps
         with numpyro.plate("time", mean.shape[-1], dim=-2):
             numpyro.sample(
                 "obs",
@@ -212,6 +246,45 @@ def univariate_negbinomial_model(
         )
 
 
+def _sample_covariance_factor(n_series: int, rank: int, scale: float) -> jnp.ndarray:
+    """
+    Sample the lower triangular factor of a low-rank covariance.
+
+    The diagonal is positive, which makes the factor identifiable and keeps it away
+    from zero when initialized to the prior mean.
+
+    Parameters
+    ----------
+    n_series : int
+        Number of rows of the factor.
+    rank : int
+        Number of columns of the factor, at most `n_series`.
+    scale : float
+        Scale of the priors of the factor entries.
+
+    Returns
+    -------
+    jnp.ndarray
+        The factor, with shape (n_series, rank).
+    """
+    factor_diag = numpyro.sample(
+        "cov_factor_diag", dist.HalfNormal(scale * jnp.ones(rank))
+    )
+    rows, cols = np.tril_indices(n_series, k=-1, m=rank)
+    factor_lower = numpyro.sample(
+        "cov_factor_lower", dist.Normal(0, scale * jnp.ones(len(rows)))
+    )
+
+    diag_indices = np.arange(rank)
+    return (
+        jnp.zeros((n_series, rank))
+        .at[diag_indices, diag_indices]
+        .set(factor_diag)
+        .at[rows, cols]
+        .set(factor_lower)
+    )
+
+
 def _to_positive(x, threshold):
     return jnp.where(x < threshold, jnp.exp(x - threshold) * threshold, x)
 
@@ -3,6 +3,7 @@ from typing import Optional
 
 import numpy as np
 import pandas as pd
+from scipy import sparse as sp
 from sktime.transformations.base import BaseTransformer
 
 
@@ -18,6 +19,10 @@ class ExpandColumnPerLevel(BaseTransformer):
     ----------
     columns_regex : list
         A list of regular expression patterns to match the columns to be expanded.
+    sparse : bool, optional
+        If True, the expanded columns are returned as pandas sparse columns with fill
+        value zero, which only store the values of the series they belong to.
+        Default is False.
 
     Attributes
     ----------
@@ -34,8 +39,9 @@ class ExpandColumnPerLevel(BaseTransformer):
         Transform the input data by expanding the columns.
     """
 
-    def __init__(self, columns_regex: list[str]):
+    def __init__(self, columns_regex: list[str], sparse: bool = False):
         self.columns_regex = columns_regex
+        self.sparse = sparse
         super().__init__()
 
     def fit(self, X: pd.DataFrame, y: Optional[pd.DataFrame] = None):
@@ -120,34 +126,45 @@ class ExpandColumnPerLevel(BaseTransformer):
 
         if not isinstance(X.index, pd.MultiIndex):
             raise ValueError("Input must have a multi-level index")
-        X_original = X.copy()
-        X = X.copy()
 
-        matched_columns = self.matched_columns_
+        matched_columns = list(self.matched_columns_)
 
+        series_codes, series_idx = pd.factorize(X.index.droplevel(-1))
         # Ensure identifiers are tuples
         series_identifiers = [
-            idx if isinstance(idx, tuple) else (idx,)
-            for idx in X.index.droplevel(-1).unique()
+            idx if isinstance(idx, tuple) else (idx,) for idx in series_idx
         ]
+        n_series = len(series_identifiers)
 
-        def get_col_name(column, identifier):
-            return f"{column}_dup_{'-'.join(identifier)}"
-
-        for match in matched_columns:
-            for identifier in series_identifiers:
-                X[get_col_name(match, identifier)] = np.float64(0)
+        # Column j * n_series + i holds matched column j for the rows of series i
+        new_columns = [
+            self.get_col_name(column, identifier)
+            for column in matched_columns
+            for identifier in series_identifiers
+        ]
+        self.new_columns_ = {
+            self.get_col_name(column, identifier): column
+            for identifier in series_identifiers
+            for column in matched_columns
+        }
 
-        self.new_columns_ = {}
-        for identifier in series_identifiers:
-
-            for column in matched_columns:
-                self.new_columns_[get_col_name(column, identifier)] = column
-                X.loc[identifier, get_col_name(column, identifier)] = X_original.loc[
-                    identifier, column
-                ].values.flatten()
-                X[get_col_name(column, identifier)] = X[
-                    get_col_name(column, identifier)
-                ].fillna(0)
-
-        return X.drop(columns=matched_columns)
+        values = X[matched_columns].to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(values), 0.0, values)
+        rows = np.repeat(np.arange(len(X)), len(matched_columns))
+        cols = (
+            np.arange(len(matched_columns))[None, :] * n_series + series_codes[:, None]
+        ).ravel()
+        shape = (len(X), len(new_columns))
+
+        if self.sparse:
+            X_expanded = pd.DataFrame.sparse.from_spmatrix(
+                sp.csr_matrix((values.ravel(), (rows, cols)), shape=shape),
+                index=X.index,
+                columns=new_columns,
+            )
+        else:
+            expanded = np.zeros(shape)
+            expanded[rows, cols] = values.ravel()
+            X_expanded = pd.DataFrame(expanded, index=X.index, columns=new_columns)
+
+        return pd.concat([X.drop(columns=matched_columns), X_expanded], axis=1)
@@ -0,0 +1,124 @@
+"""Cache of posterior predictive samples shared by the predict methods."""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import jax
+import numpy as np
+import pandas as pd
+
+from prophetverse.engine import CacheInfo
+
+
+class PredictionCache:
+    """
+    Least-recently-used cache of posterior predictive samples, bounded in memory.
+
+    Entries are evicted, least recently used first, while the total size of the
+    cached arrays exceeds `max_bytes`. Entries larger than `max_bytes` are not cached.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total size, in bytes, of the cached arrays.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(
+        self, key: Hashable, return_sites: Optional[List[str]] = None
+    ) -> Optional[Dict[str, jax.Array]]:
+        """
+        Return the samples stored under `key`, or None if absent.
+
+        If `return_sites` is given, only these sites are returned, and the entry is
+        used only if it holds all of them. Otherwise, the entry is used only if it
+        was stored with the default sites.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            samples, complete = entry
+            if return_sites is None and complete:
+                self._hit(key)
+                return samples
+            if return_sites is not None and set(return_sites) <= set(samples):
+                self._hit(key)
+                return {site: samples[site] for site in return_sites}
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        key: Hashable,
+        samples: Dict[str, jax.Array],
+        return_sites: Optional[List[str]] = None,
+    ):
+        """
+        Store `samples` under `key`, evicting the least recently used entries.
+
+        `return_sites` are the sites requested to draw `samples`, None if the
+        default sites were drawn.
+        """
+        nbytes = _nbytes(samples)
+        if nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= _nbytes(self._entries.pop(key)[0])
+        self._entries[key] = (samples, return_sites is None)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.nbytes -= _nbytes(evicted)
+
+    def _hit(self, key: Hashable):
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+    def info(self) -> CacheInfo:
+        """Return the cache statistics, with sizes in bytes."""
+        return CacheInfo(self.hits, self.misses, self.max_bytes, self.nbytes)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+
+
+def prediction_cache_key(
+    fh_index: pd.Index, X: Optional[pd.DataFrame], rng_key: jax.Array
+) -> Hashable:
+    """
+    Return the cache key of a prediction request.
+
+    Parameters
+    ----------
+    fh_index : pd.Index
+        The absolute forecasting horizon.
+    X : pd.DataFrame, optional
+        The exogenous variables. Their values, index and columns are hashed.
+    rng_key : jax.Array
+        The random key used to draw the samples.
+
+    Returns
+    -------
+    Hashable
+        The key identifying the request.
+    """
+    if X is None:
+        X_key = None
+    else:
+        X_hash = pd.util.hash_pandas_object(X, index=True).values
+        X_key = (tuple(X.columns), hashlib.sha1(X_hash.tobytes()).hexdigest())
+    return (tuple(fh_index), X_key, np.asarray(rng_key).tobytes())
+
+
+def _nbytes(samples: Dict[str, jax.Array]) -> int:
+    return sum(value.nbytes for value in samples.values())
@@ -1,6 +1,8 @@
 """Base classes for sktime forecasters in prophetverse."""
 
-import itertools
+import contextlib
+import contextvars
+import functools
 import logging
 from typing import Any, Dict, List, Optional, Tuple, Union
 
@@ -14,8 +16,24 @@ from sktime.forecasting.base import BaseForecaster, ForecastingHorizon
 
 from prophetverse.effects.base import AbstractEffect
 from prophetverse.effects.linear import LinearEffect
-from prophetverse.engine import MAPInferenceEngine, MCMCInferenceEngine
-from prophetverse.utils import get_multiindex_loc, series_to_tensor
+from prophetverse.engine import (
+    InferenceEngine,
+    MAPInferenceEngine,
+    MCMCInferenceEngine,
+)
+from prophetverse.sktime._prediction_cache import (
+    PredictionCache,
+    prediction_cache_key,
+)
+from prophetverse.utils import series_to_tensor
+
+# Set by _deferred_inference: forecasters fitted meanwhile prepare the inputs of the
+# model without running inference, for one batched inference afterwards.
+_DEFER_INFERENCE = contextvars.ContextVar("_DEFER_INFERENCE", default=False)
+
+# Methods that return every sampled site, and so sample them all by default when
+# vectorized. The others only need the observations.
+_ALL_SITES_METHODS = ("predict_all_sites", "predict_all_sites_samples")
 
 
 class BaseBayesianForecaster(BaseForecaster):
@@ -50,6 +68,38 @@ class BaseBayesianForecaster(BaseForecaster):
     scale: float or pd.Series, optional
         The scale of the target variable. If not provided, it will be inferred from the
         training data.
+    mcmc_chain_method: str
+        How to run the MCMC chains, one of "parallel" (one chain per CPU device),
+        "vectorized" or "sequential". Parallel chains need
+        `numpyro.set_host_device_count` to be called at the start of the program;
+        without enough devices, they are vectorized.
+    optimizer_convergence_kwargs: dict, optional
+        Criteria to stop MAP optimization before `optimizer_steps`, passed to
+        `MAPInferenceEngine`: "rtol", "gradient_norm_tol", "max_time" and "window".
+        If None, all optimization steps are run.
+    batch_fit: bool, optional
+        If True and inference is MAP, the series of a hierarchical `y` that sktime
+        fits with one forecaster each are optimized together in vectorized programs,
+        instead of one after the other. The fitted forecasters are still available
+        in `forecasters_`. Defaults to False.
+    prediction_cache_max_bytes: int, optional
+        If given, the posterior predictive samples drawn by `predict_samples`,
+        `predict_quantiles`, `predict_interval` and `predict_all_sites` are cached,
+        keyed on the absolute forecasting horizon, a hash of `X` and the random key.
+        Repeated requests reuse the samples instead of drawing them again. The least
+        recently used entries are evicted when the cached arrays exceed this size, in
+        bytes. Defaults to None (no caching).
+    update_steps: int, optional
+        The number of optimization steps (MAP) or warmup steps (MCMC) run by
+        `update`, starting from the parameters of the previous fit. Defaults to a
+        tenth of `optimizer_steps` or `mcmc_warmup`.
+    init_params: dict, optional
+        Initial values of the latent sites, keyed by site name, e.g. the
+        `posterior_samples_` of a forecaster fitted on overlapping data. Values with
+        an extra leading dimension, such as MCMC samples, are averaged over it.
+        Sites that are missing, or whose value has another shape, are initialized to
+        their prior mean. With vectorized (per-series) fits, the same values are
+        used for all series. Defaults to None (prior mean).
 
 
     """
@@ -71,6 +121,12 @@ class BaseBayesianForecaster(BaseForecaster):
         optimizer_name: str,
         optimizer_kwargs: dict,
         scale=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        batch_fit=False,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
         *args,
         **kwargs,
     ):
@@ -79,10 +135,16 @@ class BaseBayesianForecaster(BaseForecaster):
         self.mcmc_samples = mcmc_samples
         self.mcmc_warmup = mcmc_warmup
         self.mcmc_chains = mcmc_chains
+        self.mcmc_chain_method = mcmc_chain_method
         self.inference_method = inference_method
         self.optimizer_steps = optimizer_steps
         self.optimizer_name = optimizer_name
         self.optimizer_kwargs = optimizer_kwargs
+        self.optimizer_convergence_kwargs = optimizer_convergence_kwargs
+        self.batch_fit = batch_fit
+        self.prediction_cache_max_bytes = prediction_cache_max_bytes
+        self.update_steps = update_steps
+        self.init_params = init_params
         self.scale = scale
         super().__init__(*args, **kwargs)
 
@@ -108,35 +170,7 @@ class BaseBayesianForecaster(BaseForecaster):
         _NumPyroOptim
             An instance of the optimizer.
         """
-        optimizer_kwargs = self.optimizer_kwargs
-        optimizer_name = self.optimizer_name
-        rng_key = self.rng_key
-
-        if rng_key is None:
-            rng_key = jax.random.PRNGKey(24)
-
-        if optimizer_kwargs is None:
-            optimizer_kwargs = {"step_size": 1e-4}
-        if optimizer_name is None:
-            optimizer_name = "Adam"
-
-        if optimizer_name.startswith("optax"):
-
-            import optax
-            from numpyro.optim import optax_to_numpyro
-
-            scheduler = optax.cosine_decay_schedule(**optimizer_kwargs)
-
-            opt = optax_to_numpyro(
-                optax.chain(
-                    optax.scale_by_adam(),
-                    optax.scale_by_schedule(scheduler),
-                    optax.scale(-1.0),
-                )
-            )
-            return opt
-
-        return getattr(numpyro.optim, optimizer_name)(**optimizer_kwargs)
+        return _build_optimizer(self.optimizer_name, self.optimizer_kwargs)
 
     # pragma: no cover
     def _get_fit_data(
@@ -230,40 +264,262 @@ class BaseBayesianForecaster(BaseForecaster):
             The fitted Bayesian forecaster.
         """
         self._set_y_scales(y)
+        data = self._prepare_fit_data(y, X, fh)
+
+        self.inference_engine_ = self._get_inference_engine(
+            init_params=self.init_params
+        )
+        self._prediction_cache = None
+        if self.prediction_cache_max_bytes is not None:
+            self._prediction_cache = PredictionCache(self.prediction_cache_max_bytes)
+
+        if _DEFER_INFERENCE.get():
+            # Inference is run for several forecasters at once, see fit
+            self._deferred_fit_data_ = data
+            return self
+
+        self.inference_engine_.infer(**data)
+        self.posterior_samples_ = self.inference_engine_.posterior_samples_
+
+        return self
+
+    def _update(self, y, X=None, update_params=True):
+        """
+        Update the fitted parameters with new observations.
+
+        The model inputs are rebuilt from all the observations seen so far, with the
+        scales of the fit. The inference starts from the point estimates of the
+        previous fit, and runs `update_steps` steps only. The trend model is
+        initialized again, so the changepoints of the previous fit are kept and new
+        ones may be added, with coefficients starting at zero; other parameters
+        whose shape changed are initialized to their prior mean.
+
+        Parameters
+        ----------
+        y : pd.DataFrame
+            The new observations of the target variable.
+        X : pd.DataFrame, optional
+            The new observations of the exogenous variables.
+        update_params : bool, optional
+            Whether to update the parameters. If False, only the cutoff is updated.
+            Defaults to True.
+
+        Returns
+        -------
+        self : object
+            The updated Bayesian forecaster.
+        """
+        if not update_params:
+            return self
+
+        previous_n_changepoints = getattr(
+            self.trend_model_, "n_changepoint_per_series", None
+        )
+        data = self._prepare_fit_data(self._y, self._X, self._fh)
+
+        init_params = _pad_changepoint_coefficients(
+            self.inference_engine_.point_estimates(),
+            previous_n_changepoints,
+            getattr(self.trend_model_, "n_changepoint_per_series", None),
+        )
+        self.inference_engine_ = self._get_inference_engine(
+            init_params=init_params, update=True
+        )
+        if self._prediction_cache is not None:
+            self._prediction_cache.clear()
+
+        self.inference_engine_.infer(**data)
+        self.posterior_samples_ = self.inference_engine_.posterior_samples_
+
+        return self
+
+    def _prepare_fit_data(self, y, X, fh) -> Dict[str, Any]:
+        """
+        Scale `y` and return the inputs of the model, with `_get_fit_data`.
+
+        The scales must be set beforehand, see `_set_y_scales`.
+        """
         y = self._scale_y(y)
 
         self.internal_y_indexes_ = y.index
         data = self._get_fit_data(y, X, fh)
+        self._series_index = self._get_series_index()
 
         self.distributions_ = data.get("distributions", {})
+        return data
+
+    def _get_inference_engine(self, init_params=None, update=False):
+        """
+        Create the inference engine configured by the hyperparameters.
 
+        Parameters
+        ----------
+        init_params : Dict[str, jnp.ndarray], optional
+            Initial values of the latent sites, passed to the engine.
+        update : bool, optional
+            If True, the engine runs `update_steps` optimization or warmup steps,
+            for `_update`. Defaults to False.
+
+        Returns
+        -------
+        MAPInferenceEngine or MCMCInferenceEngine
+            The inference engine, not yet fitted.
+        """
         rng_key = self.rng_key
         if rng_key is None:
             rng_key = jax.random.PRNGKey(24)
 
         if self.inference_method == "mcmc":
-            self.inference_engine_ = MCMCInferenceEngine(
+            num_warmup = self.mcmc_warmup
+            if update:
+                num_warmup = self._get_update_steps(num_warmup)
+            return MCMCInferenceEngine(
                 self.model,
                 num_samples=self.mcmc_samples,
-                num_warmup=self.mcmc_warmup,
+                num_warmup=num_warmup,
                 num_chains=self.mcmc_chains,
+                chain_method=self.mcmc_chain_method,
                 rng_key=rng_key,
+                init_params=init_params,
             )
-        elif self.inference_method == "map":
-            self.inference_engine_ = MAPInferenceEngine(
+        if self.inference_method == "map":
+            num_steps = self.optimizer_steps
+            if update:
+                num_steps = self._get_update_steps(num_steps)
+            return MAPInferenceEngine(
                 self.model,
                 rng_key=rng_key,
-                optimizer_factory=self.optimizer,
-                num_steps=self.optimizer_steps,
+                optimizer_factory=functools.partial(
+                    _build_optimizer, self.optimizer_name, self.optimizer_kwargs
+                ),
+                num_steps=num_steps,
+                init_params=init_params,
+                **(self.optimizer_convergence_kwargs or {}),
             )
-        else:
-            raise ValueError(f"Unknown method {self.inference_method}")
+        raise ValueError(f"Unknown method {self.inference_method}")
 
-        self.inference_engine_.infer(**data)
-        self.posterior_samples_ = self.inference_engine_.posterior_samples_
+    def _get_update_steps(self, fit_steps: int) -> int:
+        """Return the number of steps of `_update`, given the steps of `_fit`."""
+        if self.update_steps is not None:
+            return self.update_steps
+        return max(fit_steps // 10, 1)
+
+    def fit(self, y, X=None, fh=None):
+        """
+        Fit the forecaster, batching the MAP inference of its series if requested.
 
+        With `batch_fit=True` and MAP inference, the forecasters that sktime fits for
+        each series of a hierarchical `y`, in `forecasters_`, are fitted with
+        inference deferred, so that they only prepare their inputs, and the
+        optimization of all series is then run by `MAPInferenceEngine.infer_batch`.
+        Forecasters fitted by a parallel backend, in other threads or processes, run
+        their own inference instead.
+
+        Parameters
+        ----------
+        y : pd.DataFrame
+            The target variable.
+        X : pd.DataFrame, optional
+            The exogenous variables.
+        fh : ForecastingHorizon, optional
+            The forecasting horizon.
+
+        Returns
+        -------
+        self : BaseBayesianForecaster
+            The fitted forecaster.
+        """
+        if (
+            not self.batch_fit
+            or self.inference_method != "map"
+            or _DEFER_INFERENCE.get()
+        ):
+            # Inference is either not batched, or batched by the caller
+            return super().fit(y=y, X=X, fh=fh)
+
+        with _deferred_inference():
+            super().fit(y=y, X=X, fh=fh)
+
+        forecasters = [self]
+        if self._is_vectorized:
+            forecasters = list(self.forecasters_.values.flatten())
+        forecasters = [
+            forecaster
+            for forecaster in forecasters
+            if hasattr(forecaster, "_deferred_fit_data_")
+        ]
+        if forecasters:
+            self._run_deferred_inference(forecasters)
         return self
 
+    def _fit_batch(
+        self,
+        ys: List[pd.DataFrame],
+        Xs: List[Optional[pd.DataFrame]],
+        fh: Optional[ForecastingHorizon] = None,
+        params: Optional[List[dict]] = None,
+    ) -> List["BaseBayesianForecaster"]:
+        """
+        Fit clones of this forecaster to several datasets, with batched MAP inference.
+
+        The clones prepare their inputs without running inference, and the problems
+        whose inputs have the same shapes are optimized together by
+        `MAPInferenceEngine.infer_batch`. The forecaster must use MAP inference, and
+        the datasets must not be vectorized by sktime.
+
+        Parameters
+        ----------
+        ys : List[pd.DataFrame]
+            The target variable of each dataset.
+        Xs : List[pd.DataFrame or None]
+            The exogenous variables of each dataset.
+        fh : ForecastingHorizon, optional
+            The forecasting horizon passed to `fit`.
+        params : List[dict], optional
+            The hyperparameters set on the clone of each dataset, e.g.
+            `init_params`. Defaults to the hyperparameters of this forecaster.
+
+        Returns
+        -------
+        List[BaseBayesianForecaster]
+            The fitted clones, one per dataset.
+        """
+        if params is None:
+            params = [{}] * len(ys)
+
+        forecasters = []
+        with _deferred_inference():
+            for y, X, dataset_params in zip(ys, Xs, params):
+                forecaster = self.clone().set_params(**dataset_params)
+                forecasters.append(forecaster.fit(y=y, X=X, fh=fh))
+
+        self._run_deferred_inference(forecasters)
+        return forecasters
+
+    @staticmethod
+    def _run_deferred_inference(forecasters: List["BaseBayesianForecaster"]):
+        """
+        Run the deferred MAP inference of fitted forecasters with `infer_batch`.
+
+        The forecasters are grouped by the model and configuration of their engines,
+        e.g. the likelihood or the number of optimization steps, and each group is
+        optimized by the engine of its first forecaster. The forecasters must have
+        been fitted with inference deferred, see `fit` and `_fit_batch`.
+        """
+        groups: Dict[Any, List["BaseBayesianForecaster"]] = {}
+        for forecaster in forecasters:
+            key = forecaster.inference_engine_._batch_key()
+            groups.setdefault(key, []).append(forecaster)
+
+        for group in groups.values():
+            engines = group[0].inference_engine_.infer_batch(
+                [forecaster._deferred_fit_data_ for forecaster in group]
+            )
+            for forecaster, engine in zip(group, engines):
+                forecaster.inference_engine_ = engine
+                forecaster.posterior_samples_ = engine.posterior_samples_
+                del forecaster._deferred_fit_data_
+
     def _predict(self, fh, X):
         """
         Generate point forecasts for the given forecasting horizon.
@@ -280,12 +536,54 @@ class BaseBayesianForecaster(BaseForecaster):
         pd.DataFrame
             Point forecasts for the forecasting horizon.
         """
+        if self.inference_method == "map":
+            return self._predict_mean(fh=fh, X=X)
+
         predictive_samples = self.predict_samples(fh=fh, X=X)
         y_pred = predictive_samples.mean(axis=1).to_frame(self._y.columns[0])
 
         return y_pred
 
-    def predict_all_sites(self, fh: ForecastingHorizon, X: pd.DataFrame = None):
+    def _predict_mean(self, fh: ForecastingHorizon, X: Optional[pd.DataFrame] = None):
+        """
+        Return the mean of the observations given the MAP parameters.
+
+        For MAP inference, this is the mean of the posterior predictive distribution,
+        computed with one evaluation of the model instead of sampling.
+
+        Parameters
+        ----------
+        fh : ForecastingHorizon
+            Forecasting horizon.
+        X : pd.DataFrame, optional
+            Exogenous variables.
+
+        Returns
+        -------
+        pd.DataFrame
+            Point forecasts for the forecasting horizon.
+        """
+        if not isinstance(fh, ForecastingHorizon):
+            fh = self._check_fh(fh)
+
+        fh_as_index = self.fh_to_index(fh)
+        predict_data = self._get_predict_data(X=X, fh=fh)
+
+        mean = self.inference_engine_.predict_mean(**predict_data)
+        y_pred = pd.DataFrame(
+            data=np.asarray(mean).T.reshape(-1),
+            columns=[self._y.columns[0]],
+            index=self.periodindex_to_multiindex(fh_as_index),
+        ).sort_index()
+
+        return self._inv_scale_y(y_pred)
+
+    def predict_all_sites(
+        self,
+        fh: ForecastingHorizon,
+        X: pd.DataFrame = None,
+        return_sites: Optional[List[str]] = None,
+    ):
         """
         Predicts the values for all sites.
 
@@ -299,6 +597,10 @@ class BaseBayesianForecaster(BaseForecaster):
             the future.
         X : array-like, optional
             The input features used for prediction. Defaults to None.
+        return_sites : List[str], optional
+            The sites to predict, e.g. `["obs"]`. Other sites are not returned by the
+            sampler, which saves memory and transfers. Defaults to None (the
+            observed and deterministic sites).
 
         Returns
         -------
@@ -307,10 +609,14 @@ class BaseBayesianForecaster(BaseForecaster):
             names as columns and the forecast horizon as the index.
         """
         if self._is_vectorized:
-            return self._vectorize_predict_method("predict_all_sites", X=X, fh=fh)
+            return self._vectorize_predict_method(
+                "predict_all_sites", X=X, fh=fh, return_sites=return_sites
+            )
 
         fh_as_index = self.fh_to_index(fh)
-        predictive_samples_ = self._get_predictive_samples_dict(fh=fh, X=X)
+        predictive_samples_ = self._get_predictive_samples_dict(
+            fh=fh, X=X, return_sites=return_sites
+        )
 
         out = pd.DataFrame(
             data={
@@ -323,7 +629,10 @@ class BaseBayesianForecaster(BaseForecaster):
         return self._inv_scale_y(out)
 
     def _get_predictive_samples_dict(
-        self, fh: ForecastingHorizon, X: Optional[pd.DataFrame] = None
+        self,
+        fh: ForecastingHorizon,
+        X: Optional[pd.DataFrame] = None,
+        return_sites: Optional[List[str]] = None,
     ) -> dict[str, jnp.ndarray]:
         """
         Return a dictionary of predictive samples for each time series.
@@ -334,6 +643,8 @@ class BaseBayesianForecaster(BaseForecaster):
             The forecasting horizon specifying the time points to forecast.
         X : array-like, optional (default=None)
             The input features for the time series forecasting model.
+        return_sites : list of str, optional (default=None)
+            The sites to sample. If None, the observed and deterministic sites.
 
         Returns
         -------
@@ -342,15 +653,37 @@ class BaseBayesianForecaster(BaseForecaster):
             data. The keys are the names of the time series, and the values are NumPy
             arrays representing the predictive samples.
         """
+        batched_samples = getattr(self, "_batched_samples", None)
+        if batched_samples is not None:
+            if return_sites is None:
+                return batched_samples
+            if set(return_sites) <= set(batched_samples):
+                return {site: batched_samples[site] for site in return_sites}
+
         if not isinstance(fh, ForecastingHorizon):
             fh = self._check_fh(fh)
 
+        cache_key = None
+        if self._prediction_cache is not None:
+            cache_key = prediction_cache_key(
+                self.fh_to_index(fh), X, self.inference_engine_.rng_key
+            )
+            predictive_samples_ = self._prediction_cache.get(cache_key, return_sites)
+            if predictive_samples_ is not None:
+                return predictive_samples_
+
         predict_data = self._get_predict_data(X=X, fh=fh)
 
-        predictive_samples_ = self.inference_engine_.predict(**predict_data)
+        predictive_samples_ = self.inference_engine_.predict(
+            return_sites=return_sites, **predict_data
+        )
+        if cache_key is not None:
+            self._prediction_cache.put(cache_key, predictive_samples_, return_sites)
         return predictive_samples_
 
-    def predict_all_sites_samples(self, fh, X=None):
+    def predict_all_sites_samples(
+        self, fh, X=None, return_sites=None, long_format=False
+    ):
         """
         Predicts samples for all sites.
 
@@ -361,49 +694,59 @@ class BaseBayesianForecaster(BaseForecaster):
             horizons.
         X : array-like, optional
             The input features for prediction. Defaults to None.
+        return_sites : list of str, optional
+            The sites to sample. Defaults to None (the observed and deterministic
+            sites).
+        long_format : bool, optional
+            If True, return a long DataFrame with a default index, one column per
+            index level ("sample" and the levels of the forecast index), a
+            categorical "site" column and a "value" column. Defaults to False.
 
         Returns
         -------
         pandas.DataFrame
-            A DataFrame containing the predicted samples for all sites.
+            A DataFrame containing the predicted samples for all sites. Unless
+            `long_format`, it is indexed by the sample and the forecast index, with
+            one column per site.
         """
         if self._is_vectorized:
             return self._vectorize_predict_method(
-                "predict_all_sites_samples", X=X, fh=fh
+                "predict_all_sites_samples",
+                X=X,
+                fh=fh,
+                return_sites=return_sites,
+                long_format=long_format,
             )
 
-        predictive_samples_ = self._get_predictive_samples_dict(fh=fh, X=X)
+        predictive_samples_ = self._get_predictive_samples_dict(
+            fh=fh, X=X, return_sites=return_sites
+        )
 
         fh_as_index = self.fh_to_index(fh)
-        dfs = []
-        for site, data in predictive_samples_.items():
-
-            idxs = self.periodindex_to_multiindex(fh_as_index)
-
-            samples_idx = np.arange(data.shape[0])
-
-            def _coerce_to_tuple(x):
-                if isinstance(x, tuple):
-                    return x
-                return (x,)
+        n_samples = next(iter(predictive_samples_.values())).shape[0]
+        idx = _prepend_sample_level(
+            self.periodindex_to_multiindex(fh_as_index), n_samples
+        )
+        values = {
+            site: np.asarray(data).reshape(-1)
+            for site, data in predictive_samples_.items()
+        }
 
-            tuples = [
-                (sample_i, *_coerce_to_tuple(idx))
-                for sample_i, idx in itertools.product(samples_idx, idxs)
-            ]
-            # Set samples_idx as level 0 of idx
-            idx = pd.MultiIndex.from_tuples(tuples, names=["sample", *idxs.names])
+        if not long_format:
+            return pd.DataFrame(data=values, index=idx)
 
-            dfs.append(
-                pd.DataFrame(
-                    data={site: data.flatten()},
-                    index=idx,
-                )
+        sites = list(values)
+        columns = {
+            name if name is not None else f"level_{level}": np.tile(
+                idx.get_level_values(level), len(sites)
             )
-
-        df = pd.concat(dfs, axis=1)
-
-        return df
+            for level, name in enumerate(idx.names)
+        }
+        columns["site"] = pd.Categorical.from_codes(
+            np.repeat(np.arange(len(sites)), len(idx)), categories=sites
+        )
+        columns["value"] = np.concatenate(list(values.values()))
+        return pd.DataFrame(columns)
 
     def predict_samples(self, fh: ForecastingHorizon, X: Optional[pd.DataFrame] = None):
         """
@@ -426,7 +769,9 @@ class BaseBayesianForecaster(BaseForecaster):
 
         fh_as_index = self.fh_to_index(fh)
 
-        predictive_samples_ = self._get_predictive_samples_dict(fh=fh, X=X)
+        predictive_samples_ = self._get_predictive_samples_dict(
+            fh=fh, X=X, return_sites=["obs"]
+        )
 
         observation_site = predictive_samples_["obs"]
         n_samples = predictive_samples_["obs"].shape[0]
@@ -461,11 +806,43 @@ class BaseBayesianForecaster(BaseForecaster):
         if self.scale is not None:
             self._scale = self.scale
         elif y.index.nlevels == 1:
-            self._scale = float(y.abs().max().values[0])
+            # Kept as a NumPy scalar so that it is traced, and not compiled as a
+            # constant, by the inference engine
+            self._scale = np.float64(y.abs().max().values[0])
         else:
-            self._scale = y.groupby(level=list(range(y.index.nlevels - 1))).agg(
-                lambda x: np.abs(x).max()
+            self._scale = y.abs().groupby(level=list(range(y.index.nlevels - 1))).max()
+
+        if np.ndim(self._scale) > 0:
+            # Scales of each series, looked up by position when (inverse) scaling
+            self._scale_index = self._scale.index
+            self._scale_values = np.asarray(self._scale.values).reshape(
+                (len(self._scale_index), -1)
+            )
+
+    def _get_scale_for_each_obs(self, index: pd.MultiIndex) -> np.ndarray:
+        """
+        Return the scale of the series of each row of `index`.
+
+        Each distinct series is looked up once in the fitted scales, and the result
+        is broadcast to the rows with their integer codes.
+
+        Parameters
+        ----------
+        index : pd.MultiIndex
+            The index of the data to (inverse) scale, with time as last level.
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape (len(index), 1) with the scale of each row.
+        """
+        series_codes, series = index.droplevel(-1).factorize()
+        positions = self._scale_index.get_indexer(series)
+        if (positions < 0).any():
+            raise KeyError(
+                f"No scale was fitted for series {list(series[positions < 0])}."
             )
+        return self._scale_values[positions][series_codes]
 
     def _scale_y(self, y: pd.DataFrame) -> pd.DataFrame:
         """
@@ -487,8 +864,8 @@ class BaseBayesianForecaster(BaseForecaster):
         If scaling is skipped, the original DataFrame is returned.
         If the scaling factor is a float, each value in the DataFrame is divided by the
         scaling factor.
-        If the scaling factor is a DataFrame, the scaling factor for each observation is
-        determined based on the index of the input DataFrame `y`.
+        Otherwise, the scaling factor for each observation is determined based on the
+        series identifiers of the index of the input DataFrame `y`.
         The input DataFrame `y` is then divided by the corresponding scaling factor for
         each observation.
         This method assumes that the scaling factor has already been computed and stored
@@ -497,11 +874,10 @@ class BaseBayesianForecaster(BaseForecaster):
         if self.should_skip_scaling:
             return y
 
-        if isinstance(self._scale, float):
+        if np.ndim(self._scale) == 0:
             return y / self._scale
 
-        scale_for_each_obs = self._scale.loc[y.index.droplevel(-1)].values
-        return y / scale_for_each_obs
+        return y / self._get_scale_for_each_obs(y.index)
 
     def _inv_scale_y(self, y: pd.DataFrame) -> pd.DataFrame:
         """
@@ -523,8 +899,8 @@ class BaseBayesianForecaster(BaseForecaster):
         If scaling is skipped, the original DataFrame is returned.
         If the scaling factor is a float, each value in the DataFrame is multiplied by
         the scaling factor.
-        If the scaling factor is a DataFrame, the scaling factor for each observation
-        is determined based on the index of the input DataFrame `y`.
+        Otherwise, the scaling factor for each observation is determined based on the
+        series identifiers of the index of the input DataFrame `y`.
         The input DataFrame `y` is then multiplied by the corresponding scaling factor
         for each observation.
         This method assumes that the scaling factor has already been computed and stored
@@ -533,10 +909,10 @@ class BaseBayesianForecaster(BaseForecaster):
         if self.should_skip_scaling:
             return y
 
-        if isinstance(self._scale, float):
+        if np.ndim(self._scale) == 0:
             return y * self._scale
-        scale_for_each_obs = self._scale.loc[y.index.droplevel(-1)].values
-        return y * scale_for_each_obs
+
+        return y * self._get_scale_for_each_obs(y.index)
 
     def _predict_quantiles(
         self,
@@ -564,21 +940,29 @@ class BaseBayesianForecaster(BaseForecaster):
         if isinstance(alpha, float):
             alpha = [alpha]
 
-        forecast_samples_ = self.predict_samples(X=X, fh=fh)
-
-        var_names = self._get_varnames()
-
-        int_idx = pd.MultiIndex.from_product([var_names, alpha])
+        fh_as_index = self.fh_to_index(fh)
+        predictive_samples_ = self._get_predictive_samples_dict(
+            fh=fh, X=X, return_sites=["obs"]
+        )
 
-        quantiles = forecast_samples_.quantile(alpha, axis=1).T
-        quantiles.columns = int_idx
+        # Quantiles are computed on the samples array, before any DataFrame is
+        # built. Scaling commutes with quantiles, since scales are positive.
+        quantiles = jnp.quantile(predictive_samples_["obs"], jnp.asarray(alpha), axis=0)
+        quantiles = pd.DataFrame(
+            data=np.asarray(quantiles).T.reshape((-1, len(alpha))),
+            columns=pd.MultiIndex.from_product([self._get_varnames(), alpha]),
+            index=self.periodindex_to_multiindex(fh_as_index),
+        ).sort_index()
 
-        return quantiles
+        return self._inv_scale_y(quantiles)
 
     def periodindex_to_multiindex(self, periodindex: pd.PeriodIndex) -> pd.MultiIndex:
         """
         Convert a PeriodIndex to a MultiIndex.
 
+        The index is the product of the series identifiers, computed at fit time, and
+        `periodindex`, built from integer codes.
+
         Parameters
         ----------
         periodindex: pd.PeriodIndex
@@ -589,9 +973,26 @@ class BaseBayesianForecaster(BaseForecaster):
         pd.MultiIndex
             Converted MultiIndex.
         """
-        if self._y.index.nlevels == 1:
+        if self._series_index is None:
             return periodindex
 
+        return _series_time_product(
+            self._series_index, periodindex, self.internal_y_indexes_.names
+        )
+
+    def _get_series_index(self) -> Optional[pd.MultiIndex]:
+        """
+        Return the identifiers of the series to forecast, computed once at fit time.
+
+        Returns
+        -------
+        pd.MultiIndex or None
+            The series identifiers, after `_filter_series_tuples`, or None if `y`
+            has a single series.
+        """
+        if self.internal_y_indexes_.nlevels == 1:
+            return None
+
         series_id_tuples = self.internal_y_indexes_.droplevel(-1).unique().tolist()
 
         # Check if base_levels 0 is a iterable:
@@ -600,12 +1001,8 @@ class BaseBayesianForecaster(BaseForecaster):
 
         series_id_tuples = self._filter_series_tuples(series_id_tuples)
 
-        return pd.Index(
-            map(
-                lambda x: (*x[0], x[1]),
-                itertools.product(series_id_tuples, periodindex),
-            ),
-            name=self.internal_y_indexes_.names,
+        return pd.MultiIndex.from_tuples(
+            series_id_tuples, names=self.internal_y_indexes_.names[:-1]
         )
 
     def _filter_series_tuples(self, levels: List[Tuple]) -> List[Tuple]:
@@ -707,8 +1104,69 @@ class BaseBayesianForecaster(BaseForecaster):
         """
         return list(self.posterior_samples_.keys())
 
+    def _get_predictive_samples_batch(
+        self,
+        forecasters: List["BaseBayesianForecaster"],
+        Xs: List[Optional[pd.DataFrame]],
+        fh: ForecastingHorizon,
+        return_sites: Optional[List[str]] = None,
+    ) -> List[Dict[str, jnp.ndarray]]:
+        """
+        Return the predictive samples of several fitted forecasters.
+
+        Samples found in the prediction cache of a forecaster are reused. The other
+        forecasters whose parameters and inputs have the same structure and shapes
+        are evaluated in one vectorized program, see `InferenceEngine.predict_batch`.
+
+        Parameters
+        ----------
+        forecasters : List[BaseBayesianForecaster]
+            The fitted forecasters, usually the ones of `forecasters_`.
+        Xs : List[pd.DataFrame or None]
+            The exogenous variables of each forecaster.
+        fh : ForecastingHorizon
+            The forecasting horizon.
+        return_sites : List[str], optional
+            The sites to sample. Defaults to the observed and deterministic sites.
+
+        Returns
+        -------
+        List[Dict[str, jnp.ndarray]]
+            The predictive samples of each forecaster.
+        """
+        samples: List[Optional[Dict[str, jnp.ndarray]]] = [None] * len(forecasters)
+        cache_keys: List[Any] = [None] * len(forecasters)
+        kwargs_list = []
+        for i, (forecaster, _X) in enumerate(zip(forecasters, Xs)):
+            _fh = fh
+            if not isinstance(_fh, ForecastingHorizon):
+                _fh = forecaster._check_fh(_fh)
+            cache = forecaster._prediction_cache
+            if cache is not None:
+                rng_key = forecaster.inference_engine_.rng_key
+                cache_keys[i] = prediction_cache_key(
+                    forecaster.fh_to_index(_fh), _X, rng_key
+                )
+                samples[i] = cache.get(cache_keys[i], return_sites)
+            if samples[i] is None:
+                kwargs_list.append(forecaster._get_predict_data(X=_X, fh=_fh))
+
+        missing = [i for i, samples_ in enumerate(samples) if samples_ is None]
+        predictions = InferenceEngine.predict_batch(
+            [forecasters[i].inference_engine_ for i in missing],
+            kwargs_list,
+            return_sites=return_sites,
+        )
+        for i, predictive_samples_ in zip(missing, predictions):
+            samples[i] = predictive_samples_
+            if cache_keys[i] is not None:
+                forecasters[i]._prediction_cache.put(
+                    cache_keys[i], predictive_samples_, return_sites
+                )
+        return samples
+
     def _vectorize_predict_method(
-        self, methodname: str, X: pd.DataFrame, fh: ForecastingHorizon
+        self, methodname: str, X: pd.DataFrame, fh: ForecastingHorizon, **kwargs
     ):
         """
         Handle sktime's "vectorization" of timeseries.
@@ -725,6 +1183,8 @@ class BaseBayesianForecaster(BaseForecaster):
             The input data.
         fh : ForecastingHorizon
             The forecasting horizon.
+        **kwargs
+            Additional keyword arguments passed to the method.
 
         Returns
         -------
@@ -732,21 +1192,35 @@ class BaseBayesianForecaster(BaseForecaster):
             The output of the method.
         """
         if not self._is_vectorized:
-            return getattr(self, methodname)(X=X, fh=fh)
+            return getattr(self, methodname)(X=X, fh=fh, **kwargs)
+
+        forecasters = list(self.forecasters_.iloc[:, 0])
+        X_by_series = _split_by_series(X)
+        Xs = [X_by_series.get(_as_tuple(idx), None) for idx in self.forecasters_.index]
+        if X is not None:
+            # Series without exogenous data get an empty frame, as with a .loc
+            empty_X = X.iloc[:0].droplevel(list(range(X.index.nlevels - 1)))
+            Xs = [empty_X if _X is None else _X for _X in Xs]
+
+        # Only the observations are drawn, unless the method returns all sites or the
+        # caller asked for specific ones
+        return_sites = kwargs.get("return_sites")
+        if return_sites is None and methodname not in _ALL_SITES_METHODS:
+            return_sites = ["obs"]
+
+        # The predictive samples of all series are drawn at once, and each forecaster
+        # formats its own, see _get_predictive_samples_dict
+        batched_samples = self._get_predictive_samples_batch(
+            forecasters, Xs, fh, return_sites
+        )
 
         outs = []
-        for idx, data in self.forecasters_.iterrows():
-            forecaster = data[0]
-
-            if X is None:
-                _X = None
-            else:
-                _X = get_multiindex_loc(X, [idx])
-                # Keep only index level -1
-                for _ in range(_X.index.nlevels - 1):
-                    _X = _X.droplevel(0)
-            out = getattr(forecaster, methodname)(X=_X, fh=fh)
-            outs.append(out)
+        for forecaster, _X, samples in zip(forecasters, Xs, batched_samples):
+            forecaster._batched_samples = samples
+            try:
+                outs.append(getattr(forecaster, methodname)(X=_X, fh=fh, **kwargs))
+            finally:
+                del forecaster._batched_samples
         return pd.concat(outs, axis=0)
 
 
@@ -877,3 +1351,210 @@ class ExogenousEffectMixin:
         return {
             k: v[1] for k, v in self._exogenous_effects_and_columns.items() if len(v[0])
         }
+
+
+@contextlib.contextmanager
+def _deferred_inference():
+    """Defer the inference of the forecasters fitted in the context, see `_fit`."""
+    token = _DEFER_INFERENCE.set(True)
+    try:
+        yield
+    finally:
+        _DEFER_INFERENCE.reset(token)
+
+
+def _build_optimizer(
+    optimizer_name: Optional[str], optimizer_kwargs: Optional[dict]
+) -> numpyro.optim._NumPyroOptim:
+    """Build a numpyro optimizer from its name and keyword arguments.
+
+    Parameters
+    ----------
+    optimizer_name : str, optional
+        The name of a optimizer in the `numpyro.optim` module, or a name starting with
+        "optax" for Adam with a cosine decay schedule. Defaults to "Adam".
+    optimizer_kwargs : dict, optional
+        Keyword arguments passed to the optimizer (or to the schedule, for "optax").
+        Defaults to `{"step_size": 1e-4}`.
+
+    Returns
+    -------
+    _NumPyroOptim
+        An instance of the optimizer.
+    """
+    if optimizer_kwargs is None:
+        optimizer_kwargs = {"step_size": 1e-4}
+    if optimizer_name is None:
+        optimizer_name = "Adam"
+
+    if optimizer_name.startswith("optax"):
+
+        import optax
+        from numpyro.optim import optax_to_numpyro
+
+        scheduler = optax.cosine_decay_schedule(**optimizer_kwargs)
+
+        opt = optax_to_numpyro(
+            optax.chain(
+                optax.scale_by_adam(),
+                optax.scale_by_schedule(scheduler),
+                optax.scale(-1.0),
+            )
+        )
+        return opt
+
+    return getattr(numpyro.optim, optimizer_name)(**optimizer_kwargs)
+
+
+def _pad_changepoint_coefficients(
+    init_params: Dict[str, jnp.ndarray],
+    previous_n_changepoints: Optional[List[int]],
+    n_changepoints: Optional[List[int]],
+) -> Dict[str, jnp.ndarray]:
+    """
+    Pad the changepoint coefficients of each series with zeros for new changepoints.
+
+    When the trend model is initialized again with more observations, the
+    changepoints of each series are kept and new ones are appended to them, so the
+    coefficients of the previous fit remain valid for the first changepoints.
+
+    Parameters
+    ----------
+    init_params : Dict[str, jnp.ndarray]
+        The point estimates of the previous fit.
+    previous_n_changepoints : List[int], optional
+        The number of changepoints of each series in the previous fit, or None if
+        the trend model has no changepoints.
+    n_changepoints : List[int], optional
+        The number of changepoints of each series after the new observations.
+
+    Returns
+    -------
+    Dict[str, jnp.ndarray]
+        `init_params`, with the padded `changepoint_coefficients`. Returned as is if
+        the changepoints are unchanged or cannot be matched.
+    """
+    coefficients = init_params.get("changepoint_coefficients")
+    if (
+        coefficients is None
+        or previous_n_changepoints is None
+        or n_changepoints is None
+        or len(previous_n_changepoints) != len(n_changepoints)
+        or np.shape(coefficients)[-1] != sum(previous_n_changepoints)
+        or any(new < old for old, new in zip(previous_n_changepoints, n_changepoints))
+    ):
+        return init_params
+
+    blocks = np.split(
+        np.asarray(coefficients), np.cumsum(previous_n_changepoints)[:-1], axis=-1
+    )
+    padded = [
+        np.pad(block, [(0, 0)] * (block.ndim - 1) + [(0, new - old)])
+        for block, old, new in zip(blocks, previous_n_changepoints, n_changepoints)
+    ]
+    return {
+        **init_params,
+        "changepoint_coefficients": jnp.asarray(np.concatenate(padded, axis=-1)),
+    }
+
+
+def _as_tuple(x) -> tuple:
+    """Return `x` as a tuple, wrapping it if it is not one."""
+    if isinstance(x, tuple):
+        return x
+    return (x,)
+
+
+def _split_by_series(X: Optional[pd.DataFrame]) -> Dict[tuple, pd.DataFrame]:
+    """
+    Split a multiindex DataFrame by series, in a single pass.
+
+    Parameters
+    ----------
+    X : pd.DataFrame, optional
+        DataFrame whose last index level is time.
+
+    Returns
+    -------
+    Dict[tuple, pd.DataFrame]
+        The rows of each series, indexed by time only, keyed by the tuple of series
+        identifiers. Empty if `X` is None.
+    """
+    if X is None:
+        return {}
+
+    levels = list(range(X.index.nlevels - 1))
+    return {
+        _as_tuple(series): X_series.droplevel(levels)
+        for series, X_series in X.groupby(level=levels, sort=False)
+    }
+
+
+def _series_time_product(
+    series_index: pd.Index, periodindex: pd.Index, names: List[str]
+) -> pd.MultiIndex:
+    """
+    Return the product of the series identifiers and `periodindex`, as a MultiIndex.
+
+    The index is built from integer codes, without creating one tuple per entry.
+
+    Parameters
+    ----------
+    series_index : pd.Index
+        The series identifiers, possibly a MultiIndex.
+    periodindex : pd.Index
+        The time index.
+    names : list of str
+        The names of the levels of the returned index, with time last.
+
+    Returns
+    -------
+    pd.MultiIndex
+        The index with the levels of `series_index` and `periodindex`, series-major.
+    """
+    if not isinstance(series_index, pd.MultiIndex):
+        series_index = pd.MultiIndex.from_arrays([series_index])
+
+    n_series, n_timepoints = len(series_index), len(periodindex)
+    return pd.MultiIndex(
+        levels=[*series_index.levels, periodindex],
+        codes=[
+            *(np.repeat(codes, n_timepoints) for codes in series_index.codes),
+            np.tile(np.arange(n_timepoints), n_series),
+        ],
+        names=names,
+        verify_integrity=False,
+    )
+
+
+def _prepend_sample_level(index: pd.Index, n_samples: int) -> pd.MultiIndex:
+    """
+    Return the product of the sample numbers and `index`, as a MultiIndex.
+
+    The index is built from integer codes, without creating one tuple per entry.
+
+    Parameters
+    ----------
+    index : pd.Index
+        The forecast index, possibly a MultiIndex.
+    n_samples : int
+        The number of samples.
+
+    Returns
+    -------
+    pd.MultiIndex
+        The index with levels "sample" and the levels of `index`, sample-major.
+    """
+    if not isinstance(index, pd.MultiIndex):
+        index = pd.MultiIndex.from_arrays([index])
+
+    samples = np.arange(n_samples)
+    return pd.MultiIndex(
+        levels=[samples, *index.levels],
+        codes=[
+            np.repeat(samples, len(index)),
+            *(np.tile(codes, n_samples) for codes in index.codes),
+        ],
+        names=["sample", *index.names],
+        verify_integrity=False,
+    )
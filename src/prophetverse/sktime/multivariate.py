@@ -1,6 +1,7 @@
 """Contains the implementation of the HierarchicalProphet forecaster."""
 
-from typing import List, Optional, Tuple
+import copy
+from typing import List, Optional, Tuple, Union
 
 import jax.numpy as jnp
 import numpy as np
@@ -10,8 +11,13 @@ from sktime.forecasting.base import ForecastingHorizon
 from sktime.transformations.base import BaseTransformer
 from sktime.transformations.hierarchical.aggregate import Aggregator
 
+from prophetverse.effects.linear import LinearEffect
 from prophetverse.models import multivariate_model
-from prophetverse.sktime.base import BaseBayesianForecaster, ExogenousEffectMixin
+from prophetverse.sktime.base import (
+    BaseBayesianForecaster,
+    ExogenousEffectMixin,
+    _series_time_product,
+)
 from prophetverse.trend.piecewise import (
     PiecewiseLinearTrend,
     PiecewiseLogisticTrend,
@@ -79,6 +85,42 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
         Concentration parameter for the correlation matrix.
     rng_key : jax.random.PRNGKey, optional, default=None
         Random number generator key.
+    mcmc_chain_method : str, optional, default="parallel"
+        How to run the MCMC chains. Either "parallel" (one chain per CPU device),
+        "vectorized" or "sequential".
+    optimizer_convergence_kwargs : dict, optional, default=None
+        Criteria to stop the optimization before `optimizer_steps`, e.g.
+        `{"rtol": 1e-6, "window": 1000}`. Accepted keys are "rtol",
+        "gradient_norm_tol", "max_time" and "window", see `MAPInferenceEngine`.
+    covariance_rank : int, optional, default=None
+        If given, the likelihood uses a low-rank plus diagonal covariance, with a
+        low-rank factor of this rank, instead of a full covariance with LKJ prior.
+        Its cost grows linearly with the number of series, which makes it suited
+        to large hierarchies. `correlation_matrix_concentration` is then unused.
+    expand_features_per_series : bool, optional, default=True
+        If True, each feature that is not shared is expanded into one column per
+        series, named "<feature>_dup_<series>", which is zero for the other series.
+        If False, the features keep one column, and the effects of the features that
+        are not shared are computed with one set of parameters per series, e.g. a
+        `LinearEffect` has `(n_series, 1, n_features)` coefficients, stored in the
+        order of the expanded columns so that both layouts start from the same
+        parameters. This gives the same model with n_series times less memory, but
+        effects must then match either only shared or only non-shared features,
+        and only `LinearEffect` may match non-shared features: other effects would
+        get one set of parameters per series, and so would not be the same model.
+    prediction_cache_max_bytes : int, optional, default=None
+        If given, posterior predictive samples are cached, up to this size in bytes,
+        and reused by `predict_samples`, `predict_quantiles`, `predict_interval` and
+        `predict_all_sites` for the same `fh`, `X` and random key.
+    update_steps : int, optional, default=None
+        Number of optimization steps (MAP) or warmup steps (MCMC) run by `update`,
+        starting from the parameters of the previous fit. If None, a tenth of
+        `optimizer_steps` or `mcmc_warmup`.
+    init_params : dict, optional, default=None
+        Initial values of the latent sites, e.g. the `posterior_samples_` of a
+        forecaster fitted on overlapping data, so that sweeps and backtests converge
+        in fewer steps. Sites that are missing, or whose value has another shape,
+        are initialized to their prior mean.
     """
 
     _tags = {
@@ -126,6 +168,13 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
         noise_scale=0.05,
         correlation_matrix_concentration=1.0,
         rng_key=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        covariance_rank=None,
+        expand_features_per_series=True,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
     ):
 
         self.changepoint_interval = changepoint_interval
@@ -137,8 +186,10 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
         self.capacity_prior_loc = capacity_prior_loc
         self.trend = trend
         self.shared_features = shared_features
+        self.expand_features_per_series = expand_features_per_series
         self.feature_transformer = feature_transformer
         self.correlation_matrix_concentration = correlation_matrix_concentration
+        self.covariance_rank = covariance_rank
 
         super().__init__(
             rng_key=rng_key,
@@ -151,6 +202,11 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
             mcmc_chains=mcmc_chains,
             default_effect=default_effect,
             exogenous_effects=exogenous_effects,
+            mcmc_chain_method=mcmc_chain_method,
+            optimizer_convergence_kwargs=optimizer_convergence_kwargs,
+            prediction_cache_max_bytes=prediction_cache_max_bytes,
+            update_steps=update_steps,
+            init_params=init_params,
         )
 
         self.model = multivariate_model  # type: ignore[method-assign]
@@ -171,8 +227,12 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
             raise ValueError("capacity_prior_loc must be greater than 0.")
         if self.offset_prior_scale <= 0:
             raise ValueError("offset_prior_scale must be greater than 0.")
+        if self.update_steps is not None and self.update_steps <= 0:
+            raise ValueError("update_steps must be greater than 0.")
         if self.correlation_matrix_concentration <= 0:
             raise ValueError("correlation_matrix_concentration must be greater than 0.")
+        if self.covariance_rank is not None and self.covariance_rank <= 0:
+            raise ValueError("covariance_rank must be greater than 0.")
 
         if self.trend not in ["linear", "logistic"]:
             raise ValueError('trend must be either "linear" or "logistic".')
@@ -264,13 +324,16 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
                 X.columns.difference(shared_features).to_list()
             ).fit(X)
             X = X.loc[y_bottom.index]
-            X = self.expand_columns_transformer_.transform(X)
+            if self.expand_features_per_series:
+                X = self.expand_columns_transformer_.transform(X)
 
             self._set_custom_effects(feature_names=X.columns)
+            self._per_series_effects = self._split_per_series_effects()
             exogenous_data = self._get_exogenous_data_array(loc_bottom_series(X))
 
         else:
             self._exogenous_effects_and_columns = {}
+            self._per_series_effects = ()
             exogenous_data = {}
 
         self.fit_and_predict_data_ = {
@@ -279,6 +342,8 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
             "correlation_matrix_concentration": self.correlation_matrix_concentration,
             "noise_scale": self.noise_scale,
             "is_single_series": self.n_series == 1,
+            "covariance_rank": self.covariance_rank,
+            "per_series_effects": self._per_series_effects,
         }
 
         return dict(
@@ -288,6 +353,74 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
             **self.fit_and_predict_data_,
         )
 
+    def _split_per_series_effects(self) -> Tuple[str, ...]:
+        """
+        Find the effects to compute with one set of parameters per series.
+
+        Only used when `expand_features_per_series` is False. The features that are
+        not shared are the ones matched by `expand_columns_transformer_`. If the
+        default effect matches both kinds of features, the shared ones are moved to
+        a copy of it, with id "shared_exogenous_variables_effect".
+
+        Returns
+        -------
+        Tuple[str, ...]
+            The names of the effects whose features are not shared.
+
+        Raises
+        ------
+        ValueError
+            If an effect other than the default one matches both shared and
+            non-shared features, or if an effect that is not a `LinearEffect`
+            matches non-shared features.
+        """
+        if self.expand_features_per_series:
+            return ()
+
+        # In the order of the expanded columns, so that the per-series coefficients
+        # are initialized as in the expanded layout, see LinearEffect
+        per_series_features = pd.Index(
+            list(self.expand_columns_transformer_.matched_columns_)
+        )
+        effects_and_columns = {}
+        per_series_effects = []
+        for name, (columns, effect) in self._exogenous_effects_and_columns.items():
+            is_per_series = columns.isin(per_series_features)
+            if is_per_series.any() and not isinstance(effect, LinearEffect):
+                raise ValueError(
+                    f"Effect {name} of type {type(effect).__name__} matches "
+                    f"non-shared features {columns[is_per_series].to_list()}. Only "
+                    "LinearEffect can match non-shared features when "
+                    "expand_features_per_series is False."
+                )
+            if not is_per_series.any():
+                effects_and_columns[name] = (columns, effect)
+                continue
+
+            per_series_columns = per_series_features.intersection(columns, sort=False)
+            per_series_effects.append(name)
+            if is_per_series.all():
+                effects_and_columns[name] = (per_series_columns, effect)
+                continue
+
+            if name != "exogenous_variables_effect":
+                raise ValueError(
+                    f"Effect {name} matches both shared features "
+                    f"{columns[~is_per_series].to_list()} and non-shared features "
+                    f"{columns[is_per_series].to_list()}, which is not supported "
+                    "when expand_features_per_series is False."
+                )
+            shared_effect = copy.copy(effect)
+            shared_effect.id = "shared_exogenous_variables_effect"
+            effects_and_columns[name] = (per_series_columns, effect)
+            effects_and_columns[shared_effect.id] = (
+                columns[~is_per_series],
+                shared_effect,
+            )
+
+        self._exogenous_effects_and_columns = effects_and_columns
+        return tuple(per_series_effects)
+
     def _get_exogenous_matrix_from_X(self, X: pd.DataFrame) -> jnp.ndarray:
         """
         Convert the exogenous variables to a NumPyro matrix.
@@ -326,6 +459,58 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
 
         return self.aggregator_.transform(samples)
 
+    def _predict_quantiles(
+        self,
+        fh: ForecastingHorizon,
+        X: Optional[pd.DataFrame],
+        alpha: Union[float, List[float]],
+    ) -> pd.DataFrame:
+        """
+        Generate quantile forecasts for the bottom series and their aggregates.
+
+        The quantiles of the aggregates are not sums of quantiles, so they are
+        computed from the aggregated samples. The samples are scaled and aggregated
+        as an array, with a single matrix product, and the DataFrame is built once
+        from the quantiles.
+        """
+        if isinstance(alpha, float):
+            alpha = [alpha]
+
+        fh_as_index = self.fh_to_index(fh)
+        predictive_samples_ = self._get_predictive_samples_dict(
+            fh=fh, X=X, return_sites=["obs"]
+        )
+        aggregation_matrix = self._get_aggregation_matrix(fh_as_index[:1])
+
+        # (n_samples, ..., n_timepoints, n_bottom_series) -> (n_samples,
+        # n_timepoints, n_bottom_series), then (n_samples, n_series, n_timepoints)
+        obs = predictive_samples_["obs"]
+        obs = jnp.reshape(obs, (obs.shape[0], -1, obs.shape[-1]))
+        samples = jnp.einsum(
+            "ab,ntb->nat", jnp.asarray(aggregation_matrix.values, obs.dtype), obs
+        )
+        quantiles = jnp.quantile(samples, jnp.asarray(alpha), axis=0)
+
+        index = aggregation_matrix.index
+        if index.nlevels > 1:
+            index = _series_time_product(
+                index.droplevel(-1), fh_as_index, self.internal_y_indexes_.names
+            )
+        else:
+            index = fh_as_index
+
+        return pd.DataFrame(
+            data=np.asarray(quantiles).transpose((1, 2, 0)).reshape((-1, len(alpha))),
+            columns=pd.MultiIndex.from_product([self._get_varnames(), alpha]),
+            index=index,
+        ).sort_index()
+
+    def _predict_mean(self, fh: ForecastingHorizon, X: Optional[pd.DataFrame] = None):
+        """Return the mean forecasts of the bottom series and of their aggregates."""
+        y_pred = super()._predict_mean(fh=fh, X=X)
+
+        return self.aggregator_.transform(y_pred)
+
     def _get_predict_data(self, X: pd.DataFrame, fh: ForecastingHorizon) -> np.ndarray:
         """Generate samples for the given exogenous variables and forecasting horizon.
 
@@ -364,7 +549,8 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
             ), "Missing exogenous variables for some series or dates."
             if self.feature_transformer is not None:
                 X = self.feature_transformer.transform(X)
-            X = self.expand_columns_transformer_.transform(X)
+            if self.expand_features_per_series:
+                X = self.expand_columns_transformer_.transform(X)
             exogenous_data = self._get_exogenous_data_array(loc_bottom_series(X))
         else:
             exogenous_data = {}
@@ -400,6 +586,30 @@ class HierarchicalProphet(ExogenousEffectMixin, BaseBayesianForecaster):
         bottom_levels = [idx for idx in levels if idx[-1] != "__total"]
         return bottom_levels
 
+    def _get_aggregation_matrix(self, timepoint: pd.Index) -> pd.DataFrame:
+        """
+        Return the matrix mapping scaled bottom series to all series.
+
+        The matrix is obtained by inverse scaling and aggregating the identity
+        matrix, indexed by the bottom series at a single timepoint, so that it
+        matches `_inv_scale_y` followed by `aggregator_.transform`.
+
+        Parameters
+        ----------
+        timepoint : pd.Index
+            Index with the single timepoint used to index the identity matrix.
+
+        Returns
+        -------
+        pd.DataFrame
+            Matrix of shape (n_series, n_bottom_series), indexed by all series,
+            including the aggregates, at `timepoint`, in the order of
+            `aggregator_.transform`.
+        """
+        bottom_index = self.periodindex_to_multiindex(timepoint)
+        identity = pd.DataFrame(np.eye(len(bottom_index)), index=bottom_index)
+        return self.aggregator_.transform(self._inv_scale_y(identity))
+
     @property
     def n_series(self):
         """Get the number of series.
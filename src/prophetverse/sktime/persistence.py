@@ -0,0 +1,588 @@
+"""Compact persistence of fitted prophetverse forecasters.
+
+A saved forecaster is a directory with three files:
+
+* `spec.json`, the state of the forecaster, its trend model, effects and inference
+  engine, with references to the files below for arrays and other objects.
+* `arrays.npz`, the arrays of that state, e.g. the MAP parameters, the fitted
+  trend priors and the values of the training data, and the pickled objects without
+  a JSON representation, such as sktime transformers.
+* `posterior_samples.npz`, the posterior samples, read when first accessed.
+
+Numeric pandas data, e.g. the training `y` and `X`, is saved as arrays, with its
+index as arrays and JSON metadata. Other objects, e.g. the `feature_transformer` or
+sktime's vectorization state, are pickled into `arrays.npz`, so that loading a
+forecaster can run arbitrary code: only load forecasters from trusted sources.
+
+The optimizer state, the losses of each step, the guide of MAP engines and the
+sampler of MCMC engines are not saved.
+"""
+
+import functools
+import importlib
+import json
+import pickle
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Union
+
+import jax
+import jax.numpy as jnp
+import numpy as np
+import pandas as pd
+from numpyro.distributions import Distribution
+from numpyro.infer.svi import SVIRunResult
+
+from prophetverse.effects.base import AbstractEffect
+from prophetverse.engine import (
+    _DEFAULT_PREDICTIVE_CACHE_MAXSIZE,
+    InferenceEngine,
+    _CompiledFunctionCache,
+    _PointGuide,
+)
+from prophetverse.sktime._prediction_cache import PredictionCache
+from prophetverse.sktime.base import BaseBayesianForecaster
+from prophetverse.trend.base import TrendModel
+
+FORMAT_VERSION = 1
+
+_SPEC_FILE = "spec.json"
+_ARRAYS_FILE = "arrays.npz"
+_POSTERIOR_SAMPLES_FILE = "posterior_samples.npz"
+
+# Rebuilt on load, or not needed to predict
+_FORECASTER_SKIPPED = ("inference_engine_", "posterior_samples_", "_prediction_cache")
+_ENGINE_SKIPPED = (
+    "guide_",
+    "run_results_",
+    "_compiled_predictive",
+    "mcmc_",
+    "posterior_samples_",
+    "samples_",
+    "samples_predictive_",
+)
+
+# Compiled predictions shared by loaded engines of the same model and sites. The
+# least recently loaded kinds of engines are evicted, and their compiled functions
+# are released with the last engine using them.
+_SHARED_COMPILED_PREDICTIVE_MAXSIZE = 32
+_shared_compiled_predictive = _CompiledFunctionCache(
+    maxsize=_SHARED_COMPILED_PREDICTIVE_MAXSIZE
+)
+
+
+def save(forecaster: BaseBayesianForecaster, path: Union[str, Path]) -> Path:
+    """
+    Save a fitted forecaster in the compact format.
+
+    Parameters
+    ----------
+    forecaster : BaseBayesianForecaster
+        The fitted forecaster, possibly vectorized over the series of a
+        hierarchical `y`.
+    path : str or Path
+        The directory to write, created if needed. Existing files of a saved
+        forecaster are overwritten.
+
+    Returns
+    -------
+    Path
+        The directory the forecaster was saved to.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    encoder = _Encoder()
+    spec = {
+        "format_version": FORMAT_VERSION,
+        "forecaster": encoder.encode(forecaster),
+    }
+    with open(path / _SPEC_FILE, "w") as file:
+        json.dump(spec, file)
+    np.savez(path / _ARRAYS_FILE, **encoder.arrays)
+    np.savez(path / _POSTERIOR_SAMPLES_FILE, **encoder.posterior_samples)
+    return path
+
+
+def load(path: Union[str, Path], lazy: bool = True) -> BaseBayesianForecaster:
+    """
+    Load a forecaster saved by `save`.
+
+    The loaded forecaster predicts as the saved one. Engines of MAP forecasters with
+    the same model, latent sites and input shapes share their compiled prediction
+    functions, so that a process can serve many of them cheaply. The losses and the
+    optimizer state of the fit are not restored.
+
+    Objects without another representation, e.g. sktime transformers, are
+    unpickled from `arrays.npz`. As with `pickle`, loading a file from an
+    untrusted source can run arbitrary code.
+
+    Parameters
+    ----------
+    path : str or Path
+        The directory written by `save`.
+    lazy : bool, optional
+        If True, the posterior samples are read from disk when first accessed.
+        Defaults to True.
+
+    Returns
+    -------
+    BaseBayesianForecaster
+        The fitted forecaster.
+    """
+    path = Path(path)
+    with open(path / _SPEC_FILE) as file:
+        spec = json.load(file)
+    if spec["format_version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported format version {spec['format_version']}, expected "
+            f"{FORMAT_VERSION}."
+        )
+
+    with np.load(path / _ARRAYS_FILE) as arrays:
+        decoder = _Decoder(dict(arrays), path / _POSTERIOR_SAMPLES_FILE)
+    forecaster = decoder.decode(spec["forecaster"])
+    if not lazy:
+        for posterior_samples in decoder.posterior_samples:
+            posterior_samples.load()
+    return forecaster
+
+
+class LazyArrays(Mapping):
+    """
+    Read-only mapping of arrays read from an `.npz` file on first access.
+
+    It is flattened by JAX as a dict, so it can be passed to compiled functions and
+    `jax.tree_util` functions directly.
+
+    Parameters
+    ----------
+    path : Path
+        The `.npz` file.
+    keys : Dict[str, str]
+        The key of each array in the file, by name.
+    """
+
+    def __init__(self, path: Path, keys: Dict[str, str]):
+        self.path = path
+        self.keys_in_file = keys
+        self._arrays: Optional[Dict[str, jnp.ndarray]] = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the arrays were read from disk."""
+        return self._arrays is not None
+
+    def load(self) -> Dict[str, jnp.ndarray]:
+        """Read the arrays, if not read yet, and return them."""
+        if self._arrays is None:
+            with np.load(self.path) as file:
+                self._arrays = {
+                    name: jnp.asarray(file[key])
+                    for name, key in self.keys_in_file.items()
+                }
+        return self._arrays
+
+    def __getitem__(self, name: str) -> jnp.ndarray:
+        return self.load()[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys_in_file)
+
+    def __len__(self) -> int:
+        return len(self.keys_in_file)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"LazyArrays({list(self.keys_in_file)}, {state})"
+
+
+jax.tree_util.register_pytree_node(
+    LazyArrays,
+    lambda lazy: ([lazy[name] for name in sorted(lazy)], sorted(lazy)),
+    lambda names, arrays: dict(zip(names, arrays)),
+)
+
+
+class _Encoder:
+    """
+    Encode a forecaster as JSON, collecting its arrays and pickled objects.
+
+    Objects seen twice are encoded once and referenced, so that the trend model and
+    effects shared by several attributes stay shared after loading.
+    """
+
+    def __init__(self):
+        self.arrays: Dict[str, np.ndarray] = {}
+        self.posterior_samples: Dict[str, np.ndarray] = {}
+        self._ids: Dict[int, int] = {}
+        # Keeps the encoded objects alive, so that their ids are not reused
+        self._objects: List[Any] = []
+
+    def encode(self, obj) -> Any:
+        """Return the JSON representation of `obj`."""
+        if obj is None or isinstance(obj, (bool, int, str)):
+            return obj
+        if isinstance(obj, float) and not isinstance(obj, np.floating):
+            return obj
+        if type(obj) is list:
+            return [self.encode(value) for value in obj]
+        if type(obj) is tuple:
+            return {"__tuple__": [self.encode(value) for value in obj]}
+        if type(obj) is dict:
+            if all(isinstance(key, str) and not key.startswith("__") for key in obj):
+                return {key: self.encode(value) for key, value in obj.items()}
+            return {
+                "__dict__": [
+                    [self.encode(key), self.encode(value)] for key, value in obj.items()
+                ]
+            }
+        if id(obj) in self._ids:
+            return {"__ref__": self._ids[id(obj)]}
+
+        ref = self._register(obj)
+        if isinstance(obj, (np.ndarray, np.generic, jax.Array)):
+            return self._encode_array(obj, ref)
+        if isinstance(obj, BaseBayesianForecaster):
+            return self._encode_forecaster(obj, ref)
+        if isinstance(obj, (TrendModel, AbstractEffect, Distribution)):
+            return {
+                "__object__": _import_path(type(obj)),
+                "id": ref,
+                "state": self.encode(vars(obj)),
+            }
+        if isinstance(obj, functools.partial):
+            return {
+                "__partial__": self.encode(obj.func),
+                "id": ref,
+                "args": self.encode(obj.args),
+                "keywords": self.encode(obj.keywords),
+            }
+        if callable(obj) and _is_importable(obj):
+            return {"__import__": _import_path(obj), "id": ref}
+        if isinstance(obj, pd.DataFrame) and (obj.dtypes == object).all():
+            # e.g. the forecasters_ of a vectorized forecaster
+            return {
+                "__frame__": self.encode(obj.values.tolist()),
+                "id": ref,
+                "index": self.encode(obj.index),
+                "columns": self.encode(obj.columns),
+            }
+        if isinstance(obj, pd.DataFrame) and all(map(_is_numeric, obj.dtypes)):
+            return {
+                "__dataframe__": [
+                    self.encode(obj.iloc[:, i].to_numpy()) for i in range(obj.shape[1])
+                ],
+                "id": ref,
+                "index": self.encode(obj.index),
+                "columns": self.encode(obj.columns),
+            }
+        if isinstance(obj, pd.Series) and _is_numeric(obj.dtype):
+            return {
+                "__series__": self.encode(obj.to_numpy()),
+                "id": ref,
+                "index": self.encode(obj.index),
+                "name": self.encode(obj.name),
+            }
+        if isinstance(obj, pd.Index):
+            encoded = self._encode_index(obj)
+            if encoded is not None:
+                return {**encoded, "id": ref}
+
+        key = f"pickle_{ref}"
+        self.arrays[key] = np.frombuffer(pickle.dumps(obj), dtype=np.uint8)
+        return {"__pickle__": key, "id": ref}
+
+    def _register(self, obj) -> int:
+        ref = len(self._objects)
+        self._ids[id(obj)] = ref
+        self._objects.append(obj)
+        return ref
+
+    def _encode_array(self, array, ref: int) -> dict:
+        key = f"array_{ref}"
+        self.arrays[key] = np.asarray(array)
+        return {
+            "__array__": key,
+            "id": ref,
+            "kind": "jax" if isinstance(array, jax.Array) else type(array).__name__,
+        }
+
+    def _encode_index(self, index: pd.Index) -> Optional[dict]:
+        """Encode the index types of time series data, or return None."""
+        name = self.encode(index.name)
+        if isinstance(index, pd.MultiIndex):
+            return {
+                "__index__": "multi",
+                "levels": [self.encode(level) for level in index.levels],
+                "codes": [self.encode(np.asarray(codes)) for codes in index.codes],
+                "names": self.encode(list(index.names)),
+            }
+        if isinstance(index, pd.RangeIndex):
+            return {
+                "__index__": "range",
+                "range": [index.start, index.stop, index.step],
+                "name": name,
+            }
+        if isinstance(index, pd.PeriodIndex):
+            return {
+                "__index__": "period",
+                "values": self.encode(index.asi8.copy()),
+                "freq": index.freqstr,
+                "name": name,
+            }
+        if isinstance(index, pd.DatetimeIndex):
+            # Saved in UTC, since local times may be ambiguous
+            tz = None if index.tz is None else str(index.tz)
+            values = index if tz is None else index.tz_convert(None)
+            return {
+                "__index__": "datetime",
+                "values": self.encode(values.to_numpy()),
+                "tz": tz,
+                "freq": index.freqstr,
+                "name": name,
+            }
+        if type(index) is not pd.Index:
+            return None
+        if _is_numeric(index.dtype):
+            values = self.encode(index.to_numpy())
+        elif all(isinstance(value, str) for value in index):
+            values = list(index)
+        else:
+            return None
+        return {
+            "__index__": "values",
+            "values": values,
+            "dtype": str(index.dtype),
+            "name": name,
+        }
+
+    def _encode_forecaster(self, forecaster: BaseBayesianForecaster, ref: int):
+        state = {
+            name: value
+            for name, value in vars(forecaster).items()
+            if name not in _FORECASTER_SKIPPED
+        }
+        encoded = {
+            "__forecaster__": _import_path(type(forecaster)),
+            "id": ref,
+            "state": self.encode(state),
+        }
+
+        posterior_samples = getattr(forecaster, "posterior_samples_", None)
+        if posterior_samples is not None:
+            keys = {}
+            for name, value in posterior_samples.items():
+                keys[name] = f"forecaster_{ref}/{name}"
+                self.posterior_samples[keys[name]] = np.asarray(value)
+            encoded["posterior_samples"] = keys
+
+        engine = getattr(forecaster, "inference_engine_", None)
+        if engine is not None:
+            encoded["engine"] = self._encode_engine(engine)
+        return encoded
+
+    def _encode_engine(self, engine: InferenceEngine) -> dict:
+        state = {
+            name: value
+            for name, value in vars(engine).items()
+            if name not in _ENGINE_SKIPPED
+        }
+        run_results = getattr(engine, "run_results_", None)
+        return {
+            "__engine__": _import_path(type(engine)),
+            "state": self.encode(state),
+            "params": self.encode(None if run_results is None else run_results.params),
+            "has_guide": hasattr(engine, "guide_"),
+            "has_posterior_samples": hasattr(engine, "posterior_samples_"),
+        }
+
+
+class _Decoder:
+    """Rebuild the objects encoded by `_Encoder`, in the same order."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], posterior_samples_path: Path):
+        self.arrays = arrays
+        self.posterior_samples_path = posterior_samples_path
+        self.posterior_samples: List[LazyArrays] = []
+        self._objects: Dict[int, Any] = {}
+
+    def decode(self, data) -> Any:
+        """Return the object represented by `data`."""
+        if isinstance(data, list):
+            return [self.decode(value) for value in data]
+        if not isinstance(data, dict):
+            return data
+        if "__tuple__" in data:
+            return tuple(self.decode(value) for value in data["__tuple__"])
+        if "__dict__" in data:
+            return {
+                self.decode(key): self.decode(value) for key, value in data["__dict__"]
+            }
+        if "__ref__" in data:
+            return self._objects[data["__ref__"]]
+        if "__array__" in data:
+            return self._register(data, self._decode_array(data))
+        if "__forecaster__" in data:
+            return self._decode_forecaster(data)
+        if "__object__" in data:
+            cls = _import(data["__object__"])
+            obj = self._register(data, cls.__new__(cls))
+            obj.__dict__.update(self.decode(data["state"]))
+            return obj
+        if "__partial__" in data:
+            func = self.decode(data["__partial__"])
+            partial = functools.partial(
+                func, *self.decode(data["args"]), **self.decode(data["keywords"])
+            )
+            return self._register(data, partial)
+        if "__import__" in data:
+            return self._register(data, _import(data["__import__"]))
+        if "__frame__" in data:
+            ref = data["id"]
+            values = self.decode(data["__frame__"])
+            frame = pd.DataFrame(
+                values,
+                index=self.decode(data["index"]),
+                columns=self.decode(data["columns"]),
+                dtype=object,
+            )
+            self._objects[ref] = frame
+            return frame
+        if "__dataframe__" in data:
+            columns = [self.decode(column) for column in data["__dataframe__"]]
+            frame = pd.DataFrame(
+                dict(enumerate(columns)), index=self.decode(data["index"])
+            )
+            frame.columns = self.decode(data["columns"])
+            return self._register(data, frame)
+        if "__series__" in data:
+            series = pd.Series(
+                self.decode(data["__series__"]),
+                index=self.decode(data["index"]),
+                name=self.decode(data["name"]),
+            )
+            return self._register(data, series)
+        if "__index__" in data:
+            return self._register(data, self._decode_index(data))
+        if "__pickle__" in data:
+            obj = pickle.loads(self.arrays[data["__pickle__"]].tobytes())
+            return self._register(data, obj)
+        return {key: self.decode(value) for key, value in data.items()}
+
+    def _register(self, data: dict, obj):
+        self._objects[data["id"]] = obj
+        return obj
+
+    def _decode_array(self, data: dict):
+        array = self.arrays[data["__array__"]]
+        if data["kind"] == "jax":
+            return jnp.asarray(array)
+        if data["kind"] != "ndarray":
+            return array[()]
+        return array
+
+    def _decode_index(self, data: dict) -> pd.Index:
+        kind = data["__index__"]
+        if kind == "multi":
+            return pd.MultiIndex(
+                levels=[self.decode(level) for level in data["levels"]],
+                codes=[self.decode(codes) for codes in data["codes"]],
+                names=self.decode(data["names"]),
+            )
+        name = self.decode(data["name"])
+        if kind == "range":
+            return pd.RangeIndex(*data["range"], name=name)
+        values = self.decode(data["values"])
+        if kind == "period":
+            dtype = pd.PeriodDtype(data["freq"])
+            return pd.PeriodIndex(pd.arrays.PeriodArray(values, dtype=dtype), name=name)
+        if kind == "datetime":
+            index = pd.DatetimeIndex(values, name=name)
+            if data["tz"] is not None:
+                index = index.tz_localize("UTC").tz_convert(data["tz"])
+            return pd.DatetimeIndex(index, freq=data["freq"])
+        return pd.Index(values, dtype=data["dtype"], name=name)
+
+    def _decode_forecaster(self, data: dict) -> BaseBayesianForecaster:
+        cls = _import(data["__forecaster__"])
+        forecaster = self._register(data, cls.__new__(cls))
+        forecaster.__dict__.update(self.decode(data["state"]))
+
+        posterior_samples = None
+        if "posterior_samples" in data:
+            posterior_samples = LazyArrays(
+                self.posterior_samples_path, data["posterior_samples"]
+            )
+            self.posterior_samples.append(posterior_samples)
+            forecaster.posterior_samples_ = posterior_samples
+
+        if "engine" in data:
+            forecaster.inference_engine_ = self._decode_engine(
+                data["engine"], posterior_samples
+            )
+
+        if getattr(forecaster, "_is_fitted", False):
+            forecaster._prediction_cache = None
+            if forecaster.prediction_cache_max_bytes is not None:
+                forecaster._prediction_cache = PredictionCache(
+                    forecaster.prediction_cache_max_bytes
+                )
+        return forecaster
+
+    def _decode_engine(
+        self, data: dict, posterior_samples: Optional[LazyArrays]
+    ) -> InferenceEngine:
+        cls = _import(data["__engine__"])
+        engine = cls.__new__(cls)
+        engine.__dict__.update(self.decode(data["state"]))
+        engine._reset_compiled_predictive()
+
+        if data["has_posterior_samples"] and posterior_samples is not None:
+            engine.posterior_samples_ = posterior_samples
+
+        params = self.decode(data["params"])
+        if params is not None:
+            engine.run_results_ = SVIRunResult(params, None, None)
+        if data["has_guide"] and params is not None:
+            engine.guide_ = _PointGuide.from_params(params)
+            engine._compiled_predictive = _get_shared_compiled_predictive(
+                (cls, engine.model, tuple(engine.guide_.sites))
+            )
+        return engine
+
+
+def _get_shared_compiled_predictive(key: Hashable) -> _CompiledFunctionCache:
+    """Return the compiled prediction cache shared by loaded engines with `key`."""
+    compiled_predictive = _shared_compiled_predictive.get(key)
+    if compiled_predictive is None:
+        compiled_predictive = _CompiledFunctionCache(
+            maxsize=_DEFAULT_PREDICTIVE_CACHE_MAXSIZE
+        )
+        _shared_compiled_predictive.put(key, compiled_predictive)
+    return compiled_predictive
+
+
+def _is_numeric(dtype) -> bool:
+    """Whether `dtype` is a NumPy boolean or number dtype, saved as is in `.npz`."""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufc"
+
+
+def _import_path(obj) -> str:
+    return f"{obj.__module__}:{obj.__qualname__}"
+
+
+def _is_importable(obj) -> bool:
+    """Whether `obj` is the module attribute its import path points to."""
+    try:
+        return _import(_import_path(obj)) is obj
+    except (AttributeError, ImportError, TypeError):
+        return False
+
+
+def _import(path: str):
+    module_name, qualname = path.split(":")
+    obj = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
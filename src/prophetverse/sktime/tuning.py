@@ -0,0 +1,149 @@
+"""Hyperparameter search of prophetverse forecasters."""
+
+import time
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid
+from sktime.performance_metrics.base import BaseMetric
+
+from prophetverse.sktime.backtesting import (
+    _check_scoring,
+    _is_vectorized,
+    _score,
+    _scorer_name,
+)
+from prophetverse.sktime.base import BaseBayesianForecaster
+
+TRACED_PARAMS = ("changepoint_prior_scale", "noise_scale", "offset_prior_scale")
+
+
+def search_prior_scales(
+    forecaster: BaseBayesianForecaster,
+    param_grid: Union[Dict[str, list], List[Dict[str, list]]],
+    cv,
+    y: pd.DataFrame,
+    X: Optional[pd.DataFrame] = None,
+    scoring: Optional[Union[Callable, List[Callable]]] = None,
+) -> pd.DataFrame:
+    """
+    Search the prior scales of a forecaster over a grid, fitting the grid at once.
+
+    Unlike sktime's `ForecastingGridSearchCV`, which fits a new forecaster for each
+    grid point and fold in turn, the values of the hyperparameters in
+    `TRACED_PARAMS` are passed to the model as traced arrays. With MAP inference,
+    the fits of all grid points on folds whose training windows have the same
+    length are then run as a single vectorized optimization, compiled once, see
+    `MAPInferenceEngine.infer_batch`.
+
+    Other hyperparameters can be searched as well, but grid points that differ in
+    them are optimized in separate runs. Forecasters using MCMC, or that sktime
+    vectorizes over the series of a hierarchical `y`, are fitted one grid point and
+    fold after the other.
+
+    Parameters
+    ----------
+    forecaster : BaseBayesianForecaster
+        The forecaster to tune. It is cloned for each grid point and fold.
+    param_grid : dict or List[dict]
+        The hyperparameter values to search, as in `sklearn.model_selection.
+        ParameterGrid`.
+    cv : BaseSplitter
+        An sktime splitter, e.g. `ExpandingWindowSplitter` or
+        `SlidingWindowSplitter`. Its `fh` is the forecasting horizon of each fold.
+    y : pd.DataFrame
+        The target variable.
+    X : pd.DataFrame, optional
+        The exogenous variables, indexed as `y`.
+    scoring : Callable or List[Callable], optional
+        Point forecast metrics called as `scoring(y_test, y_pred)`. sktime metrics
+        also receive `y_train`. Defaults to `MeanAbsolutePercentageError`. The grid
+        points are ranked by the first metric, lower values first unless the
+        `lower_is_better` tag of an sktime metric is False.
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per grid point, best first, with the `mean_test_{metric name}` and
+        `rank_test_{metric name}` columns of each metric, the `mean_fit_time`,
+        `mean_pred_time` and `params` columns, and a `param_{name}` column per
+        hyperparameter. The fit time of problems fitted together is the time of
+        their batch, split evenly.
+    """
+    scorers = _check_scoring(scoring)
+    candidates = list(ParameterGrid(param_grid))
+    fh = cv.fh
+
+    folds = []
+    for train, test in cv.split_loc(y):
+        X_train = None if X is None else X.loc[train]
+        X_test = None if X is None else X.loc[test]
+        folds.append((y.loc[train], y.loc[test], X_train, X_test))
+
+    problems = [
+        (candidate_index, fold)
+        for candidate_index in range(len(candidates))
+        for fold in folds
+    ]
+    params = [_as_traced(candidates[i]) for i, _ in problems]
+
+    start = time.perf_counter()
+    if forecaster.inference_method == "map" and not _is_vectorized(forecaster, y):
+        fitted = forecaster._fit_batch(
+            [fold[0] for _, fold in problems],
+            [fold[2] for _, fold in problems],
+            fh=fh,
+            params=params,
+        )
+    else:
+        fitted = [
+            forecaster.clone().set_params(**problem_params).fit(fold[0], fold[2], fh=fh)
+            for (_, fold), problem_params in zip(problems, params)
+        ]
+    fit_time = (time.perf_counter() - start) / len(problems)
+
+    rows = []
+    for (candidate_index, (y_train, y_test, _, X_test)), problem_forecaster in zip(
+        problems, fitted
+    ):
+        start = time.perf_counter()
+        y_pred = problem_forecaster.predict(fh=fh, X=X_test)
+        row = {"candidate": candidate_index, "pred_time": time.perf_counter() - start}
+        for scorer in scorers:
+            row[_scorer_name(scorer)] = _score(scorer, y_test, y_pred, y_train)
+        rows.append(row)
+
+    means = pd.DataFrame(rows).groupby("candidate").mean()
+    results = pd.DataFrame(index=means.index)
+    for scorer in scorers:
+        name = _scorer_name(scorer)
+        results[f"mean_test_{name}"] = means[name]
+        results[f"rank_test_{name}"] = (
+            means[name]
+            .rank(method="min", ascending=_lower_is_better(scorer))
+            .astype(int)
+        )
+    results["mean_fit_time"] = fit_time
+    results["mean_pred_time"] = means["pred_time"]
+    results["params"] = candidates
+    for name in sorted({name for candidate in candidates for name in candidate}):
+        results[f"param_{name}"] = [candidate.get(name) for candidate in candidates]
+
+    first_rank = f"rank_test_{_scorer_name(scorers[0])}"
+    return results.sort_values(first_rank, kind="stable").reset_index(drop=True)
+
+
+def _as_traced(params: dict) -> dict:
+    """Cast the values of the `TRACED_PARAMS`, so that they are traced in the model."""
+    return {
+        name: np.float64(value) if name in TRACED_PARAMS else value
+        for name, value in params.items()
+    }
+
+
+def _lower_is_better(scorer: Callable) -> bool:
+    """Whether lower values of a metric are better, True unless tagged otherwise."""
+    if isinstance(scorer, BaseMetric):
+        return scorer.get_tag("lower_is_better", True)
+    return True
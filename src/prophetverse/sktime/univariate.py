@@ -104,7 +104,7 @@ class Prophetverse(ExogenousEffectMixin, BaseBayesianForecaster):
         Number of MCMC warmup steps. Also known as burn-in.
 
     mcmc_chains : int, optional, default=4
-        Number of MCMC chains to run in parallel.
+        Number of MCMC chains to run.
 
     inference_method : str, optional, one of "mcmc" or "map", default="map"
         Inference method to use. Can be "mcmc" or "map".
@@ -133,6 +133,37 @@ class Prophetverse(ExogenousEffectMixin, BaseBayesianForecaster):
 
     rng_key : jax.random.PRNGKey or None (default
         Random number generator key.
+
+    mcmc_chain_method : str, optional, default="parallel"
+        How to run the MCMC chains. Can be "parallel" (one chain per CPU device),
+        "vectorized" or "sequential".
+
+    optimizer_convergence_kwargs : dict, optional, default=None
+        Criteria to stop the optimization before ``optimizer_steps``, e.g.
+        ``{"rtol": 1e-6, "window": 1000}``. Accepted keys are "rtol",
+        "gradient_norm_tol", "max_time" and "window", see ``MAPInferenceEngine``.
+
+    batch_fit : bool, optional, default=False
+        If True and ``inference_method="map"``, the series of a hierarchical ``y``
+        are optimized together in vectorized programs instead of one at a time.
+        The per-series forecasters are still available in ``forecasters_``.
+
+    prediction_cache_max_bytes : int, optional, default=None
+        If given, posterior predictive samples are cached, up to this size in bytes,
+        and reused by ``predict_samples``, ``predict_quantiles``,
+        ``predict_interval`` and ``predict_all_sites`` for the same ``fh``, ``X``
+        and random key.
+
+    update_steps : int, optional, default=None
+        Number of optimization steps (MAP) or warmup steps (MCMC) run by ``update``,
+        starting from the parameters of the previous fit. If None, a tenth of
+        ``optimizer_steps`` or ``mcmc_warmup``.
+
+    init_params : dict, optional, default=None
+        Initial values of the latent sites, e.g. the ``posterior_samples_`` of a
+        forecaster fitted on overlapping data, so that sweeps and backtests converge
+        in fewer steps. Sites that are missing, or whose value has another shape,
+        are initialized to their prior mean.
     """
 
     _tags = {
@@ -173,6 +204,12 @@ class Prophetverse(ExogenousEffectMixin, BaseBayesianForecaster):
         default_effect=None,
         scale=None,
         rng_key=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        batch_fit=False,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
     ):
         """Initialize the Prophet model."""
         self.changepoint_interval = changepoint_interval
@@ -200,6 +237,12 @@ class Prophetverse(ExogenousEffectMixin, BaseBayesianForecaster):
             optimizer_kwargs=optimizer_kwargs,
             optimizer_steps=optimizer_steps,
             scale=scale,
+            mcmc_chain_method=mcmc_chain_method,
+            optimizer_convergence_kwargs=optimizer_convergence_kwargs,
+            batch_fit=batch_fit,
+            prediction_cache_max_bytes=prediction_cache_max_bytes,
+            update_steps=update_steps,
+            init_params=init_params,
         )
 
         self._validate_hyperparams()
@@ -239,6 +282,8 @@ class Prophetverse(ExogenousEffectMixin, BaseBayesianForecaster):
             raise ValueError("capacity_prior_loc must be greater than 0.")
         if self.offset_prior_scale <= 0:
             raise ValueError("offset_prior_scale must be greater than 0.")
+        if self.update_steps is not None and self.update_steps <= 0:
+            raise ValueError("update_steps must be greater than 0.")
         if self.trend not in ["linear", "logistic", "flat"] and not isinstance(
             self.trend, TrendModel
         ):
@@ -496,7 +541,7 @@ class Prophet(Prophetverse):
         Number of MCMC warmup steps. Also known as burn-in.
 
     mcmc_chains : int, optional, default=4
-        Number of MCMC chains to run in parallel.
+        Number of MCMC chains to run.
 
     inference_method : str, optional, one of "mcmc" or "map", default="map"
         Inference method to use. Can be "mcmc" or "map".
@@ -522,6 +567,37 @@ class Prophet(Prophetverse):
 
     rng_key : jax.random.PRNGKey or None (default
         Random number generator key.
+
+    mcmc_chain_method : str, optional, default="parallel"
+        How to run the MCMC chains. Can be "parallel" (one chain per CPU device),
+        "vectorized" or "sequential".
+
+    optimizer_convergence_kwargs : dict, optional, default=None
+        Criteria to stop the optimization before ``optimizer_steps``, e.g.
+        ``{"rtol": 1e-6, "window": 1000}``. Accepted keys are "rtol",
+        "gradient_norm_tol", "max_time" and "window", see ``MAPInferenceEngine``.
+
+    batch_fit : bool, optional, default=False
+        If True and ``inference_method="map"``, the series of a hierarchical ``y``
+        are optimized together in vectorized programs instead of one at a time.
+        The per-series forecasters are still available in ``forecasters_``.
+
+    prediction_cache_max_bytes : int, optional, default=None
+        If given, posterior predictive samples are cached, up to this size in bytes,
+        and reused by ``predict_samples``, ``predict_quantiles``,
+        ``predict_interval`` and ``predict_all_sites`` for the same ``fh``, ``X``
+        and random key.
+
+    update_steps : int, optional, default=None
+        Number of optimization steps (MAP) or warmup steps (MCMC) run by ``update``,
+        starting from the parameters of the previous fit. If None, a tenth of
+        ``optimizer_steps`` or ``mcmc_warmup``.
+
+    init_params : dict, optional, default=None
+        Initial values of the latent sites, e.g. the ``posterior_samples_`` of a
+        forecaster fitted on overlapping data, so that sweeps and backtests converge
+        in fewer steps. Sites that are missing, or whose value has another shape,
+        are initialized to their prior mean.
     """
 
     def __init__(
@@ -546,6 +622,12 @@ class Prophet(Prophetverse):
         default_effect=None,
         scale=None,
         rng_key=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        batch_fit=False,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
     ):
 
         super().__init__(
@@ -570,6 +652,12 @@ class Prophet(Prophetverse):
             default_effect=default_effect,
             scale=scale,
             rng_key=rng_key,
+            mcmc_chain_method=mcmc_chain_method,
+            optimizer_convergence_kwargs=optimizer_convergence_kwargs,
+            batch_fit=batch_fit,
+            prediction_cache_max_bytes=prediction_cache_max_bytes,
+            update_steps=update_steps,
+            init_params=init_params,
         )
 
 
@@ -624,7 +712,7 @@ class ProphetGamma(Prophetverse):
         Number of MCMC warmup steps. Also known as burn-in.
 
     mcmc_chains : int, optional, default=4
-        Number of MCMC chains to run in parallel.
+        Number of MCMC chains to run.
 
     inference_method : str, optional, one of "mcmc" or "map", default="map"
         Inference method to use. Can be "mcmc" or "map".
@@ -650,6 +738,37 @@ class ProphetGamma(Prophetverse):
 
     rng_key : jax.random.PRNGKey or None (default
         Random number generator key.
+
+    mcmc_chain_method : str, optional, default="parallel"
+        How to run the MCMC chains. Can be "parallel" (one chain per CPU device),
+        "vectorized" or "sequential".
+
+    optimizer_convergence_kwargs : dict, optional, default=None
+        Criteria to stop the optimization before ``optimizer_steps``, e.g.
+        ``{"rtol": 1e-6, "window": 1000}``. Accepted keys are "rtol",
+        "gradient_norm_tol", "max_time" and "window", see ``MAPInferenceEngine``.
+
+    batch_fit : bool, optional, default=False
+        If True and ``inference_method="map"``, the series of a hierarchical ``y``
+        are optimized together in vectorized programs instead of one at a time.
+        The per-series forecasters are still available in ``forecasters_``.
+
+    prediction_cache_max_bytes : int, optional, default=None
+        If given, posterior predictive samples are cached, up to this size in bytes,
+        and reused by ``predict_samples``, ``predict_quantiles``,
+        ``predict_interval`` and ``predict_all_sites`` for the same ``fh``, ``X``
+        and random key.
+
+    update_steps : int, optional, default=None
+        Number of optimization steps (MAP) or warmup steps (MCMC) run by ``update``,
+        starting from the parameters of the previous fit. If None, a tenth of
+        ``optimizer_steps`` or ``mcmc_warmup``.
+
+    init_params : dict, optional, default=None
+        Initial values of the latent sites, e.g. the ``posterior_samples_`` of a
+        forecaster fitted on overlapping data, so that sweeps and backtests converge
+        in fewer steps. Sites that are missing, or whose value has another shape,
+        are initialized to their prior mean.
     """
 
     def __init__(
@@ -674,6 +793,12 @@ class ProphetGamma(Prophetverse):
         default_effect=None,
         scale=None,
         rng_key=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        batch_fit=False,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
     ):
 
         super().__init__(
@@ -698,6 +823,12 @@ class ProphetGamma(Prophetverse):
             default_effect=default_effect,
             scale=scale,
             rng_key=rng_key,
+            mcmc_chain_method=mcmc_chain_method,
+            optimizer_convergence_kwargs=optimizer_convergence_kwargs,
+            batch_fit=batch_fit,
+            prediction_cache_max_bytes=prediction_cache_max_bytes,
+            update_steps=update_steps,
+            init_params=init_params,
         )
 
 
@@ -752,7 +883,7 @@ class ProphetNegBinomial(Prophetverse):
         Number of MCMC warmup steps. Also known as burn-in.
 
     mcmc_chains : int, optional, default=4
-        Number of MCMC chains to run in parallel.
+        Number of MCMC chains to run.
 
     inference_method : str, optional, one of "mcmc" or "map", default="map"
         Inference method to use. Can be "mcmc" or "map".
@@ -778,6 +909,37 @@ class ProphetNegBinomial(Prophetverse):
 
     rng_key : jax.random.PRNGKey or None (default
         Random number generator key.
+
+    mcmc_chain_method : str, optional, default="parallel"
+        How to run the MCMC chains. Can be "parallel" (one chain per CPU device),
+        "vectorized" or "sequential".
+
+    optimizer_convergence_kwargs : dict, optional, default=None
+        Criteria to stop the optimization before ``optimizer_steps``, e.g.
+        ``{"rtol": 1e-6, "window": 1000}``. Accepted keys are "rtol",
+        "gradient_norm_tol", "max_time" and "window", see ``MAPInferenceEngine``.
+
+    batch_fit : bool, optional, default=False
+        If True and ``inference_method="map"``, the series of a hierarchical ``y``
+        are optimized together in vectorized programs instead of one at a time.
+        The per-series forecasters are still available in ``forecasters_``.
+
+    prediction_cache_max_bytes : int, optional, default=None
+        If given, posterior predictive samples are cached, up to this size in bytes,
+        and reused by ``predict_samples``, ``predict_quantiles``,
+        ``predict_interval`` and ``predict_all_sites`` for the same ``fh``, ``X``
+        and random key.
+
+    update_steps : int, optional, default=None
+        Number of optimization steps (MAP) or warmup steps (MCMC) run by ``update``,
+        starting from the parameters of the previous fit. If None, a tenth of
+        ``optimizer_steps`` or ``mcmc_warmup``.
+
+    init_params : dict, optional, default=None
+        Initial values of the latent sites, e.g. the ``posterior_samples_`` of a
+        forecaster fitted on overlapping data, so that sweeps and backtests converge
+        in fewer steps. Sites that are missing, or whose value has another shape,
+        are initialized to their prior mean.
     """
 
     def __init__(
@@ -802,6 +964,12 @@ class ProphetNegBinomial(Prophetverse):
         default_effect=None,
         scale=None,
         rng_key=None,
+        mcmc_chain_method="parallel",
+        optimizer_convergence_kwargs=None,
+        batch_fit=False,
+        prediction_cache_max_bytes=None,
+        update_steps=None,
+        init_params=None,
     ):
 
         super().__init__(
@@ -826,4 +994,10 @@ class ProphetNegBinomial(Prophetverse):
             default_effect=default_effect,
             scale=scale,
             rng_key=rng_key,
+            mcmc_chain_method=mcmc_chain_method,
+            optimizer_convergence_kwargs=optimizer_convergence_kwargs,
+            batch_fit=batch_fit,
+            prediction_cache_max_bytes=prediction_cache_max_bytes,
+            update_steps=update_steps,
+            init_params=init_params,
         )
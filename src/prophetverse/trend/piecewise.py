@@ -126,9 +126,8 @@ class PiecewiseLinearTrend(TrendModel):
         changepoint_matrix = self._get_multivariate_changepoint_matrix(t_scaled)
 
         # If only one series, remove the first dimension
-        if changepoint_matrix.shape[0] == 1:
-            if self.squeeze_if_single_series:
-                changepoint_matrix = changepoint_matrix[0]
+        if self.n_series == 1 and self.squeeze_if_single_series:
+            changepoint_matrix = changepoint_matrix[0]
 
         return changepoint_matrix
 
@@ -156,11 +155,12 @@ class PiecewiseLinearTrend(TrendModel):
 
     def _get_multivariate_changepoint_matrix(self, t_scaled) -> jnp.ndarray:
         """
-        Get the changepoint matrix.
+        Get the changepoint matrix, with one block of columns per series.
 
-        The changepoint matrix has shape (n_series, n_timepoints, total number of
-        changepoints for all series). A mask is applied so that for index i at dim 0,
-        only the changepoints for series i are non-zero at dim -1.
+        The changepoint matrix has shape (n_series, n_timepoints, max number of
+        changepoints of a series). Index i at dim 0 holds the changepoints of series
+        i, padded with zero columns. If all series share the same changepoints, dim 0
+        has size 1, and the block is broadcast to all series in `compute_trend`.
 
         Parameters
         ----------
@@ -172,27 +172,43 @@ class PiecewiseLinearTrend(TrendModel):
         jnp.ndarray
             The changepoint matrix.
         """
-        changepoint_ts = np.concatenate(self._changepoint_ts)
-        changepoint_design_tensor_list = []
-        changepoint_mask_tensor_list = []
-        for i, n_changepoints in enumerate(self.n_changepoint_per_series):
-            A = _get_changepoint_matrix(t_scaled, changepoint_ts)
-
-            start_idx = sum(self.n_changepoint_per_series[:i])
-            end_idx = start_idx + n_changepoints
-            mask = np.zeros_like(A)
-            mask[:, start_idx:end_idx] = 1
-
-            changepoint_design_tensor_list.append(A)
-            changepoint_mask_tensor_list.append(mask)
-
-        changepoint_design_tensor: np.ndarray = np.stack(
-            changepoint_design_tensor_list, axis=0
-        )
-        changepoint_mask_tensor: np.ndarray = np.stack(
-            changepoint_mask_tensor_list, axis=0
+        changepoint_ts = [np.asarray(cp) for cp in self._changepoint_ts]
+        if all(np.array_equal(changepoint_ts[0], cp) for cp in changepoint_ts[1:]):
+            changepoint_ts = changepoint_ts[:1]
+
+        max_n_changepoints = max(len(cp) for cp in changepoint_ts)
+        changepoint_matrix = np.zeros(
+            (len(changepoint_ts), len(t_scaled), max_n_changepoints), dtype=np.float32
         )
-        return changepoint_design_tensor * changepoint_mask_tensor
+        for i, cp in enumerate(changepoint_ts):
+            changepoint_matrix[i, :, : len(cp)] = _get_changepoint_matrix(t_scaled, cp)
+        return changepoint_matrix
+
+    def _get_changepoint_coefficient_blocks(
+        self, changepoint_coefficients: jnp.ndarray
+    ) -> jnp.ndarray:
+        """
+        Arrange the changepoint coefficients in one row per series.
+
+        Parameters
+        ----------
+        changepoint_coefficients: jnp.ndarray
+            The coefficients of all series, concatenated.
+
+        Returns
+        -------
+        jnp.ndarray
+            Array of shape (n_series, max number of changepoints of a series, 1),
+            padded with zeros.
+        """
+        n_changepoint_per_series = np.array(self.n_changepoint_per_series)
+        positions = np.arange(n_changepoint_per_series.max())
+        mask = positions[None, :] < n_changepoint_per_series[:, None]
+        starts = np.concatenate([[0], np.cumsum(n_changepoint_per_series)[:-1]])
+        indexes = np.where(mask, starts[:, None] + positions[None, :], 0)
+
+        coefficient_blocks = jnp.where(mask, changepoint_coefficients[indexes], 0)
+        return coefficient_blocks[..., None]
 
     def _setup_changepoints(self, t_scaled) -> None:
         """
@@ -366,7 +382,9 @@ class PiecewiseLinearTrend(TrendModel):
 
         # If multivariate
         if changepoint_matrix.ndim == 3:
-            changepoint_coefficients = changepoint_coefficients.reshape((1, -1, 1))
+            changepoint_coefficients = self._get_changepoint_coefficient_blocks(
+                changepoint_coefficients
+            )
             offset = offset.reshape((-1, 1, 1))
 
         trend = (changepoint_matrix) @ changepoint_coefficients + offset
@@ -608,27 +626,30 @@ def _suggest_logistic_rate_and_offset(
     return k, m
 
 
-def _get_changepoint_matrix(t: jnp.ndarray, changepoint_t: jnp.array) -> jnp.ndarray:
+def _get_changepoint_matrix(t: np.ndarray, changepoint_t: np.ndarray) -> np.ndarray:
     """
     Generate a changepoint matrix based on the time indexes and changepoint indexes.
 
+    The matrix is built with numpy, so that building it for inputs of a new length
+    does not compile device operations, in single precision as the JAX arrays it is
+    used with.
+
     Parameters
     ----------
-    t: jnp.ndarray
+    t: np.ndarray
         array with timepoints of shape (n, 1) preferably
-    changepoint_t: jnp.array
+    changepoint_t: np.ndarray
         array with changepoint timepoints of shape (n_changepoints,)
 
     Returns
     -------
-    jnp.ndarray
+    np.ndarray
         changepoint matrix of shape (n, n_changepoints)
     """
-    expanded_ts = jnp.tile(t.reshape((-1, 1)), (1, len(changepoint_t)))
-    A = (expanded_ts >= changepoint_t.reshape((1, -1))).astype(int) * expanded_ts
-    cutoff_ts = changepoint_t.reshape((1, -1))
-    A = jnp.clip(A - cutoff_ts + 1, 0, None)
-    return A
+    t = np.asarray(t, dtype=np.float32).reshape((-1, 1))
+    cutoff_ts = np.asarray(changepoint_t, dtype=np.float32).reshape((1, -1))
+    A = (t >= cutoff_ts) * t
+    return np.clip(A - cutoff_ts + 1, 0, None)
 
 
 def _get_changepoint_timeindexes(
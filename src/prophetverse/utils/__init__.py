@@ -3,12 +3,12 @@
 from .frame_to_array import (
     convert_dataframe_to_tensors,
     convert_index_to_days_since_epoch,
-    iterate_all_series,
     series_to_tensor,
 )
 from .multiindex import (
     get_bottom_series_idx,
     get_multiindex_loc,
+    iterate_all_series,
     loc_bottom_series,
     reindex_time_series,
 )
@@ -14,13 +14,16 @@ def matrix_multiplication(
     data : jnp.ndarray | NDArray
         Array to be multiplied.
     coefficients : jnp.ndarray | NDArray
-        Array of coefficients used at matrix multiplication.
+        Array of coefficients used at matrix multiplication. If 3-dimensional, it is
+        a batch of (n_features, 1) coefficients, one per series of `data`.
 
     Returns
     -------
     jnp.ndarray | NDArray
         Matrix multiplication between data and coefficients.
     """
+    if coefficients.ndim == 3:
+        return data @ coefficients
     return data @ coefficients.reshape((-1, 1))
 
 
@@ -6,7 +6,8 @@ import numpy as np
 import pandas as pd
 from jax import numpy as jnp
 
-from .multiindex import iterate_all_series
+# Re-exported, as it used to be imported from this module
+from .multiindex import iterate_all_series as iterate_all_series
 
 NANOSECONDS_TO_SECONDS = 1000 * 1000 * 1000
 
@@ -15,6 +16,7 @@ __all__ = [
     "series_to_tensor",
     "extract_timetensor_from_dataframe",
     "convert_dataframe_to_tensors",
+    "iterate_all_series",
 ]
 
 
@@ -47,6 +49,9 @@ def series_to_tensor(y: pd.DataFrame) -> jnp.ndarray:
     """
     Convert all series of a hierarchical time series to a JAX tensor.
 
+    The series are ordered as they first appear in the index of `y`, and the rows of
+    each series keep their order in `y`.
+
     Parameters
     ----------
     y : pd.DataFrame
@@ -55,25 +60,37 @@ def series_to_tensor(y: pd.DataFrame) -> jnp.ndarray:
     Returns
     -------
     jnp.ndarray
-        The JAX tensor representing all series.
-    """
-    names = []
-    array = []
-    series_len = None
+        The JAX tensor representing all series, with shape
+        (n_series, n_timepoints, n_columns).
 
+    Raises
+    ------
+    ValueError
+        If the series do not all have the same length.
+    """
     if y.index.nlevels == 1:
         return jnp.array(y.values).reshape((1, -1, len(y.columns)))
 
-    for idx, series in iterate_all_series(y):
-        if series_len is None:
-            series_len = len(series)
-        if len(series) != series_len:
-            raise ValueError(
-                f"Series {idx} has length {len(series)}, but expected {series_len}"
+    series_codes, series_idx = pd.factorize(y.index.droplevel(-1))
+    series_lengths = np.bincount(series_codes, minlength=len(series_idx))
+
+    # The most common length, and the longest one in case of ties
+    lengths, counts = np.unique(series_lengths, return_counts=True)
+    expected_length = lengths[counts == counts.max()].max()
+    ragged = np.flatnonzero(series_lengths != expected_length)
+    if len(ragged) > 0:
+        raise ValueError(
+            f"All series must have the same length, expected {expected_length} "
+            "timepoints but got: "
+            + ", ".join(
+                f"{series_idx[i]} with length {series_lengths[i]}" for i in ragged
             )
+        )
 
-        names.append(idx)
-        array.append(series.values.reshape((-1, len(y.columns))))
+    order = np.argsort(series_codes, kind="stable")
+    array = y.to_numpy()[order].reshape(
+        (len(series_idx), expected_length, len(y.columns))
+    )
     return jnp.array(array)
 
 
@@ -0,0 +1,296 @@
+import functools
+
+import jax.numpy as jnp
+import numpy as np
+import numpyro
+import pytest
+from numpyro import distributions as dist
+
+from prophetverse.engine import (
+    MAPInferenceEngine,
+    _OnlineSummary,
+    _split_static_and_dynamic,
+)
+
+
+def _model(obs, prior_scale=10.0):
+    loc = numpyro.sample("loc", dist.Normal(0, prior_scale))
+    with numpyro.plate("data", obs.shape[0]):
+        numpyro.sample("obs", dist.Normal(loc, 1), obs=obs)
+
+
+def _make_engine(num_steps=500):
+    return MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=0.1),
+        num_steps=num_steps,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    MAPInferenceEngine.cache_clear()
+    yield
+    MAPInferenceEngine.cache_clear()
+
+
+def test_refit_with_same_shapes_reuses_compiled_loop():
+    engine = _make_engine().infer(obs=jnp.full(10, 5.0))
+    assert not engine.cache_hit_
+
+    other_engine = _make_engine().infer(obs=jnp.full(10, -3.0))
+    assert other_engine.cache_hit_
+
+    info = MAPInferenceEngine.cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.currsize == 1
+
+    # The cached loop must use the new data, not the one it was compiled with
+    assert jnp.isclose(engine.run_results_.params["loc_auto_loc"], 5.0, atol=0.1)
+    assert jnp.isclose(other_engine.run_results_.params["loc_auto_loc"], -3.0, atol=0.1)
+    assert other_engine.run_results_.losses.shape == (500,)
+
+
+@pytest.mark.parametrize(
+    "engine,kwargs",
+    [
+        (_make_engine(), dict(obs=jnp.ones(11))),
+        (_make_engine(), dict(obs=jnp.ones(10), prior_scale=1.0)),
+        (_make_engine(num_steps=100), dict(obs=jnp.ones(10))),
+        (
+            MAPInferenceEngine(
+                _model,
+                optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=0.2),
+                num_steps=500,
+            ),
+            dict(obs=jnp.ones(10)),
+        ),
+    ],
+)
+def test_cache_miss_when_configuration_changes(engine, kwargs):
+    _make_engine().infer(obs=jnp.ones(10))
+    engine.infer(**kwargs)
+
+    assert not engine.cache_hit_
+    assert MAPInferenceEngine.cache_info().misses == 2
+
+
+@pytest.mark.parametrize(
+    "criterion", [dict(rtol=1e-4), dict(gradient_norm_tol=1e-2), dict(max_time=0)]
+)
+def test_early_stopping(criterion):
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=0.1),
+        num_steps=10_000,
+        window=100,
+        **criterion,
+    )
+    engine.infer(obs=jnp.full(10, 5.0))
+
+    n_steps = engine.run_results_.losses.shape[0]
+    assert n_steps < 10_000
+    assert n_steps % 100 == 0
+    assert engine.converged_ == ("max_time" not in criterion)
+    if engine.converged_:
+        assert jnp.isclose(engine.run_results_.params["loc_auto_loc"], 5.0, atol=0.1)
+
+
+def test_without_criteria_runs_all_steps():
+    engine = _make_engine(num_steps=250).infer(obs=jnp.ones(10))
+    assert engine.run_results_.losses.shape == (250,)
+    assert not engine.converged_
+
+
+@pytest.mark.parametrize("kwargs", [dict(window=0), dict(num_steps=0)])
+def test_raises_on_invalid_configuration(kwargs):
+    with pytest.raises(ValueError):
+        MAPInferenceEngine(_model, **kwargs)
+
+
+def test_gradient_norm_is_computed_only_with_its_criterion():
+    engine = _make_engine(num_steps=100)
+    svi_, svi_state = engine._init_svi(obs=jnp.ones(10))[1:]
+    static_kwargs, dynamic_kwargs = _split_static_and_dynamic({"obs": jnp.ones(10)})
+
+    run_fn = engine._get_run_fn(svi_, static_kwargs, dynamic_kwargs, 100, False)
+    assert run_fn(svi_state, dynamic_kwargs)[2] is None
+
+    engine.gradient_norm_tol = 1e-3
+    run_fn = engine._get_run_fn(svi_, static_kwargs, dynamic_kwargs, 100, False)
+    assert run_fn(svi_state, dynamic_kwargs)[2].shape == ()
+
+
+def test_infer_batch_matches_separate_fits():
+    kwargs_list = [
+        dict(obs=jnp.full(10, 5.0)),
+        dict(obs=jnp.full(10, -3.0)),
+        dict(obs=jnp.full(12, 1.0)),
+    ]
+    engines = _make_engine().infer_batch(kwargs_list)
+
+    # Series with 10 observations share one program, the last one has its own
+    assert MAPInferenceEngine.cache_info().misses == 2
+    assert len(engines) == 3
+    for engine, kwargs in zip(engines, kwargs_list):
+        expected = _make_engine().infer(**kwargs)
+        assert engine.run_results_.losses.shape == (500,)
+        assert jnp.allclose(
+            engine.posterior_samples_["loc"],
+            expected.posterior_samples_["loc"],
+            atol=1e-4,
+        )
+
+
+def test_infer_batch_stops_when_all_converged():
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=0.1),
+        num_steps=10_000,
+        window=100,
+        rtol=1e-4,
+    )
+    engines = engine.infer_batch([dict(obs=jnp.full(10, 5.0)), dict(obs=jnp.ones(10))])
+
+    assert all(engine.converged_ for engine in engines)
+    assert engines[0].run_results_.losses.shape[0] < 10_000
+
+
+def test_init_params_initialize_latent_sites():
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=1e-4),
+        num_steps=1,
+        init_params={"loc": jnp.array(5.0)},
+    ).infer(obs=jnp.zeros(10))
+
+    assert jnp.isclose(engine.point_estimates()["loc"], 5.0, atol=1e-3)
+
+
+def test_init_params_with_sample_dimension_are_averaged():
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=1e-4),
+        num_steps=1,
+        init_params={"loc": jnp.linspace(4.0, 6.0, 20)},
+    ).infer(obs=jnp.zeros(10))
+
+    assert jnp.isclose(engine.point_estimates()["loc"], 5.0, atol=1e-3)
+
+
+def test_init_params_with_another_shape_are_ignored():
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=1e-4),
+        num_steps=1,
+        init_params={"loc": jnp.full((2, 3), 5.0)},
+    ).infer(obs=jnp.zeros(10))
+
+    assert jnp.shape(engine.point_estimates()["loc"]) == ()
+    assert not jnp.isclose(engine.point_estimates()["loc"], 5.0, atol=1e-3)
+
+
+def test_predict_mean_uses_map_parameters():
+    engine = _make_engine().infer(obs=jnp.full(10, 5.0))
+    mean = engine.predict_mean(obs=jnp.zeros(10))
+
+    assert mean.shape == (10,)
+    assert jnp.allclose(mean, engine.posterior_samples_["loc"])
+
+
+def test_predict_reuses_compiled_function_for_same_shapes():
+    engine = _make_engine(num_steps=100).infer(obs=jnp.full(10, 5.0))
+
+    engine.predict(obs=jnp.zeros(10))
+    engine.predict(obs=jnp.ones(10))
+    engine.predict(obs=jnp.zeros(12))
+
+    info = engine._compiled_predictive.info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_predict_summary_matches_predict():
+    engine = MAPInferenceEngine(
+        _model,
+        optimizer_factory=functools.partial(numpyro.optim.Adam, step_size=0.1),
+        num_steps=500,
+        num_samples=2000,
+    ).infer(obs=jnp.full(10, 5.0))
+
+    obs = jnp.zeros(3)
+    summary = engine.predict_summary(
+        quantiles=[0.1, 0.5, 0.9], chunk_size=300, sketch_size=256, obs=obs
+    )
+    samples = engine.predict(obs=obs)["obs"]
+
+    assert summary["obs"]["quantiles"].shape == (3, 3)
+    assert jnp.allclose(summary["obs"]["mean"], samples.mean(axis=0), atol=0.1)
+    assert jnp.allclose(
+        summary["obs"]["quantiles"],
+        jnp.quantile(samples, jnp.array([0.1, 0.5, 0.9]), axis=0),
+        atol=0.15,
+    )
+
+
+def test_predict_batch_matches_separate_predictions():
+    engines = [
+        _make_engine(num_steps=100).infer(obs=jnp.full(10, value))
+        for value in [1.0, 2.0, 3.0]
+    ]
+    kwargs_list = [dict(obs=jnp.zeros(4)), dict(obs=jnp.ones(4)), dict(obs=jnp.ones(6))]
+
+    batched = MAPInferenceEngine.predict_batch(engines, kwargs_list)
+
+    for engine, kwargs, samples in zip(engines, kwargs_list, batched):
+        expected = engine.predict(**kwargs)
+        assert samples.keys() == expected.keys()
+        assert jnp.allclose(samples["obs"], expected["obs"], atol=1e-5)
+
+    # The two engines with the same input shapes are evaluated in one program
+    info = engines[0]._compiled_predictive.info()
+    assert info.misses == 2
+
+
+def test_infer_batch_traces_prior_scales_given_as_numpy_floats():
+    kwargs_list = [
+        dict(obs=jnp.full(10, 5.0), prior_scale=np.float64(scale))
+        for scale in [0.1, 1.0, 10.0]
+    ]
+    engines = _make_engine().infer_batch(kwargs_list)
+
+    # One program for the whole grid, while the priors still differ
+    assert MAPInferenceEngine.cache_info().misses == 1
+    for engine, kwargs in zip(engines, kwargs_list):
+        expected = _make_engine().infer(**kwargs)
+        assert jnp.allclose(
+            engine.posterior_samples_["loc"],
+            expected.posterior_samples_["loc"],
+            atol=1e-4,
+        )
+    assert engines[0].posterior_samples_["loc"] < engines[2].posterior_samples_["loc"]
+
+
+@pytest.mark.parametrize("sketch_size", [1000, 50])
+def test_online_summary_quantiles(sketch_size):
+    samples = np.random.default_rng(0).normal(size=(1000, 2, 3))
+    summary = _OnlineSummary(sketch_size)
+    for chunk in np.split(samples, 8):
+        summary.update(chunk)
+
+    levels = [0.05, 0.5, 0.95]
+    expected = np.quantile(samples, levels, axis=0, method="hazen")
+    atol = 1e-5 if sketch_size >= len(samples) else 0.1
+    assert np.allclose(summary.mean(), samples.mean(axis=0), atol=1e-5)
+    assert np.allclose(summary.quantiles(levels), expected, atol=atol)
+
+
+def test_online_summary_without_sketch_keeps_only_the_mean():
+    samples = np.random.default_rng(0).normal(size=(1000, 2, 3))
+    summary = _OnlineSummary(None)
+    for chunk in np.split(samples, 8):
+        summary.update(chunk)
+
+    assert summary._points is None
+    assert np.allclose(summary.mean(), samples.mean(axis=0), atol=1e-5)
+    assert summary.quantiles([]).shape == (0, 2, 3)
@@ -0,0 +1,103 @@
+import os
+import pickle
+
+import jax
+import jax.numpy as jnp
+import numpyro
+import pytest
+from numpyro import distributions as dist
+
+from prophetverse.engine import MCMCInferenceEngine, _resolve_chain_method
+
+
+def _model(obs, n_obs=10):
+    loc = numpyro.sample("loc", dist.Normal(0, 10))
+    with numpyro.plate("data", n_obs):
+        numpyro.sample("obs", dist.Normal(loc, 1), obs=obs)
+
+
+@pytest.mark.parametrize("chain_method", ["parallel", "vectorized", "sequential"])
+def test_runs_all_chains(chain_method):
+    engine = MCMCInferenceEngine(
+        _model, num_samples=5, num_warmup=5, num_chains=2, chain_method=chain_method
+    )
+    engine.infer(obs=jnp.ones(10))
+
+    assert engine.mcmc_.get_samples(group_by_chain=True)["loc"].shape == (2, 5)
+    assert engine.posterior_samples_["loc"].shape == (10,)
+
+    samples = engine.predict(obs=None)
+    assert samples["obs"].shape == (10, 10)
+
+
+def test_raises_on_unknown_chain_method():
+    with pytest.raises(ValueError):
+        MCMCInferenceEngine(_model, chain_method="bad_method")
+
+
+def test_parallel_chains_leave_xla_flags_unchanged(monkeypatch):
+    monkeypatch.delenv("XLA_FLAGS", raising=False)
+    MCMCInferenceEngine(_model, num_chains=4, chain_method="parallel")
+    assert "XLA_FLAGS" not in os.environ
+
+
+def test_parallel_falls_back_to_vectorized_without_enough_devices():
+    num_chains = jax.local_device_count() + 1
+    assert _resolve_chain_method("parallel", num_chains) == "vectorized"
+    assert _resolve_chain_method("parallel", 1) == "parallel"
+    assert _resolve_chain_method("sequential", num_chains) == "sequential"
+
+
+def test_predict_after_pickling_recompiles():
+    engine = MCMCInferenceEngine(
+        _model, num_samples=5, num_warmup=5, num_chains=1, chain_method="sequential"
+    )
+    engine.infer(obs=jnp.ones(10))
+    samples = engine.predict(obs=None, n_obs=4)
+
+    restored = pickle.loads(pickle.dumps(engine))
+    assert restored._compiled_predictive.info().currsize == 0
+    assert jnp.allclose(restored.predict(obs=None, n_obs=4)["obs"], samples["obs"])
+
+
+def test_predict_summary_covers_all_posterior_samples():
+    def model(obs):
+        loc = numpyro.sample("loc", dist.Normal(0, 10))
+        numpyro.deterministic("double_loc", 2 * loc)
+        with numpyro.plate("data", 10):
+            numpyro.sample("obs", dist.Normal(loc, 1), obs=obs)
+
+    engine = MCMCInferenceEngine(
+        model, num_samples=50, num_warmup=10, num_chains=1, chain_method="sequential"
+    )
+    engine.infer(obs=jnp.ones(10))
+
+    summary = engine.predict_summary(
+        quantiles=[0.5], chunk_size=16, return_sites=["double_loc"], obs=None
+    )
+
+    assert list(summary) == ["double_loc"]
+    assert jnp.allclose(
+        summary["double_loc"]["mean"], 2 * engine.posterior_samples_["loc"].mean()
+    )
+
+
+def test_point_estimates_warm_start_another_engine():
+    engine = MCMCInferenceEngine(
+        _model, num_samples=50, num_warmup=50, num_chains=1, chain_method="sequential"
+    ).infer(obs=jnp.full(10, 3.0))
+
+    point_estimates = engine.point_estimates()
+    assert jnp.isclose(
+        point_estimates["loc"], engine.posterior_samples_["loc"].mean(), atol=1e-6
+    )
+
+    other_engine = MCMCInferenceEngine(
+        _model,
+        num_samples=50,
+        num_warmup=5,
+        num_chains=1,
+        chain_method="sequential",
+        init_params=point_estimates,
+    ).infer(obs=jnp.full(10, 3.0))
+    assert jnp.isclose(other_engine.point_estimates()["loc"], 3.0, atol=0.5)
@@ -12,6 +12,7 @@ from prophetverse.utils import (
     loc_bottom_series,
     series_to_tensor,
 )
+from prophetverse.utils import frame_to_array
 
 
 # Sample data preparation
@@ -73,9 +74,28 @@ def test_series_to_tensor(sample_hierarchical_data):
     ), "Shape should reflect the reshaping into a 3D tensor"
 
 
+def test_series_to_tensor_keeps_order_of_appearance():
+    idx = pd.MultiIndex.from_tuples(
+        [("B", 0), ("A", 0), ("B", 1), ("A", 1)], names=["Level1", "Level2"]
+    )
+    df = pd.DataFrame({"Feature1": [1.0, 10.0, 2.0, 20.0]}, index=idx)
+    result = series_to_tensor(df)
+    np.testing.assert_array_equal(result[..., 0], [[1.0, 2.0], [10.0, 20.0]])
+
+
+def test_series_to_tensor_raises_on_ragged_series(sample_hierarchical_data):
+    with pytest.raises(ValueError, match="B with length 2"):
+        series_to_tensor(sample_hierarchical_data.iloc[:-1])
+
+
 # Test for converting DataFrame to tensors
 def test_convert_dataframe_to_tensors(sample_hierarchical_data):
     t_arrays, df_as_arrays = convert_dataframe_to_tensors(sample_hierarchical_data)
     assert isinstance(t_arrays, jnp.ndarray) and isinstance(
         df_as_arrays, jnp.ndarray
     ), "Should convert both time and data arrays to JAX tensors"
+
+
+def test_iterate_all_series_is_importable_from_frame_to_array():
+    assert frame_to_array.iterate_all_series is iterate_all_series
+    assert "iterate_all_series" in frame_to_array.__all__
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from sktime.forecasting.model_evaluation import evaluate as sktime_evaluate
+from sktime.performance_metrics.forecasting import MeanAbsoluteError
+from sktime.split import ExpandingWindowSplitter, SlidingWindowSplitter
+
+from prophetverse.sktime.backtesting import _fit_folds, evaluate
+from prophetverse.sktime.multivariate import HierarchicalProphet
+from prophetverse.sktime.univariate import Prophetverse
+
+from ._utils import make_random_X, make_y
+
+
+@pytest.mark.parametrize("inference_method", ["map", "mcmc"])
+def test_evaluate_returns_the_table_of_sktime_evaluate(inference_method):
+    y = make_y(0)
+    cv = ExpandingWindowSplitter(fh=[1, 2], initial_window=6, step_length=2)
+    forecaster = Prophetverse(
+        inference_method=inference_method,
+        optimizer_steps=20,
+        mcmc_samples=5,
+        mcmc_warmup=5,
+    )
+    scoring = [MeanAbsoluteError()]
+
+    results = evaluate(forecaster, cv, y, scoring=scoring, return_data=True)
+    expected = sktime_evaluate(forecaster, cv, y, scoring=scoring, return_data=True)
+
+    assert list(results.columns) == list(expected.columns)
+    assert results["len_train_window"].tolist() == (
+        expected["len_train_window"].tolist()
+    )
+    assert results["cutoff"].tolist() == expected["cutoff"].tolist()
+    assert np.isfinite(results["test_MeanAbsoluteError"]).all()
+
+
+def test_fit_folds_warm_starts_the_folds_after_the_first():
+    y = make_y(0)
+    X = make_random_X(y)
+    cv = ExpandingWindowSplitter(fh=[1, 2], initial_window=6, step_length=2)
+    folds = [
+        (y.loc[train], y.loc[test], X.loc[train], X.loc[test])
+        for train, test in cv.split_loc(y)
+    ]
+    forecaster = Prophetverse(optimizer_steps=100, update_steps=5)
+
+    fitted, fit_times = _fit_folds(forecaster, folds, cv.fh, warm_start=True)
+
+    assert len(fitted) == len(fit_times) == len(folds)
+    assert fitted[0].inference_engine_.run_results_.losses.shape == (100,)
+    for previous, fold_forecaster in zip(fitted[:-1], fitted[1:]):
+        engine = fold_forecaster.inference_engine_
+        assert engine.run_results_.losses.shape == (5,)
+        assert engine.init_params is previous.posterior_samples_
+    assert forecaster.optimizer_steps == 100
+
+
+def test_evaluate_fits_sliding_windows_together():
+    y = make_y(0)
+    cv = SlidingWindowSplitter(fh=[1, 2], window_length=6, step_length=1)
+    forecaster = Prophetverse(optimizer_steps=100, update_steps=5)
+
+    results = evaluate(forecaster, cv, y, return_data=True)
+    cold_results = evaluate(forecaster, cv, y, return_data=True, warm_start=False)
+
+    assert len(results) == len(cold_results) == cv.get_n_splits(y)
+    assert (results["len_train_window"] == 6).all()
+    for y_pred, y_test in zip(results["y_pred"], results["y_test"]):
+        assert y_pred.index.equals(y_test.index)
+
+
+def test_evaluate_hierarchical_y():
+    y = make_y((2,))
+    cv = ExpandingWindowSplitter(fh=[1, 2], initial_window=8, step_length=2)
+
+    for forecaster in [
+        Prophetverse(optimizer_steps=10),
+        HierarchicalProphet(optimizer_steps=10),
+    ]:
+        results = evaluate(forecaster, cv, y)
+        assert len(results) == cv.get_n_splits(y)
+        assert np.isfinite(results.iloc[:, 0]).all()
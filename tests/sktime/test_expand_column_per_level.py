@@ -83,3 +83,27 @@ def test_transform_preserves_original_data():
     assert X_transformed["value2_dup_series1"].iloc[2] == 0
     
     assert (X_transformed.values == 0).sum() == 8
+
+
+def test_transform_fills_missing_values_with_zero():
+    X = create_test_dataframe().astype(float)
+    X.loc[("series2", "2020-02"), "value1"] = np.nan
+    transformer = ExpandColumnPerLevel(columns_regex=["value"]).fit(X)
+    X_transformed = transformer.transform(X)
+
+    assert X_transformed["value1_dup_series2"].tolist() == [0, 0, 3, 0]
+
+
+def test_transform_sparse_matches_dense():
+    X = create_test_dataframe()
+    dense = ExpandColumnPerLevel(columns_regex=["value"]).fit(X).transform(X)
+    transformer = ExpandColumnPerLevel(columns_regex=["value"], sparse=True).fit(X)
+    X_transformed = transformer.transform(X)
+
+    expanded_columns = list(transformer.new_columns_.keys())
+    assert all(
+        isinstance(X_transformed[col].dtype, pd.SparseDtype) for col in expanded_columns
+    )
+    pd.testing.assert_frame_equal(
+        X_transformed[expanded_columns].sparse.to_dense(), dense[expanded_columns]
+    )
@@ -1,3 +1,4 @@
+import jax.numpy as jnp
 import numpy as np
 import pandas as pd
 import pytest
@@ -8,10 +9,14 @@ from sktime.transformations.hierarchical.aggregate import Aggregator
 from sktime.utils._testing.hierarchical import _bottom_hier_datagen, _make_hierarchical
 
 from prophetverse.effects.linear import LinearEffect
+from prophetverse.effects.log import LogEffect
+from prophetverse.sktime._expand_column_per_level import ExpandColumnPerLevel
 from prophetverse.sktime.multivariate import HierarchicalProphet
 from prophetverse.sktime.seasonality import seasonal_transformer
+from prophetverse.utils import loc_bottom_series
 
 from ._utils import (
+    _split_train_test,
     execute_extra_predict_methods_tests,
     execute_fit_predict_test,
     make_empty_X,
@@ -52,6 +57,13 @@ HYPERPARAMS = [
         ),
         shared_features=["x1"],
     ),
+    dict(covariance_rank=2),
+    dict(
+        feature_transformer=seasonal_transformer(
+            yearly_seasonality=True, weekly_seasonality=True
+        ),
+        expand_features_per_series=False,
+    ),
 ]
 
 
@@ -77,7 +89,7 @@ def test_hyperparams(hyperparams):
         optimizer_steps=20,
         changepoint_interval=2,
         mcmc_samples=2,
-        mcmc_warmup=2
+        mcmc_warmup=2,
     )
     execute_fit_predict_test(forecaster, y, X)
 
@@ -96,7 +108,7 @@ def test_prophet2_fit_with_different_nlevels(hierarchy_levels, make_X, hyperpara
         optimizer_steps=20,
         changepoint_interval=2,
         mcmc_samples=2,
-        mcmc_warmup=2
+        mcmc_warmup=2,
     )
 
     execute_fit_predict_test(forecaster, y, X)
@@ -111,3 +123,192 @@ def test_extra_predict_methods(make_X):
     )
 
     execute_extra_predict_methods_tests(forecaster=forecaster, X=X, y=y)
+
+
+def test_periodindex_to_multiindex_uses_bottom_series():
+    y = make_y((2, 1))
+    forecaster = HierarchicalProphet(optimizer_steps=5, changepoint_interval=2)
+    forecaster.fit(y)
+
+    periodindex = forecaster.fh_to_index([1, 2, 3])
+    index = forecaster.periodindex_to_multiindex(periodindex)
+
+    bottom_series = loc_bottom_series(forecaster.internal_y_indexes_.to_frame())
+    expected = pd.MultiIndex.from_tuples(
+        [
+            (*series, period)
+            for series in bottom_series.index.droplevel(-1).unique()
+            for period in periodindex
+        ],
+        names=y.index.names,
+    )
+    assert index.equals(expected)
+    assert list(index.names) == list(y.index.names)
+
+
+def test_scale_y_uses_max_abs_of_each_series():
+    y = make_y((2, 1))
+    forecaster = HierarchicalProphet(optimizer_steps=5, changepoint_interval=2)
+    forecaster.fit(y)
+
+    y = forecaster.aggregator_.transform(y)
+    y_scaled = forecaster._scale_y(y)
+
+    max_abs = y_scaled.abs().groupby(level=[0, 1]).max()
+    assert np.allclose(max_abs.values, 1)
+    pd.testing.assert_frame_equal(forecaster._inv_scale_y(y_scaled), y)
+
+    unknown_series = y.rename(index={"h0_0": "unknown"}, level=0)
+    with pytest.raises(KeyError):
+        forecaster._scale_y(unknown_series)
+
+
+@pytest.mark.parametrize("hierarchy_levels", [0, (2,), (2, 3)])
+def test_predict_quantiles_match_quantiles_of_samples(hierarchy_levels):
+    y = make_y(hierarchy_levels)
+    forecaster = HierarchicalProphet(optimizer_steps=5, changepoint_interval=2)
+    forecaster.fit(y)
+
+    alpha = [0.1, 0.5, 0.9]
+    samples = forecaster.predict_samples(fh=[1, 2, 3])
+    quantiles = forecaster.predict_quantiles(fh=[1, 2, 3], alpha=alpha)
+
+    assert quantiles.index.equals(samples.index)
+    np.testing.assert_allclose(
+        quantiles.values,
+        np.quantile(samples.values, alpha, axis=1).T,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+
+@pytest.mark.parametrize("covariance_rank", [1, 2, 10])
+def test_low_rank_covariance(covariance_rank):
+    y = make_y((2, 2))
+    forecaster = HierarchicalProphet(
+        optimizer_steps=20, changepoint_interval=2, covariance_rank=covariance_rank
+    )
+    execute_fit_predict_test(forecaster, y, None)
+
+    n_series = forecaster.n_series
+    rank = min(covariance_rank, n_series)
+    assert "corr_matrix" not in forecaster.posterior_samples_
+    assert forecaster.posterior_samples_["cov_factor_diag"].shape[-1] == rank
+    assert forecaster.posterior_samples_["cov_factor_lower"].shape[-1] == (
+        n_series * rank - rank * (rank + 1) // 2
+    )
+
+
+@pytest.mark.parametrize("shared_features", [None, ["x1"]])
+def test_compact_features_match_expanded_features(shared_features):
+    y = make_y((2, 2))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    kwargs = dict(
+        optimizer_steps=20, changepoint_interval=2, shared_features=shared_features
+    )
+
+    expanded = HierarchicalProphet(**kwargs).fit(y_train, X_train)
+    compact = HierarchicalProphet(**kwargs, expand_features_per_series=False)
+    compact.fit(y_train, X_train)
+
+    # Same parameters, with the per-series coefficients as (n_series, 1, n_features),
+    # stored feature-major as the expanded columns
+    params = dict(expanded.inference_engine_.run_results_.params)
+    name = "exogenous_variables_effect"
+    expanded_columns = list(expanded._exogenous_effects_and_columns[name][0])
+    coefs = params[f"{name}__coefs_auto_loc"]
+
+    def _get_coefs(columns):
+        return coefs[jnp.array([expanded_columns.index(col) for col in columns])]
+
+    series_identifiers = compact._filter_series_tuples(
+        compact.expand_columns_transformer_.series_identifiers_
+    )
+    params[f"{name}__coefs_auto_loc"] = jnp.stack(
+        [
+            _get_coefs(
+                ExpandColumnPerLevel.get_col_name(col, identifier)
+                for identifier in series_identifiers
+            )
+            for col in compact._exogenous_effects_and_columns[name][0]
+        ]
+    ).reshape((len(series_identifiers), 1, -1))
+    if shared_features:
+        params[f"shared_{name}__coefs_auto_loc"] = _get_coefs(shared_features)
+    compact.inference_engine_.run_results_ = (
+        compact.inference_engine_.run_results_._replace(params=params)
+    )
+
+    fh = [1, 2, 3, 4]
+    pd.testing.assert_frame_equal(
+        compact.predict(fh=fh, X=X_test), expanded.predict(fh=fh, X=X_test), rtol=1e-4
+    )
+    assert compact.posterior_samples_[f"{name}__coefs"].shape == (
+        compact.n_series,
+        1,
+        3 if shared_features is None else 2,
+    )
+
+
+@pytest.mark.parametrize(
+    "exogenous_effects",
+    [
+        None,
+        [
+            LinearEffect(id="lineareffect1", regex=r"(x1).*"),
+            LinearEffect(id="lineareffect2", regex=r"(x2|x3).*"),
+        ],
+    ],
+)
+def test_compact_features_fit_as_expanded_features(exogenous_effects):
+    y = make_y((2, 2))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    kwargs = dict(
+        optimizer_steps=50,
+        changepoint_interval=2,
+        exogenous_effects=exogenous_effects,
+    )
+
+    expanded = HierarchicalProphet(**kwargs).fit(y_train, X_train)
+    compact = HierarchicalProphet(**kwargs, expand_features_per_series=False)
+    compact.fit(y_train, X_train)
+
+    np.testing.assert_allclose(
+        compact.inference_engine_.run_results_.losses,
+        expanded.inference_engine_.run_results_.losses,
+        rtol=1e-4,
+    )
+    fh = [1, 2, 3, 4]
+    pd.testing.assert_frame_equal(
+        compact.predict(fh=fh, X=X_test), expanded.predict(fh=fh, X=X_test), rtol=1e-4
+    )
+
+
+def test_compact_features_raise_on_mixed_effect():
+    y = make_y((2, 2))
+    X = make_random_X(y)
+    forecaster = HierarchicalProphet(
+        optimizer_steps=2,
+        changepoint_interval=2,
+        shared_features=["x1"],
+        expand_features_per_series=False,
+        exogenous_effects=[LinearEffect(id="lin", regex=r"x[12]")],
+    )
+    with pytest.raises(ValueError, match="lin"):
+        forecaster.fit(y, X)
+
+
+def test_compact_features_raise_on_non_linear_effect():
+    y = make_y((2, 2))
+    X = make_random_X(y)
+    forecaster = HierarchicalProphet(
+        optimizer_steps=2,
+        changepoint_interval=2,
+        shared_features=["x1"],
+        expand_features_per_series=False,
+        exogenous_effects=[LogEffect(id="log", regex="x2")],
+    )
+    with pytest.raises(ValueError, match="log"):
+        forecaster.fit(y, X)
@@ -0,0 +1,187 @@
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from prophetverse.sktime.multivariate import HierarchicalProphet
+from prophetverse.sktime.persistence import (
+    LazyArrays,
+    _Decoder,
+    _Encoder,
+    _get_shared_compiled_predictive,
+    _shared_compiled_predictive,
+    load,
+    save,
+)
+from prophetverse.sktime.seasonality import seasonal_transformer
+from prophetverse.sktime.univariate import Prophetverse
+
+from ._utils import _split_train_test, make_random_X, make_y
+
+FH = [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize(
+    "forecaster",
+    [
+        Prophetverse(
+            optimizer_steps=50,
+            feature_transformer=seasonal_transformer(weekly_seasonality=True),
+        ),
+        Prophetverse(inference_method="mcmc", mcmc_samples=10, mcmc_warmup=10),
+    ],
+)
+def test_loaded_forecaster_predicts_as_saved_one(forecaster, tmp_path):
+    y = make_y(0)
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X)
+    forecaster.fit(y_train, X_train)
+
+    loaded = load(save(forecaster, tmp_path / "model"))
+
+    pd.testing.assert_frame_equal(
+        loaded.predict(fh=FH, X=X_test), forecaster.predict(fh=FH, X=X_test)
+    )
+    pd.testing.assert_frame_equal(
+        loaded.predict_interval(fh=FH, X=X_test),
+        forecaster.predict_interval(fh=FH, X=X_test),
+    )
+
+
+@pytest.mark.parametrize(
+    "forecaster",
+    [HierarchicalProphet(optimizer_steps=20), Prophetverse(optimizer_steps=20)],
+)
+def test_loaded_hierarchical_forecaster_predicts_as_saved_one(forecaster, tmp_path):
+    y = make_y((2,))
+    forecaster.fit(y)
+
+    loaded = load(save(forecaster, tmp_path / "model"))
+
+    pd.testing.assert_frame_equal(loaded.predict(fh=FH), forecaster.predict(fh=FH))
+
+
+def test_posterior_samples_are_read_when_accessed(tmp_path):
+    forecaster = Prophetverse(optimizer_steps=20).fit(make_y(0))
+    save(forecaster, tmp_path / "model")
+
+    loaded = load(tmp_path / "model")
+    assert isinstance(loaded.posterior_samples_, LazyArrays)
+    assert loaded.inference_engine_.posterior_samples_ is loaded.posterior_samples_
+    loaded.predict(fh=FH)
+    assert not loaded.posterior_samples_.loaded
+
+    for site, value in forecaster.posterior_samples_.items():
+        assert np.allclose(loaded.posterior_samples_[site], value)
+    assert loaded.posterior_samples_.loaded
+    assert load(tmp_path / "model", lazy=False).posterior_samples_.loaded
+
+
+def test_saved_forecaster_is_smaller_than_pickle(tmp_path):
+    forecaster = Prophetverse(optimizer_steps=2000).fit(make_y(0))
+
+    path = save(forecaster, tmp_path / "model")
+
+    size = sum(file.stat().st_size for file in path.iterdir())
+    assert size < len(pickle.dumps(forecaster)) / 2
+    with open(path / "spec.json") as file:
+        spec = json.load(file)
+    assert spec["forecaster"]["__forecaster__"].endswith(":Prophetverse")
+    assert load(path).inference_engine_.run_results_.losses is None
+
+
+def test_loaded_forecasters_share_compiled_predictions(tmp_path):
+    y = make_y(0)
+    for i, noise_scale in enumerate([0.05, 0.5]):
+        forecaster = Prophetverse(optimizer_steps=20, noise_scale=noise_scale)
+        save(forecaster.fit(y), tmp_path / f"model_{i}")
+
+    first, second = load(tmp_path / "model_0"), load(tmp_path / "model_1")
+    first.predict(fh=FH)
+    second.predict(fh=FH)
+
+    info = second.inference_engine_._compiled_predictive.info()
+    assert second.inference_engine_._compiled_predictive is (
+        first.inference_engine_._compiled_predictive
+    )
+    assert info.hits >= 1
+
+
+def test_shared_compiled_predictions_are_bounded():
+    maxsize = _shared_compiled_predictive.maxsize
+    _shared_compiled_predictive.clear()
+    try:
+        _shared_compiled_predictive.maxsize = 2
+        caches = [_get_shared_compiled_predictive(key) for key in range(3)]
+        assert _shared_compiled_predictive.info().currsize == 2
+        assert _get_shared_compiled_predictive(2) is caches[2]
+        assert _get_shared_compiled_predictive(0) is not caches[0]
+    finally:
+        _shared_compiled_predictive.maxsize = maxsize
+        _shared_compiled_predictive.clear()
+
+
+def test_training_data_is_saved_without_pickle(tmp_path):
+    y = make_y(0)
+    X = make_random_X(y)
+    forecaster = Prophetverse(optimizer_steps=20).fit(y, X)
+
+    path = save(forecaster, tmp_path / "model")
+    loaded = load(path)
+
+    with np.load(path / "arrays.npz") as arrays:
+        assert not [key for key in arrays if key.startswith("pickle_")]
+    pd.testing.assert_frame_equal(loaded._y, forecaster._y)
+    pd.testing.assert_frame_equal(loaded._X, forecaster._X)
+    assert loaded.cutoff.equals(forecaster.cutoff)
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        pd.period_range("2020-01", periods=3, freq="M", name="time"),
+        pd.date_range("2020-01-01", periods=3, freq="D"),
+        pd.date_range("2020-03-28", periods=3, freq="h", tz="Europe/Madrid"),
+        pd.RangeIndex(2, 8, 2),
+        pd.Index([0.5, 1.5]),
+        pd.Index(["a", "b"], name=("level", 0)),
+        pd.MultiIndex.from_product(
+            [["a", "b"], pd.period_range("2020-01-01", periods=2)],
+            names=["series", None],
+        ),
+    ],
+)
+def test_indexes_are_saved_as_arrays(index):
+    encoder = _Encoder()
+    encoded = json.loads(json.dumps(encoder.encode(index)))
+
+    assert not [key for key in encoder.arrays if key.startswith("pickle_")]
+    decoded = _Decoder(encoder.arrays, None).decode(encoded)
+    pd.testing.assert_index_equal(decoded, index, exact=True)
+    assert getattr(decoded, "freq", None) == getattr(index, "freq", None)
+
+
+def test_loaded_forecaster_can_be_updated(tmp_path):
+    y = make_y(0)
+    y_train, y_test, _, _ = _split_train_test(y, None)
+    forecaster = Prophetverse(optimizer_steps=50, update_steps=5).fit(y_train)
+    loaded = load(save(forecaster, tmp_path / "model"))
+
+    loaded.update(y_test.iloc[:2])
+
+    assert loaded.cutoff[0] == y_test.index[1]
+    assert loaded.inference_engine_.run_results_.losses.shape == (5,)
+
+
+def test_load_raises_on_unknown_format_version(tmp_path):
+    path = save(Prophetverse(optimizer_steps=10).fit(make_y(0)), tmp_path / "model")
+    with open(path / "spec.json") as file:
+        spec = json.load(file)
+    spec["format_version"] = -1
+    with open(path / "spec.json", "w") as file:
+        json.dump(spec, file)
+
+    with pytest.raises(ValueError, match="format version"):
+        load(path)
@@ -0,0 +1,77 @@
+import jax
+import jax.numpy as jnp
+import pandas as pd
+
+from prophetverse.sktime import Prophetverse
+from prophetverse.sktime._prediction_cache import (
+    PredictionCache,
+    prediction_cache_key,
+)
+
+from ._utils import _split_train_test, make_random_X, make_y
+
+
+def _samples(n):
+    return {"obs": jnp.zeros(n, dtype=jnp.float32)}
+
+
+def test_evicts_least_recently_used_entries_over_max_bytes():
+    cache = PredictionCache(max_bytes=80)
+    cache.put("a", _samples(10))
+    cache.put("b", _samples(10))
+    cache.get("a")
+    cache.put("c", _samples(10))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.info().currsize == 80
+
+
+def test_does_not_store_entries_larger_than_max_bytes():
+    cache = PredictionCache(max_bytes=10)
+    cache.put("a", _samples(10))
+
+    assert cache.get("a") is None
+    assert cache.info().currsize == 0
+
+
+def test_returns_cached_subset_of_sites():
+    cache = PredictionCache(max_bytes=1000)
+    cache.put("a", {"obs": jnp.zeros(2), "trend": jnp.ones(2)})
+    cache.put("b", {"obs": jnp.zeros(2)}, return_sites=["obs"])
+
+    assert list(cache.get("a", return_sites=["obs"])) == ["obs"]
+    assert cache.get("a", return_sites=["other"]) is None
+    assert cache.get("b") is None
+    assert list(cache.get("b", return_sites=["obs"])) == ["obs"]
+
+
+def test_key_depends_on_fh_X_and_rng_key():
+    fh_index = pd.period_range("2000-01-01", periods=3, freq="D")
+    X = pd.DataFrame({"x": [1.0, 2.0, 3.0]}, index=fh_index)
+    key = prediction_cache_key(fh_index, X, jax.random.PRNGKey(0))
+
+    assert key == prediction_cache_key(fh_index, X.copy(), jax.random.PRNGKey(0))
+    assert key != prediction_cache_key(fh_index[:2], X, jax.random.PRNGKey(0))
+    assert key != prediction_cache_key(fh_index, X * 2, jax.random.PRNGKey(0))
+    assert key != prediction_cache_key(fh_index, X, jax.random.PRNGKey(1))
+
+
+def test_forecaster_draws_samples_once_per_request():
+    y = make_y((1,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    forecaster = Prophetverse(optimizer_steps=10, prediction_cache_max_bytes=2**20)
+    forecaster.fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    forecaster.predict_all_sites(fh=fh, X=X_test)
+    samples = forecaster.predict_samples(fh=fh, X=X_test)
+    forecaster.predict_interval(fh=fh, X=X_test, coverage=0.9)
+    forecaster.predict_samples(fh=fh, X=X_test * 2)
+
+    forecaster_ = forecaster.forecasters_.iloc[0, 0]
+    info = forecaster_._prediction_cache.info()
+    assert (info.hits, info.misses) == (2, 2)
+    pd.testing.assert_frame_equal(forecaster.predict_samples(fh=fh, X=X_test), samples)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from sktime.performance_metrics.forecasting import MeanAbsoluteError
+from sktime.split import SlidingWindowSplitter
+
+from prophetverse.engine import MAPInferenceEngine
+from prophetverse.sktime.tuning import search_prior_scales
+from prophetverse.sktime.univariate import _LIKELIHOOD_MODEL_MAP, Prophetverse
+
+from ._utils import make_y
+
+PARAM_GRID = {"changepoint_prior_scale": [0.001, 0.1], "noise_scale": [0.05, 0.5]}
+
+
+def test_search_prior_scales_returns_ranked_table():
+    y = make_y(0)
+    cv = SlidingWindowSplitter(fh=[1, 2], window_length=8, step_length=1)
+
+    results = search_prior_scales(
+        Prophetverse(optimizer_steps=20),
+        PARAM_GRID,
+        cv,
+        y,
+        scoring=MeanAbsoluteError(),
+    )
+
+    assert len(results) == 4
+    assert results["rank_test_MeanAbsoluteError"].tolist() == [1, 2, 3, 4]
+    assert results["mean_test_MeanAbsoluteError"].is_monotonic_increasing
+    for _, row in results.iterrows():
+        assert row["params"] == {
+            "changepoint_prior_scale": row["param_changepoint_prior_scale"],
+            "noise_scale": row["param_noise_scale"],
+        }
+
+
+def test_search_prior_scales_fits_the_grid_in_one_program():
+    y = make_y(0)
+    cv = SlidingWindowSplitter(fh=[1, 2], window_length=8, step_length=1)
+    MAPInferenceEngine.cache_clear()
+
+    search_prior_scales(Prophetverse(optimizer_steps=20), PARAM_GRID, cv, y)
+
+    assert MAPInferenceEngine.cache_info().misses == 1
+
+
+@pytest.mark.parametrize("hierarchy_levels", [0, (2,)])
+def test_search_prior_scales_without_batched_fits(hierarchy_levels):
+    y = make_y(hierarchy_levels)
+    cv = SlidingWindowSplitter(fh=[1, 2], window_length=8, step_length=2)
+    inference_method = "mcmc" if hierarchy_levels == 0 else "map"
+    forecaster = Prophetverse(
+        inference_method=inference_method,
+        optimizer_steps=10,
+        mcmc_samples=5,
+        mcmc_warmup=5,
+    )
+
+    results = search_prior_scales(forecaster, {"noise_scale": [0.05, 0.5]}, cv, y)
+
+    assert len(results) == 2
+    assert np.isfinite(results["mean_test_MeanAbsolutePercentageError"]).all()
+
+
+def test_fit_batch_fits_each_dataset_with_its_own_settings():
+    y = make_y(0)
+    params = [
+        {"optimizer_steps": steps, "likelihood": likelihood}
+        for steps in [10, 30]
+        for likelihood in ["normal", "gamma"]
+    ]
+
+    fitted = Prophetverse()._fit_batch(
+        [y] * len(params), [None] * len(params), params=params
+    )
+
+    for forecaster, forecaster_params in zip(fitted, params):
+        engine = forecaster.inference_engine_
+        assert engine.run_results_.losses.shape == (
+            forecaster_params["optimizer_steps"],
+        )
+        assert engine.model is _LIKELIHOOD_MODEL_MAP[forecaster_params["likelihood"]]
+
+
+def test_search_prior_scales_with_settings_changing_the_model():
+    y = make_y(0)
+    cv = SlidingWindowSplitter(fh=[1, 2], window_length=8, step_length=2)
+
+    results = search_prior_scales(
+        Prophetverse(),
+        {"optimizer_steps": [10, 30], "likelihood": ["normal", "gamma"]},
+        cv,
+        y,
+    )
+
+    assert len(results) == 4
+    assert np.isfinite(results["mean_test_MeanAbsolutePercentageError"]).all()
@@ -1,7 +1,11 @@
+import numpy as np
+import pandas as pd
 import pytest
 from numpyro import distributions as dist
 
 from prophetverse.effects.linear import LinearEffect
+from prophetverse.engine import MAPInferenceEngine
+from prophetverse.sktime.base import _pad_changepoint_coefficients
 from prophetverse.sktime.seasonality import seasonal_transformer
 from prophetverse.sktime.univariate import (
     _DISCRETE_LIKELIHOODS,
@@ -14,6 +18,7 @@ from prophetverse.sktime.univariate import (
 from prophetverse.trend.flat import FlatTrend
 
 from ._utils import (
+    _split_train_test,
     execute_extra_predict_methods_tests,
     execute_fit_predict_test,
     make_empty_X,
@@ -56,6 +61,7 @@ HYPERPARAMS = [
     dict(trend="logistic", offset_prior_scale=0.5),
     dict(trend="flat"),
     dict(inference_method="mcmc"),
+    dict(optimizer_convergence_kwargs={"rtol": 1e-3, "window": 5}),
 ]
 
 
@@ -143,6 +149,7 @@ def test_prophet2_fit_with_different_nlevels(
         dict(offset_prior_scale=-1),
         dict(capacity_prior_scale=-1),
         dict(changepoint_interval=-1),
+        dict(update_steps=0),
     ],
 )
 def test_raise_error_when_passing_parameters(parameters):
@@ -157,3 +164,222 @@ def test_prophetverse_likelihood_behaviour(likelihood):
 
     if likelihood in _DISCRETE_LIKELIHOODS:
         assert model.should_skip_scaling
+
+
+@pytest.mark.parametrize("hierarchy_levels", [0, (3,)])
+def test_batch_fit_matches_sequential_fit(hierarchy_levels):
+    y = make_y(hierarchy_levels)
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    hyperparams = dict(**HYPERPARAMS[0], optimizer_steps=50)
+
+    sequential = Prophetverse(**hyperparams).fit(y_train, X_train)
+    batched = Prophetverse(**hyperparams, batch_fit=True).fit(y_train, X_train)
+
+    assert batched._is_vectorized == sequential._is_vectorized
+    if batched._is_vectorized:
+        assert len(batched.forecasters_) == len(sequential.forecasters_)
+    fh = [1, 2, 3, 4]
+    pd.testing.assert_frame_equal(
+        batched.predict(fh=fh, X=X_test),
+        sequential.predict(fh=fh, X=X_test),
+        atol=1e-4,
+    )
+
+
+def test_batch_fit_runs_one_batched_inference_for_vectorized_fit(monkeypatch):
+    batch_sizes = []
+    infer_batch = MAPInferenceEngine.infer_batch
+
+    def _infer_batch(self, kwargs_list):
+        batch_sizes.append(len(kwargs_list))
+        return infer_batch(self, kwargs_list)
+
+    def _infer(self, **kwargs):
+        raise AssertionError("inference of a series was not deferred")
+
+    monkeypatch.setattr(MAPInferenceEngine, "infer_batch", _infer_batch)
+    monkeypatch.setattr(MAPInferenceEngine, "infer", _infer)
+
+    model = Prophetverse(optimizer_steps=10, batch_fit=True).fit(make_y((3,)))
+
+    forecasters = model.forecasters_.values.flatten()
+    assert batch_sizes == [len(forecasters)]
+    for forecaster in forecasters:
+        assert not hasattr(forecaster, "_deferred_fit_data_")
+        assert (
+            forecaster.posterior_samples_
+            is forecaster.inference_engine_.posterior_samples_
+        )
+
+
+@pytest.mark.parametrize("likelihood", ["normal", "gamma"])
+def test_map_predict_matches_mean_of_samples(likelihood):
+    y = make_y((2,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(likelihood=likelihood, optimizer_steps=50)
+    model.fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    y_pred = model.predict(fh=fh, X=X_test)
+    samples_mean = model.predict_samples(fh=fh, X=X_test).mean(axis=1)
+
+    assert y_pred.shape == (len(samples_mean), 1)
+    assert np.allclose(
+        y_pred.values.flatten(), samples_mean.values, rtol=0.05, atol=0.05
+    )
+
+
+def test_predict_all_sites_return_sites():
+    y = make_y((2,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(optimizer_steps=10).fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    all_sites = model.predict_all_sites(fh=fh, X=X_test)
+    obs_only = model.predict_all_sites(fh=fh, X=X_test, return_sites=["obs"])
+
+    assert len(all_sites.columns) > 1
+    assert list(obs_only.columns) == ["obs"]
+    assert obs_only.shape[0] == all_sites.shape[0]
+
+
+def test_vectorized_predict_all_sites_matches_each_forecaster():
+    y = make_y((3,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(optimizer_steps=10).fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    preds = model.predict_all_sites(fh=fh, X=X_test)
+
+    expected = pd.concat(
+        [
+            forecaster.predict_all_sites(fh=fh, X=X_test.loc[idx])
+            for idx, forecaster in model.forecasters_.iloc[:, 0].items()
+        ]
+    )
+    pd.testing.assert_frame_equal(preds, expected, check_exact=False, atol=1e-5)
+
+
+def test_vectorized_predict_samples_only_draws_observations(monkeypatch):
+    y = make_y((3,))
+    model = Prophetverse(optimizer_steps=10).fit(y)
+
+    sampled_sites = []
+    get_predictive_samples_batch = Prophetverse._get_predictive_samples_batch
+
+    def _get_predictive_samples_batch(self, *args, **kwargs):
+        batched_samples = get_predictive_samples_batch(self, *args, **kwargs)
+        sampled_sites.extend(set(samples) for samples in batched_samples)
+        return batched_samples
+
+    monkeypatch.setattr(
+        Prophetverse, "_get_predictive_samples_batch", _get_predictive_samples_batch
+    )
+
+    model.predict_samples(fh=[1, 2, 3])
+    assert sampled_sites == [{"obs"}] * len(model.forecasters_)
+
+    sampled_sites.clear()
+    model.predict_all_sites(fh=[1, 2, 3])
+    assert all(len(sites) > 1 for sites in sampled_sites)
+
+
+def test_update_warm_starts_from_previous_fit():
+    y = make_y(0)
+    X = make_random_X(y)
+    y_train, y_test, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(
+        optimizer_steps=100, update_steps=5, prediction_cache_max_bytes=2**20
+    ).fit(y_train, X_train)
+    point_estimates = model.inference_engine_.point_estimates()
+    model.predict_samples(fh=[1, 2], X=X_test)
+
+    model.update(y_test.iloc[:2], X_test.iloc[:2])
+
+    engine = model.inference_engine_
+    assert model.cutoff[0] == y_test.index[1]
+    assert engine.run_results_.losses.shape == (5,)
+    for site, value in point_estimates.items():
+        assert np.allclose(engine.init_params[site], value)
+    assert model._prediction_cache.info().currsize == 0
+
+
+def test_update_keeps_changepoint_coefficients_when_changepoints_are_added():
+    y = make_y(0)
+    y_train, y_test, _, _ = _split_train_test(y, None, test_size=4)
+    model = Prophetverse(
+        changepoint_interval=3, optimizer_steps=100, update_steps=5
+    ).fit(y_train)
+    point_estimates = model.inference_engine_.point_estimates()
+    coefficients = point_estimates["changepoint_coefficients"]
+
+    model.update(y_test)
+
+    init_coefficients = model.inference_engine_.init_params["changepoint_coefficients"]
+    n_new = model.trend_model_.n_changepoints - len(coefficients)
+    assert n_new > 0
+    np.testing.assert_allclose(init_coefficients[: len(coefficients)], coefficients)
+    np.testing.assert_array_equal(init_coefficients[len(coefficients) :], 0)
+
+
+def test_pad_changepoint_coefficients_pads_each_series():
+    init_params = {"changepoint_coefficients": np.array([1.0, 2.0, 3.0])}
+
+    padded = _pad_changepoint_coefficients(init_params, [2, 1], [3, 2])
+
+    np.testing.assert_array_equal(
+        padded["changepoint_coefficients"], [1.0, 2.0, 0.0, 3.0, 0.0]
+    )
+
+
+def test_init_params_warm_start_from_fitted_forecaster():
+    y = make_y(0)
+    model = Prophetverse(optimizer_steps=2000).fit(y)
+
+    warm_model = Prophetverse(
+        optimizer_steps=10, init_params=model.posterior_samples_
+    ).fit(y)
+    cold_model = Prophetverse(optimizer_steps=10).fit(y)
+
+    warm_losses = warm_model.inference_engine_.run_results_.losses
+    cold_losses = cold_model.inference_engine_.run_results_.losses
+    assert warm_losses[0] < cold_losses[0]
+    assert warm_model.inference_engine_.init_params is model.posterior_samples_
+
+
+def test_predict_quantiles_match_quantiles_of_samples():
+    y = make_y((2,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(optimizer_steps=10).fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    alpha = [0.1, 0.5, 0.9]
+    quantiles = model.predict_quantiles(fh=fh, X=X_test, alpha=alpha)
+    samples = model.predict_samples(fh=fh, X=X_test)
+
+    assert quantiles.columns.tolist() == [("c0", a) for a in alpha]
+    assert np.allclose(
+        quantiles.values, samples.quantile(alpha, axis=1).T.values, atol=1e-5
+    )
+
+
+def test_predict_all_sites_samples_long_format():
+    y = make_y((2,))
+    X = make_random_X(y)
+    y_train, _, X_train, X_test = _split_train_test(y, X, test_size=4)
+    model = Prophetverse(optimizer_steps=10).fit(y_train, X_train)
+
+    fh = [1, 2, 3, 4]
+    wide = model.predict_all_sites_samples(fh=fh, X=X_test)
+    long = model.predict_all_sites_samples(fh=fh, X=X_test, long_format=True)
+
+    assert wide.index.names[0] == "sample"
+    assert len(long) == wide.size
+    assert list(long["site"].cat.categories) == list(wide.columns)
+    obs = long[long["site"] == "obs"]["value"].values
+    assert np.allclose(np.sort(obs), np.sort(wide["obs"].values))
@@ -152,25 +152,9 @@ def test_single_series_get_multivariate_changepoint_matrix(piecewise_linear_tren
 def test_multiple_series_get_multivariate_changepoint_matrix(piecewise_linear_trend):
     t = np.arange(10)
     changepoint_ts = [[5], [3]]
-    expected = np.concatenate(
-        [
-            np.concatenate(
-                [
-                    np.array([0, 0, 0, 0, 0, 1, 2, 3, 4, 5]).reshape((1, 10, 1)),
-                    np.zeros((1, 10, 1)),
-                ],
-                axis=-1,
-            ),
-            np.concatenate(
-                [
-                    np.zeros((1, 10, 1)),
-                    np.array([0, 0, 0, 1, 2, 3, 4, 5, 6, 7]).reshape((1, 10, 1)),
-                ],
-                axis=-1,
-            ),
-        ],
-        axis=0,
-    )
+    expected = np.array(
+        [[0, 0, 0, 0, 0, 1, 2, 3, 4, 5], [0, 0, 0, 1, 2, 3, 4, 5, 6, 7]]
+    ).reshape((2, 10, 1))
 
     piecewise_linear_trend._changepoint_ts = changepoint_ts
     result = piecewise_linear_trend._get_multivariate_changepoint_matrix(t)
@@ -181,6 +165,43 @@ def test_multiple_series_get_multivariate_changepoint_matrix(piecewise_linear_tr
     )
 
 
+def test_shared_changepoints_get_multivariate_changepoint_matrix(
+    piecewise_linear_trend,
+):
+    t = np.arange(10)
+    piecewise_linear_trend._changepoint_ts = [np.array([2, 5])] * 3
+    result = piecewise_linear_trend._get_multivariate_changepoint_matrix(t)
+    assert result.shape == (1, 10, 2)
+    assert result.dtype == np.float32
+
+
+def test_multiple_series_compute_trend_matches_dense_design(piecewise_linear_trend):
+    piecewise_linear_trend.initialize(_make_mock_multiindex_dataframe())
+    piecewise_linear_trend._changepoint_ts = [np.array([5.0, 30.0]), np.array([10.0])]
+    piecewise_linear_trend._offset_prior_loc = np.zeros(2)
+    piecewise_linear_trend._changepoint_prior_loc = np.zeros(3)
+    piecewise_linear_trend._changepoint_prior_scale = np.ones(3)
+
+    period_index = pd.period_range(start="2020-01-01", periods=100, freq="D")
+    changepoint_matrix = piecewise_linear_trend.get_changepoint_matrix(period_index)
+    assert changepoint_matrix.shape == (2, 100, 2)
+
+    with numpyro.handlers.trace() as trace, numpyro.handlers.seed(rng_seed=0):
+        trend = piecewise_linear_trend.compute_trend(changepoint_matrix)
+    coefficients = trace["changepoint_coefficients"]["value"]
+    offset = trace["offset"]["value"]
+
+    t = piecewise_linear_trend._index_to_scaled_timearray(period_index)
+    expected = np.stack(
+        [
+            _get_changepoint_matrix(t, np.array([5.0, 30.0])) @ coefficients[:2]
+            + offset[0],
+            _get_changepoint_matrix(t, np.array([10.0])) @ coefficients[2:] + offset[1],
+        ]
+    )
+    np.testing.assert_allclose(trend[..., 0], expected, rtol=1e-5)
+
+
 def test_get_changepoint_matrix():
     t = np.arange(10)
     changepoint_ts = np.array([[5]])
@@ -191,6 +212,7 @@ def test_get_changepoint_matrix():
         expected,
         "Matrix does not match expected for single series single changepoint",
     )
+    assert result.dtype == np.float32
 
 
 def test_suggest_logistic_rate_and_offset():